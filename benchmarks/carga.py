@@ -0,0 +1,81 @@
+"""Teste de carga simples para comparar modos de execução do servidor
+
+Abre N conexões keep-alive em paralelo contra uma URL e informa vazão e
+latências. Não depende de ferramentas externas.
+
+Uso: python benchmarks/carga.py URL [--conexoes 32] [--requisicoes 5000]
+
+Exemplo (comparando o servidor de desenvolvimento com o gunicorn):
+    python src/main.py &                                  # porta 5000
+    python benchmarks/carga.py http://127.0.0.1:5000/api/questoes-novas?per_page=20
+    gunicorn -c gunicorn.conf.py src.wsgi:app &           # porta 5000
+    python benchmarks/carga.py http://127.0.0.1:5000/api/questoes-novas?per_page=20
+"""
+import argparse
+import http.client
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def executar(url, conexoes, requisicoes):
+    partes = urlsplit(url)
+    caminho = partes.path + (f'?{partes.query}' if partes.query else '')
+    latencias = []
+    erros = [0]
+    restantes = [requisicoes]
+    lock = threading.Lock()
+
+    def cliente():
+        conexao = http.client.HTTPConnection(partes.hostname, partes.port or 80, timeout=30)
+        while True:
+            with lock:
+                if restantes[0] <= 0:
+                    break
+                restantes[0] -= 1
+            inicio = time.perf_counter()
+            try:
+                conexao.request('GET', caminho, headers={'Accept-Encoding': 'gzip'})
+                resposta = conexao.getresponse()
+                resposta.read()
+                ok = resposta.status < 500
+            except (OSError, http.client.HTTPException):
+                conexao.close()
+                conexao = http.client.HTTPConnection(partes.hostname, partes.port or 80, timeout=30)
+                ok = False
+            duracao = time.perf_counter() - inicio
+            with lock:
+                latencias.append(duracao)
+                if not ok:
+                    erros[0] += 1
+        conexao.close()
+
+    threads = [threading.Thread(target=cliente) for _ in range(conexoes)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    total = time.perf_counter() - inicio
+
+    latencias.sort()
+
+    def percentil(p):
+        return latencias[min(len(latencias) - 1, int(len(latencias) * p))] * 1000
+
+    print(f'{len(latencias)} requisições, {conexoes} conexões, {total:.2f}s')
+    print(f'  vazão: {len(latencias) / total:.1f} req/s   erros: {erros[0]}')
+    print(f'  latência p50: {percentil(0.50):.1f} ms  p95: {percentil(0.95):.1f} ms  p99: {percentil(0.99):.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('url')
+    parser.add_argument('--conexoes', type=int, default=32)
+    parser.add_argument('--requisicoes', type=int, default=5000)
+    args = parser.parse_args()
+    executar(args.url, args.conexoes, args.requisicoes)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Teste de estresse de escritas concorrentes no SQLite
+
+Simula o fim de um simulado cronometrado: P processos (como os workers do
+gunicorn), cada um com T threads, enviam resultados ao mesmo tempo por
+POST /api/simulados/<id>/resultado. Roda sobre uma cópia do banco e informa
+vazão, latências e quantas requisições falharam com "database is locked".
+
+Uso: python benchmarks/concorrencia.py [--processos 4] [--threads 8]
+         [--envios 50] [--sem-ajustes] [caminho/do/app.db]
+
+--sem-ajustes desliga os pragmas (WAL, busy_timeout etc.) e a fila de
+escrita, para comparar com o comportamento anterior.
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.app import create_app
+
+
+def _config(caminho, sem_ajustes):
+    config = {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{caminho}'}
+    if sem_ajustes:
+        config.update({'SQLITE_PRAGMAS': {}, 'FILA_ESCRITA_SINCRONA': True})
+    return config
+
+
+def preparar(caminho):
+    """Migrar a cópia do banco e criar um simulado com até 20 questões"""
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{caminho}', 'CRIAR_ESQUEMA': True})
+    with app.app_context():
+        from src.models.user import db
+        from src.models.questao import Questao
+        from src.services.simulados import criar_simulado
+        ids = [linha[0] for linha in db.session.query(Questao.id).limit(20)]
+        if not ids:
+            raise SystemExit('A tabela questoes está vazia')
+        simulado = criar_simulado('Estresse', ids, None, None)
+        db.session.commit()
+        return simulado.id, ids
+
+
+def trabalhador(caminho, sem_ajustes, threads, envios, simulado_id, ids, saida):
+    app = create_app(_config(caminho, sem_ajustes))
+    latencias = []
+    erros = {'bloqueio': 0, 'outros': 0}
+    lock = threading.Lock()
+    respostas = {str(questao_id): 'A' for questao_id in ids}
+
+    def cliente(indice):
+        cliente_http = app.test_client()
+        for envio in range(envios):
+            inicio = time.perf_counter()
+            resposta = cliente_http.post(f'/api/simulados/{simulado_id}/resultado', json={
+                'usuario_nome': f'aluno-{os.getpid()}-{indice}-{envio}',
+                'respostas': respostas,
+                'tempo_gasto': 600
+            })
+            duracao = time.perf_counter() - inicio
+            with lock:
+                latencias.append(duracao)
+                if resposta.status_code != 201:
+                    erro = (resposta.get_json() or {}).get('error', '')
+                    erros['bloqueio' if 'locked' in erro or 'busy' in erro else 'outros'] += 1
+
+    lista = [threading.Thread(target=cliente, args=(i,)) for i in range(threads)]
+    for thread in lista:
+        thread.start()
+    for thread in lista:
+        thread.join()
+    saida.put((latencias, erros))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('banco', nargs='?', default=os.path.join('src', 'database', 'app.db'))
+    parser.add_argument('--processos', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--envios', type=int, default=50, help='Resultados enviados por thread.')
+    parser.add_argument('--sem-ajustes', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, 'app.db')
+        shutil.copyfile(args.banco, caminho)
+        simulado_id, ids = preparar(caminho)
+
+        contexto = multiprocessing.get_context('spawn')
+        saida = contexto.Queue()
+        processos = [
+            contexto.Process(target=trabalhador, args=(
+                caminho, args.sem_ajustes, args.threads, args.envios, simulado_id, ids, saida
+            ))
+            for _ in range(args.processos)
+        ]
+        inicio = time.perf_counter()
+        for processo in processos:
+            processo.start()
+        resultados = [saida.get() for _ in processos]
+        for processo in processos:
+            processo.join()
+        total = time.perf_counter() - inicio
+
+    latencias = sorted(l for parcial, _ in resultados for l in parcial)
+    bloqueios = sum(erros['bloqueio'] for _, erros in resultados)
+    outros = sum(erros['outros'] for _, erros in resultados)
+
+    def percentil(p):
+        return latencias[min(len(latencias) - 1, int(len(latencias) * p))] * 1000
+
+    escritores = args.processos * args.threads
+    modo = 'sem ajustes' if args.sem_ajustes else 'WAL + fila de escrita'
+    print(f'{len(latencias)} resultados, {escritores} escritores paralelos ({modo}), {total:.2f}s')
+    print(f'  vazão: {len(latencias) / total:.1f} escritas/s')
+    print(f'  erros "database is locked": {bloqueios}   outros erros: {outros}')
+    print(f'  latência p50: {percentil(0.50):.1f} ms  p95: {percentil(0.95):.1f} ms  p99: {percentil(0.99):.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Medir memória e vazão da exportação em streaming de /api/exportar/questoes-novas
+
+Exporta uma cópia do banco completada até cada tamanho de --questoes
+(duplicando as questões existentes com outros números) e mostra o pico de
+memória alocada pelo Python (tracemalloc) durante o download. Com o
+streaming, o pico deve ficar praticamente igual qualquer que seja o número
+de linhas.
+
+Uso: python benchmarks/exportacao.py [--questoes 5000 20000 80000] [caminho/do/app.db]
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.app import create_app
+
+COLUNAS = ('vestibular', 'ano', 'etapa', 'numero', 'materia', 'assunto', 'enunciado', 'alternativas',
+           'alternativas_numeracao', 'resposta_correta', 'alternativas_corretas', 'explicacao', 'dificuldade',
+           'created_at')
+
+
+def completar(caminho, quantidade):
+    conexao = sqlite3.connect(caminho)
+    while conexao.execute('SELECT count(*) FROM questoes_novas').fetchone()[0] < quantidade:
+        deslocamento = conexao.execute('SELECT max(numero) FROM questoes_novas').fetchone()[0] + 1
+        colunas = ', '.join(COLUNAS)
+        origem = colunas.replace('numero', f'numero + {deslocamento}')
+        conexao.execute(f'INSERT INTO questoes_novas ({colunas}) SELECT {origem} FROM questoes_novas')
+    conexao.commit()
+    conexao.close()
+
+
+def medir(app, url, cabecalhos):
+    cliente = app.test_client()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resposta = cliente.get(url, headers=cabecalhos, buffered=False)
+    enviados = sum(len(pedaco) for pedaco in resposta.response)
+    resposta.close()
+    tempo = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return enviados, tempo, pico
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('banco', nargs='?', default=os.path.join('src', 'database', 'app.db'))
+    parser.add_argument('--questoes', type=int, nargs='+', default=[5000, 20000, 80000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, 'app.db')
+        shutil.copyfile(args.banco, caminho)
+        uri = f'sqlite:///{caminho}'
+        create_app({'SQLALCHEMY_DATABASE_URI': uri, 'CRIAR_ESQUEMA': True})
+        app = create_app({'SQLALCHEMY_DATABASE_URI': uri, 'INSTANTANEO_CAMINHO': None})
+
+        for quantidade in sorted(args.questoes):
+            completar(caminho, quantidade)
+            for formato, cabecalhos in (('ndjson', {}), ('csv', {}), ('ndjson', {'Accept-Encoding': 'gzip'})):
+                url = f'/api/exportar/questoes-novas?formato={formato}'
+                enviados, tempo, pico = medir(app, url, cabecalhos)
+                rotulo = formato + (' gzip' if cabecalhos else '')
+                print(f'{quantidade:7d} questões  {rotulo:12} {enviados / 1e6:8.1f} MB enviados '
+                      f'em {tempo:5.2f} s  pico {pico / 1e6:6.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
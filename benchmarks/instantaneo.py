@@ -0,0 +1,90 @@
+"""Comparar leituras de questões pelo ORM e pelo instantâneo mapeado em memória
+
+Mede GET /api/questoes-novas/<id>, a listagem paginada com filtro e a lista
+do PAS-UEM com INSTANTANEO_CAMINHO desligado (ORM + SQLite) e ligado (JSON
+pronto lido do mmap). Roda sobre uma cópia do banco, completada até
+--questoes questões duplicando as existentes com outros números.
+
+Uso: python benchmarks/instantaneo.py [--questoes 5000] [caminho/do/app.db]
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.app import create_app
+from src.services.instantaneo import publicar_instantaneo
+
+REPETICOES = 300
+COLUNAS = ('vestibular', 'ano', 'etapa', 'numero', 'materia', 'assunto', 'enunciado', 'alternativas',
+           'alternativas_numeracao', 'resposta_correta', 'alternativas_corretas', 'explicacao', 'dificuldade',
+           'created_at')
+
+
+def completar(caminho, quantidade):
+    conexao = sqlite3.connect(caminho)
+    while conexao.execute('SELECT count(*) FROM questoes_novas').fetchone()[0] < quantidade:
+        deslocamento = conexao.execute('SELECT max(numero) FROM questoes_novas').fetchone()[0] + 1
+        colunas = ', '.join(COLUNAS)
+        origem = colunas.replace('numero', f'numero + {deslocamento}')
+        conexao.execute(f'INSERT INTO questoes_novas ({colunas}) SELECT {origem} FROM questoes_novas')
+    ids = [linha[0] for linha in conexao.execute('SELECT id FROM questoes_novas')]
+    conexao.commit()
+    conexao.close()
+    return ids
+
+
+def medir(cliente, urls):
+    """Média (ms) de tempo de parede por requisição"""
+    for url in urls[:3]:
+        resposta = cliente.get(url)
+        assert resposta.status_code == 200, resposta.get_data(as_text=True)
+    inicio = time.perf_counter()
+    for i in range(REPETICOES):
+        cliente.get(urls[i % len(urls)])
+    return (time.perf_counter() - inicio) / REPETICOES * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('banco', nargs='?', default=os.path.join('src', 'database', 'app.db'))
+    parser.add_argument('--questoes', type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, 'app.db')
+        shutil.copyfile(args.banco, caminho)
+        uri = f'sqlite:///{caminho}'
+        create_app({'SQLALCHEMY_DATABASE_URI': uri, 'CRIAR_ESQUEMA': True})
+        ids = completar(caminho, args.questoes)
+        random.seed(1)
+        por_id = [f'/api/questoes-novas/{i}' for i in random.sample(ids, min(len(ids), 200))]
+        cenarios = (
+            ('questão por id', por_id),
+            ('listagem filtrada', ['/api/questoes-novas?vestibular=PAS-UEM&per_page=20&page=3']),
+            ('lista PAS-UEM', ['/api/questoes_pas_uem']),
+        )
+
+        instantaneo = os.path.join(diretorio, 'questoes.instantaneo')
+        app = create_app({'SQLALCHEMY_DATABASE_URI': uri, 'INSTANTANEO_CAMINHO': instantaneo})
+        with app.app_context():
+            inicio = time.perf_counter()
+            linhas = publicar_instantaneo(instantaneo)
+            tempo = time.perf_counter() - inicio
+        print(f'Instantâneo: {linhas}, {os.path.getsize(instantaneo)} bytes, gerado em {tempo:.2f} s')
+
+        sem = create_app({'SQLALCHEMY_DATABASE_URI': uri, 'INSTANTANEO_CAMINHO': None}).test_client()
+        com = app.test_client()
+        print(f'Média de {REPETICOES} requisições (ms)')
+        for nome, urls in cenarios:
+            print(f'  {nome:18} ORM {medir(sem, urls):7.3f}   instantâneo {medir(com, urls):7.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Comparar bytes e CPU por resposta de /api/questoes-novas?per_page=100
+
+Mede a listagem com as visões full e summary, com o provedor JSON padrão do
+Flask (json da biblioteca padrão) e com o ProvedorJSON (orjson, se
+instalado), e o tempo só da consulta SQL da página com e sem a projeção. Roda sobre uma cópia do banco; se houver menos de 100 questões,
+a cópia é completada duplicando as existentes com outros números.
+
+Uso: python benchmarks/respostas_json.py [caminho/do/app.db]
+"""
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.app import create_app
+from src.models.user import db
+from src.services.serializacao import orjson
+
+TAMANHO_PAGINA = 100
+REPETICOES = 200
+COLUNAS = ('vestibular', 'ano', 'etapa', 'numero', 'materia', 'assunto', 'enunciado', 'alternativas',
+           'alternativas_numeracao', 'resposta_correta', 'alternativas_corretas', 'explicacao', 'dificuldade',
+           'created_at')
+
+
+def completar_pagina(caminho):
+    conexao = sqlite3.connect(caminho)
+    rodada = 1
+    while conexao.execute('SELECT count(*) FROM questoes_novas').fetchone()[0] < TAMANHO_PAGINA:
+        colunas = ', '.join(COLUNAS)
+        origem = colunas.replace('numero', f'numero + {rodada * 10000}')
+        conexao.execute(f'INSERT INTO questoes_novas ({colunas}) SELECT {origem} FROM questoes_novas')
+        rodada += 1
+    conexao.commit()
+    conexao.close()
+
+
+def medir(app, url):
+    cliente = app.test_client()
+    resposta = cliente.get(url)
+    assert resposta.status_code == 200, resposta.get_data(as_text=True)
+    inicio = time.process_time()
+    for _ in range(REPETICOES):
+        cliente.get(url)
+    return len(resposta.data), (time.process_time() - inicio) / REPETICOES * 1000
+
+
+def medir_consulta(app, campos):
+    """Tempo (ms) de montar a página de objetos, com o SELECT restrito a campos"""
+    from src.models.questao_nova import QuestaoNova
+    from src.models.tipos import projetar_consulta
+    with app.app_context():
+        inicio = time.perf_counter()
+        for _ in range(REPETICOES):
+            query = projetar_consulta(QuestaoNova.query, QuestaoNova, campos)
+            query.order_by(QuestaoNova.ano.desc(), QuestaoNova.numero.asc()).limit(TAMANHO_PAGINA).all()
+            db.session.remove()
+        return (time.perf_counter() - inicio) / REPETICOES * 1000
+
+
+def main():
+    origem = sys.argv[1] if len(sys.argv) > 1 else os.path.join('src', 'database', 'app.db')
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, 'app.db')
+        shutil.copyfile(origem, caminho)
+        create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{caminho}', 'CRIAR_ESQUEMA': True})
+        completar_pagina(caminho)
+
+        print(f'GET /api/questoes-novas?per_page={TAMANHO_PAGINA} (média de {REPETICOES} requisições)')
+        if orjson is None:
+            print('  (orjson não instalado: o ProvedorJSON usa o json da biblioteca padrão)')
+        for json_rapido, nome in ((False, 'json padrão'), (True, 'ProvedorJSON')):
+            app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{caminho}', 'JSON_RAPIDO': json_rapido})
+            for visao in ('full', 'summary'):
+                tamanho, cpu = medir(app, f'/api/questoes-novas?per_page={TAMANHO_PAGINA}&view={visao}')
+                print(f'  {nome:13} view={visao:8} {tamanho:9d} bytes  {cpu:7.2f} ms de CPU/resposta')
+
+        from src.models.questao_nova import QuestaoNova
+        print('Consulta da página (SELECT + objetos do ORM)')
+        for visao, campos in QuestaoNova.VISOES.items():
+            print(f'  view={visao:8} {medir_consulta(app, campos):7.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Comparar o custo de decodificar as listas de uma página de 100 questões
+
+Lê as colunas de lista de questoes_novas direto do SQLite e mede, para uma
+página de 100 questões, o formato antigo (um json.loads por coluna) contra o
+formato atual (ListaTexto, um str.split por coluna).
+
+Uso: python benchmarks/serializacao.py [caminho/do/app.db]
+"""
+import json
+import os
+import sqlite3
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.tipos import SEPARADOR_LISTA, ListaTexto
+
+COLUNAS = ('alternativas', 'alternativas_numeracao', 'alternativas_corretas')
+TAMANHO_PAGINA = 100
+REPETICOES = 500
+
+
+def carregar_listas(caminho):
+    conexao = sqlite3.connect(caminho)
+    linhas = conexao.execute(f"SELECT {', '.join(COLUNAS)} FROM questoes_novas").fetchall()
+    conexao.close()
+    if not linhas:
+        raise SystemExit('questoes_novas está vazia')
+
+    def decodificar(valor):
+        return json.loads(valor) if valor.startswith('[') else valor.split(SEPARADOR_LISTA)
+
+    listas = [[decodificar(valor) for valor in linha] for linha in linhas]
+    # Repetir as questões existentes até completar a página
+    return [listas[i % len(listas)] for i in range(TAMANHO_PAGINA)]
+
+
+def medir(funcao):
+    return min(timeit.repeat(funcao, number=REPETICOES, repeat=5)) / REPETICOES * 1e6
+
+
+def main():
+    caminho = sys.argv[1] if len(sys.argv) > 1 else os.path.join('src', 'database', 'app.db')
+    pagina = carregar_listas(caminho)
+
+    # O formato antigo gravava com json.dumps padrão (ensure_ascii=True)
+    antigo = [[json.dumps(lista) for lista in questao] for questao in pagina]
+    tipo = ListaTexto()
+    atual = [[tipo.process_bind_param(lista, None) for lista in questao] for questao in pagina]
+
+    def decodificar_antigo():
+        for questao in antigo:
+            for valor in questao:
+                json.loads(valor)
+
+    def decodificar_atual():
+        for questao in atual:
+            for valor in questao:
+                tipo.process_result_value(valor, None)
+
+    tempo_antigo = medir(decodificar_antigo)
+    tempo_atual = medir(decodificar_atual)
+    bytes_antigo = sum(len(v.encode()) for q in antigo for v in q)
+    bytes_atual = sum(len(v.encode()) for q in atual for v in q)
+
+    print(f'Página com {TAMANHO_PAGINA} questões ({len(COLUNAS)} colunas de lista cada)')
+    print(f'  JSON (json.loads):     {tempo_antigo:8.1f} µs/página  {bytes_antigo:8d} bytes')
+    print(f'  ListaTexto (split):    {tempo_atual:8.1f} µs/página  {bytes_atual:8d} bytes')
+    print(f'  Ganho na decodificação: {tempo_antigo / tempo_atual:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
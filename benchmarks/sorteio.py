@@ -0,0 +1,69 @@
+"""Medir o sorteio de simulados sobre um índice sintético de questões
+
+Monta um IndiceSorteio com N questões distribuídas por vestibular, matéria,
+dificuldade e ano (sem banco) e mede o tempo de gerar um simulado com cotas
+por matéria, com e sem questões excluídas.
+
+Uso: python benchmarks/sorteio.py [--questoes 1000000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.sorteio import IndiceSorteio
+
+VESTIBULARES = ('ENEM', 'PAS-UEM', 'FUVEST', 'UNICAMP', 'UFPR', 'UEM')
+MATERIAS = ('Biologia', 'Química', 'Física', 'Matemática', 'História', 'Geografia', 'Filosofia',
+            'Sociologia', 'Linguagens', 'Literatura', 'Inglês', 'Espanhol')
+DIFICULDADES = ('Fácil', 'Média', 'Difícil')
+ANOS = tuple(range(2000, 2025))
+REPETICOES = 1000
+
+COTAS = [
+    {'materia': 'Biologia', 'quantidade': 10, 'dificuldade': 'Média', 'ano_min': 2019, 'ano_max': 2023},
+    {'materia': 'Química', 'quantidade': 8, 'dificuldade': 'Média', 'ano_min': 2019, 'ano_max': 2023},
+    {'materia': ['Física', 'Matemática'], 'quantidade': 12, 'vestibular': 'ENEM'},
+]
+
+
+def linhas_sinteticas(total):
+    gerador = random.Random(0)
+    for questao_id in range(1, total + 1):
+        yield (gerador.choice(VESTIBULARES), gerador.choice(MATERIAS), gerador.choice(DIFICULDADES),
+               gerador.choice(ANOS), questao_id)
+
+
+def medir(funcao):
+    funcao()  # primeira chamada monta o cache de candidatos
+    inicio = time.perf_counter()
+    for _ in range(REPETICOES):
+        funcao()
+    return (time.perf_counter() - inicio) / REPETICOES * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--questoes', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    indice = IndiceSorteio()
+    inicio = time.perf_counter()
+    indice.montar(linhas_sinteticas(args.questoes))
+    print(f'Índice com {args.questoes} questões em {len(indice._baldes)} baldes: '
+          f'{time.perf_counter() - inicio:.2f}s para montar')
+
+    total = sum(c['quantidade'] for c in COTAS)
+    excluidas = frozenset(random.Random(1).sample(range(1, args.questoes + 1), args.questoes // 10))
+    sem_exclusao = medir(lambda: indice.sortear(COTAS, atualizar=False))
+    com_exclusao = medir(lambda: indice.sortear(COTAS, excluidas, atualizar=False))
+    print(f'Simulado com {total} questões em {len(COTAS)} cotas:')
+    print(f'  sem exclusões:                  {sem_exclusao:8.1f} µs')
+    print(f'  excluindo {len(excluidas)} respondidas: {com_exclusao:8.1f} µs')
+
+
+if __name__ == '__main__':
+    main()
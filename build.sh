@@ -28,5 +28,8 @@ cp -r dist/* ../src/static/
 echo "Voltando para o diretório raiz..."
 cd ..
 
+echo "Gerando as versões .gz/.br dos arquivos estáticos..."
+flask --app src.wsgi comprimir-estaticos
+
 echo "Build concluído!"
 
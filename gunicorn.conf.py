@@ -0,0 +1,41 @@
+# Configuração do gunicorn para produção: gunicorn -c gunicorn.conf.py src.wsgi:app
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# Processos para usar todos os núcleos e threads para sobrepor a espera de
+# E/S (SQLite, rede) dentro de cada processo. WEB_CONCURRENCY e
+# GUNICORN_THREADS permitem ajustar sem editar este arquivo.
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+
+# Carregar a aplicação uma vez no processo mestre, antes do fork; cada worker
+# abre suas próprias conexões em post_fork. As migrações e o instantâneo não
+# rodam aqui: o comando de início executa flask migrar e flask
+# publicar-instantaneo antes de iniciar o gunicorn.
+preload_app = True
+
+# Reciclar workers periodicamente para conter crescimento de memória; o
+# jitter evita que todos reiniciem ao mesmo tempo.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = 200
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+# Log de acesso desligado por padrão (custa vazão); GUNICORN_ACCESS_LOG=- liga
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # Conexões SQLite abertas no mestre não podem ser usadas por outro
+    # processo: descartar o pool herdado para que o worker crie o seu.
+    from src.models.user import db
+    from src.wsgi import app
+
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -0,0 +1,99 @@
+import os
+from flask import Flask
+from flask_cors import CORS
+from src.config import Config
+from src.models.user import db
+from src.services.banco import configurar_sqlite
+from src.services.cache_consultas import criar_cache_consultas
+from src.services.estaticos import ManifestoEstaticos
+from src.services.fila_escrita import FilaEscrita
+from src.services.serializacao import ProvedorJSON
+
+
+def _registrar_blueprints(app):
+    # Importadas aqui para que scripts que só usam os modelos não paguem
+    # pelo carregamento das rotas e serviços
+    from src.routes.user import user_bp
+    from src.routes.questoes import questoes_bp
+    from src.routes.questoes_novas import questoes_novas_bp
+    from src.routes.questoes_pas_uem import questoes_pas_uem_bp
+    from src.routes.desempenho import desempenho_bp
+    from src.routes.sincronizacao import sincronizacao_bp
+    from src.routes.exportacao import exportacao_bp
+
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(questoes_bp, url_prefix='/api')
+    app.register_blueprint(questoes_novas_bp)
+    app.register_blueprint(questoes_pas_uem_bp)
+    app.register_blueprint(desempenho_bp, url_prefix='/api')
+    app.register_blueprint(sincronizacao_bp, url_prefix='/api')
+    app.register_blueprint(exportacao_bp, url_prefix='/api')
+
+
+def create_app(config=None):
+    """Criar a aplicação Flask
+
+    config pode ser uma classe de configuração (veja src/config.py) ou um
+    dicionário com valores que sobrescrevem os de Config.
+    """
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.config.from_object(Config)
+    if isinstance(config, dict):
+        app.config.update(config)
+    elif config is not None:
+        app.config.from_object(config)
+
+    if app.config['JSON_RAPIDO']:
+        app.json = ProvedorJSON(app)
+
+    # Habilitar CORS para permitir requisições do frontend
+    CORS(app)
+
+    db.init_app(app)
+    with app.app_context():
+        configurar_sqlite(db.engine, app.config['SQLITE_PRAGMAS'])
+    app.extensions['fila_escrita'] = FilaEscrita(app, sincrona=app.config['FILA_ESCRITA_SINCRONA'])
+    app.extensions['cache_consultas'] = criar_cache_consultas(app.config)
+    if app.config['INSTANTANEO_CAMINHO']:
+        from src.services.instantaneo import LeitorInstantaneo
+        app.extensions['instantaneo'] = LeitorInstantaneo(app, app.config['INSTANTANEO_CAMINHO'])
+    _registrar_blueprints(app)
+
+    if app.config['METRICAS_ATIVAS']:
+        from src.services.metricas import instrumentar
+        with app.app_context():
+            instrumentar(app, db.engine)
+
+    from src.comandos import registrar_comandos
+    registrar_comandos(app)
+
+    if app.config['CRIAR_ESQUEMA']:
+        from src.services.migracoes import criar_esquema
+        with app.app_context():
+            criar_esquema()
+
+    # Lista e conteúdo dos arquivos estáticos, lidos uma vez na inicialização
+    estaticos = ManifestoEstaticos(app.static_folder)
+    app.extensions['estaticos'] = estaticos
+
+    @app.route('/assets/<path:filename>')
+    def serve_assets(filename):
+        """Serve static assets from the assets directory"""
+        resposta = estaticos.responder(f'assets/{filename}')
+        if resposta is None:
+            return "Asset not found", 404
+        return resposta
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        # Se for um arquivo específico que existe, serve ele
+        if path != "" and path in estaticos:
+            return estaticos.responder(path)
+        # Para todas as outras rotas, serve o index.html (SPA behavior)
+        resposta = estaticos.responder('index.html')
+        if resposta is None:
+            return "index.html not found", 404
+        return resposta
+
+    return app
@@ -0,0 +1,115 @@
+import gzip
+import sys
+import click
+from src.models.user import db
+from src.models.questao import Questao, ResultadoSimulado
+from src.models.questao_nova import QuestaoNova
+from src.services.importacao import TAMANHO_LOTE, importar_questoes
+from src.services.contadores import reconstruir_contadores
+from src.services.estaticos import comprimir_estaticos
+from src.services.exportacao import FORMATOS, ExportacaoInvalida, exportar, ler_filtros
+from src.services.instantaneo import publicar_instantaneo
+from src.services.migracoes import criar_esquema
+from src.services.planos import verificar_planos
+
+
+def registrar_comandos(app):
+    """Registrar os comandos de manutenção no `flask` CLI"""
+
+    @app.cli.command('migrar')
+    def migrar():
+        """Criar tabelas e aplicar as migrações pendentes do banco"""
+        aplicadas = criar_esquema()
+        if aplicadas:
+            click.echo(f"Migrações aplicadas: {', '.join(map(str, aplicadas))}")
+        else:
+            click.echo('Banco já está atualizado.')
+
+    @app.cli.command('importar-questoes')
+    @click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--tabela', type=click.Choice(['questoes_novas', 'questoes']), default='questoes_novas',
+                  help='Tabela de destino das questões.')
+    @click.option('--lote', default=TAMANHO_LOTE, show_default=True, help='Questões gravadas por transação.')
+    @click.option('--dry-run', is_flag=True, help='Apenas contar o que seria inserido ou atualizado.')
+    def importar(arquivo, tabela, lote, dry_run):
+        """Importar questões de um arquivo .json ou .jsonl (inserir ou atualizar)"""
+        modelo = QuestaoNova if tabela == 'questoes_novas' else Questao
+
+        def progresso(estatisticas):
+            click.echo(f"  {estatisticas['lidas']} lidas...", err=True)
+
+        estatisticas = importar_questoes(arquivo, modelo, tamanho_lote=lote, dry_run=dry_run, progresso=progresso)
+        for erro in estatisticas['erros']:
+            click.echo(f'  inválido: {erro}', err=True)
+        prefixo = '[dry-run] ' if dry_run else ''
+        click.echo(
+            f"{prefixo}{estatisticas['lidas']} lidas, {estatisticas['inseridas']} novas, "
+            f"{estatisticas['existentes']} já existentes (atualizadas se diferentes), "
+            f"{estatisticas['invalidas']} inválidas."
+        )
+
+    @app.cli.command('reconstruir-contadores')
+    def reconstruir():
+        """Recalcular as estatísticas materializadas a partir das tabelas"""
+        with db.engine.begin() as connection:
+            reconstruir_contadores(connection)
+        click.echo('Contadores reconstruídos.')
+
+    @app.cli.command('verificar-planos')
+    def verificar_planos_consulta():
+        """Falhar se alguma consulta dos endpoints deixar de usar índice"""
+        regressoes = verificar_planos(app)
+        for url, sql, problemas in regressoes:
+            click.echo(f'{url}\n  {" ".join(sql.split())}\n  -> {"; ".join(problemas)}', err=True)
+        if regressoes:
+            raise SystemExit(1)
+        click.echo('Todos os planos de consulta usam índices.')
+
+    @app.cli.command('comprimir-estaticos')
+    def comprimir():
+        """Gerar as variantes .gz/.br dos arquivos estáticos (rodar após o build do frontend)"""
+        gerados = comprimir_estaticos(app.static_folder)
+        click.echo(f'{gerados} arquivos comprimidos gerados em {app.static_folder}.')
+
+    @app.cli.command('publicar-instantaneo')
+    @click.option('--caminho', default=None, help='Arquivo de destino (padrão: INSTANTANEO_CAMINHO).')
+    def publicar(caminho):
+        """Gerar o instantâneo das questões lido pelos workers via mmap"""
+        caminho = caminho or app.config['INSTANTANEO_CAMINHO']
+        if not caminho:
+            raise click.UsageError('INSTANTANEO_CAMINHO não configurado; informe --caminho.')
+        linhas = publicar_instantaneo(caminho)
+        resumo = ', '.join(f'{tabela}: {quantidade}' for tabela, quantidade in linhas.items())
+        click.echo(f'Instantâneo publicado em {caminho} ({resumo}).')
+
+    @app.cli.command('exportar')
+    @click.argument('tabela', type=click.Choice(['questoes', 'questoes_novas', 'resultados']))
+    @click.option('--formato', type=click.Choice(list(FORMATOS)), default='ndjson', show_default=True)
+    @click.option('--saida', default='-', help='Arquivo de destino (.gz comprime); "-" é a saída padrão.')
+    @click.option('--filtro', multiple=True, metavar='CAMPO=VALOR',
+                  help='Filtro exato, como nas listagens (ex.: --filtro vestibular=ENEM). Pode repetir.')
+    @click.option('--busca', default=None, help='Texto da busca (só questões).')
+    def exportar_tabela(tabela, formato, saida, filtro, busca):
+        """Exportar questões ou resultados em NDJSON/CSV, lendo o banco em lotes"""
+        modelo = {'questoes': Questao, 'questoes_novas': QuestaoNova, 'resultados': ResultadoSimulado}[tabela]
+        try:
+            filtros = ler_filtros(modelo, dict(item.split('=', 1) for item in filtro))
+        except ValueError as e:
+            raise click.UsageError(f'Filtro inválido: {e}')
+        try:
+            pedacos = exportar(modelo, formato, filtros, busca)
+        except ExportacaoInvalida as e:
+            raise click.UsageError(str(e))
+
+        if saida == '-':
+            arquivo = sys.stdout
+        elif saida.endswith('.gz'):
+            arquivo = gzip.open(saida, 'wt', encoding='utf-8', newline='')
+        else:
+            arquivo = open(saida, 'w', encoding='utf-8', newline='')
+        try:
+            for pedaco in pedacos:
+                arquivo.write(pedaco)
+        finally:
+            if arquivo is not sys.stdout:
+                arquivo.close()
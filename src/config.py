@@ -0,0 +1,55 @@
+import os
+
+CAMINHO_BANCO = os.path.join(os.path.dirname(__file__), 'database', 'app.db')
+
+
+class Config:
+    """Configuração padrão (produção); valores sensíveis podem vir do ambiente"""
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT')
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', f'sqlite:///{CAMINHO_BANCO}')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Repassadas ao create_engine (pool, connect_args etc.)
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    # Criar tabelas e aplicar migrações dentro de create_app(). Em produção
+    # isso é um passo explícito: flask --app src.wsgi migrar
+    CRIAR_ESQUEMA = False
+    # Pragmas de cada conexão SQLite; None usa PRAGMAS_PADRAO (src/services/banco.py)
+    SQLITE_PRAGMAS = None
+    # Executar as escritas da fila na própria requisição, sem a thread de escrita
+    FILA_ESCRITA_SINCRONA = False
+    # Serializar as respostas JSON com o orjson, quando instalado
+    JSON_RAPIDO = True
+    # Métricas por endpoint em /metrics (formato Prometheus, só para acesso local)
+    METRICAS_ATIVAS = os.environ.get('METRICAS_ATIVAS') == '1'
+    # Perfilador amostral: grava as pilhas das requisições mais lentas que o
+    # limiar em arquivos .folded (exige METRICAS_ATIVAS)
+    PERFILADOR_ATIVO = os.environ.get('PERFILADOR_ATIVO') == '1'
+    PERFILADOR_LIMIAR_MS = int(os.environ.get('PERFILADOR_LIMIAR_MS', 500))
+    PERFILADOR_INTERVALO_MS = 5
+    PERFILADOR_DIRETORIO = os.environ.get('PERFILADOR_DIRETORIO', os.path.join(os.path.dirname(__file__), '..', 'perfis'))
+    # Instantâneo das questões mapeado em memória (flask publicar-instantaneo);
+    # None desliga e todas as leituras vão ao banco
+    INSTANTANEO_CAMINHO = os.environ.get('INSTANTANEO_CAMINHO', os.path.join(os.path.dirname(CAMINHO_BANCO), 'questoes.instantaneo'))
+
+    # Cache das páginas das listagens de questões: 'memoria' (por worker),
+    # 'sqlite' (arquivo local compartilhado pelos workers) ou None
+    CACHE_CONSULTAS = os.environ.get('CACHE_CONSULTAS', 'memoria') or None
+    CACHE_CONSULTAS_MAXIMO = 1024
+    CACHE_CONSULTAS_TTL = 300
+    CACHE_CONSULTAS_CAMINHO = os.environ.get(
+        'CACHE_CONSULTAS_CAMINHO', os.path.join(os.path.dirname(CAMINHO_BANCO), 'cache_consultas.db')
+    )
+
+
+class ConfigDesenvolvimento(Config):
+    CRIAR_ESQUEMA = True
+
+
+class ConfigTeste(Config):
+    TESTING = True
+    # Banco em memória; o Flask-SQLAlchemy usa um StaticPool para que todas
+    # as conexões enxerguem o mesmo banco
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    CRIAR_ESQUEMA = True
+    FILA_ESCRITA_SINCRONA = True
+    INSTANTANEO_CAMINHO = None
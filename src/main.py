@@ -3,62 +3,12 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
-from flask_cors import CORS
-from src.models.user import db
-from src.routes.user import user_bp
-from src.routes.questoes import questoes_bp
-from src.routes.questoes_novas import questoes_novas_bp
-from src.routes.questoes_pas_uem import questoes_pas_uem_bp
+from src.app import create_app
+from src.config import ConfigDesenvolvimento
 
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
-
-# Habilitar CORS para permitir requisições do frontend
-CORS(app)
-
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(questoes_bp, url_prefix='/api')
-app.register_blueprint(questoes_novas_bp)
-app.register_blueprint(questoes_pas_uem_bp)
-
-# uncomment if you need to use database
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-with app.app_context():
-    db.create_all()
-
-@app.route('/assets/<path:filename>')
-def serve_assets(filename):
-    """Serve static assets from the assets directory"""
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-        return "Static folder not configured", 404
-    
-    assets_path = os.path.join(static_folder_path, 'assets')
-    if os.path.exists(os.path.join(assets_path, filename)):
-        return send_from_directory(assets_path, filename)
-    else:
-        return "Asset not found", 404
-
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-        return "Static folder not configured", 404
-
-    # Se for um arquivo específico que existe, serve ele
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        # Para todas as outras rotas, serve o index.html (SPA behavior)
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return "index.html not found", 404
+# Servidor de desenvolvimento (cria/migra o banco ao iniciar); em produção
+# use o gunicorn (veja gunicorn.conf.py) após `flask --app src.wsgi migrar`
+app = create_app(ConfigDesenvolvimento)
 
 
 if __name__ == '__main__':
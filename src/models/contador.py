@@ -0,0 +1,13 @@
+from src.models.user import db
+
+class Contador(db.Model):
+    """Contagem materializada, mantida incrementalmente pelos eventos dos modelos
+
+    grupo identifica a tabela e a dimensão ("questoes.materia", "simulados.total")
+    e chave o valor da dimensão ("Biologia", "2023"; vazio para totais).
+    """
+    __tablename__ = 'contadores'
+    
+    grupo = db.Column(db.String(100), primary_key=True)
+    chave = db.Column(db.String(200), primary_key=True, default='')
+    valor = db.Column(db.Integer, nullable=False, default=0)
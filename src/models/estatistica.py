@@ -0,0 +1,79 @@
+from src.models.user import db
+
+class EstatisticaSimulado(db.Model):
+    """Agregados de todas as tentativas de um simulado, atualizados a cada resultado"""
+    __tablename__ = 'estatisticas_simulados'
+    
+    simulado_id = db.Column(db.Integer, db.ForeignKey('simulados.id'), primary_key=True)
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    soma_pontuacao = db.Column(db.Integer, nullable=False, default=0)
+    soma_questoes = db.Column(db.Integer, nullable=False, default=0)
+    soma_tempo_gasto = db.Column(db.Integer, nullable=False, default=0)  # em segundos
+    
+    def to_dict(self):
+        return {
+            'simulado_id': self.simulado_id,
+            'tentativas': self.tentativas,
+            'pontuacao_media': round(self.soma_pontuacao / self.tentativas, 2) if self.tentativas > 0 else 0,
+            'percentual_medio': round((self.soma_pontuacao / self.soma_questoes) * 100, 2) if self.soma_questoes > 0 else 0,
+            'tempo_medio': round(self.soma_tempo_gasto / self.tentativas, 1) if self.tentativas > 0 else 0
+        }
+
+class EstatisticaQuestao(db.Model):
+    """Agregados das respostas dadas a uma questão em simulados"""
+    __tablename__ = 'estatisticas_questoes'
+    
+    questao_id = db.Column(db.Integer, db.ForeignKey('questoes.id'), primary_key=True)
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    acertos = db.Column(db.Integer, nullable=False, default=0)
+    soma_tempo_gasto = db.Column(db.Integer, nullable=False, default=0)  # em segundos
+    
+    def to_dict(self):
+        return {
+            'questao_id': self.questao_id,
+            'tentativas': self.tentativas,
+            'acertos': self.acertos,
+            'percentual_acertos': round((self.acertos / self.tentativas) * 100, 2) if self.tentativas > 0 else 0,
+            'tempo_medio': round(self.soma_tempo_gasto / self.tentativas, 1) if self.tentativas > 0 else 0
+        }
+
+class EstatisticaUsuario(db.Model):
+    """Agregados de todos os resultados de um usuário, atualizados a cada resultado"""
+    __tablename__ = 'estatisticas_usuarios'
+    
+    usuario_nome = db.Column(db.String(100), primary_key=True)
+    resultados = db.Column(db.Integer, nullable=False, default=0)
+    soma_pontuacao = db.Column(db.Integer, nullable=False, default=0)
+    soma_questoes = db.Column(db.Integer, nullable=False, default=0)
+    soma_tempo_gasto = db.Column(db.Integer, nullable=False, default=0)  # em segundos
+    
+    def to_dict(self):
+        return {
+            'usuario_nome': self.usuario_nome,
+            'resultados': self.resultados,
+            'acertos': self.soma_pontuacao,
+            'questoes': self.soma_questoes,
+            'percentual_acertos': round((self.soma_pontuacao / self.soma_questoes) * 100, 2) if self.soma_questoes > 0 else 0,
+            'tempo_medio': round(self.soma_tempo_gasto / self.resultados, 1) if self.resultados > 0 else 0
+        }
+
+class EstatisticaUsuarioTopico(db.Model):
+    """Acertos e tempo de um usuário por matéria e assunto"""
+    __tablename__ = 'estatisticas_usuarios_topicos'
+    
+    usuario_nome = db.Column(db.String(100), primary_key=True)
+    materia = db.Column(db.String(100), primary_key=True)
+    assunto = db.Column(db.String(200), primary_key=True)  # '' quando a questão não tem assunto
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    acertos = db.Column(db.Integer, nullable=False, default=0)
+    soma_tempo_gasto = db.Column(db.Integer, nullable=False, default=0)  # em segundos
+    
+    def to_dict(self):
+        return {
+            'materia': self.materia,
+            'assunto': self.assunto or None,
+            'tentativas': self.tentativas,
+            'acertos': self.acertos,
+            'percentual_acertos': round((self.acertos / self.tentativas) * 100, 2) if self.tentativas > 0 else 0,
+            'tempo_medio': round(self.soma_tempo_gasto / self.tentativas, 1) if self.tentativas > 0 else 0
+        }
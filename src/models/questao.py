@@ -1,9 +1,23 @@
 from src.models.user import db
+from src.models.tipos import TAMANHO_TRECHO, ListaTexto, como_lista, projetar
+from sqlalchemy import func
 from datetime import datetime
 import json
 
 class Questao(db.Model):
     __tablename__ = 'questoes'
+    __table_args__ = (
+        # Chave natural da questão, usada também pelo upsert da importação
+        db.Index('uq_questoes_vestibular_ano_numero', 'vestibular', 'ano', 'numero', unique=True),
+        # Filtros da listagem já na ordem dela: ano DESC, numero ASC (e id, implícito);
+        # os de texto sem diferenciar maiúsculas (veja filtro_igual)
+        db.Index('ix_questoes_vestibular_ano_numero', db.text('vestibular COLLATE NOCASE'), db.desc('ano'), 'numero'),
+        db.Index('ix_questoes_materia_ano_numero', db.text('materia COLLATE NOCASE'), db.desc('ano'), 'numero'),
+        db.Index('ix_questoes_assunto_ano_numero', db.text('assunto COLLATE NOCASE'), db.desc('ano'), 'numero'),
+        db.Index('ix_questoes_dificuldade_ano_numero', 'dificuldade', db.desc('ano'), 'numero'),
+        # Ordem da paginação por cursor: ano DESC, numero ASC, id ASC
+        db.Index('ix_questoes_ano_numero', db.desc('ano'), 'numero', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     ano = db.Column(db.Integer, nullable=False)
@@ -14,11 +28,26 @@ class Questao(db.Model):
     materia = db.Column(db.String(100), nullable=False)
     assunto = db.Column(db.String(100), nullable=True)
     enunciado = db.Column(db.Text, nullable=False)
-    alternativas = db.Column(db.Text, nullable=False)  # JSON string
+    alternativas = db.Column(ListaTexto, nullable=False)  # Lista de alternativas
     resposta_correta = db.Column(db.String(1), nullable=False)
     explicacao = db.Column(db.Text, nullable=True)
     dificuldade = db.Column(db.String(20), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Também mantido por gatilho para escritas fora do ORM (veja src/services/sincronizacao.py)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Início do enunciado, calculado na consulta quando pedido (campo 'trecho')
+    trecho = db.query_expression()
+    
+    CAMPOS = ('id', 'ano', 'vestibular', 'dia', 'caderno', 'numero', 'materia', 'assunto', 'enunciado',
+              'alternativas', 'resposta_correta', 'explicacao', 'dificuldade', 'created_at', 'updated_at')
+    LISTAS = ('alternativas',)
+    # Visões das listagens (?view=); summary não lê enunciado, alternativas nem
+    # explicação do banco, só o trecho inicial do enunciado
+    VISOES = {
+        'summary': ('id', 'ano', 'vestibular', 'dia', 'caderno', 'numero', 'materia', 'assunto',
+                    'dificuldade', 'trecho'),
+        'full': CAMPOS,
+    }
     
     def __init__(self, ano, vestibular, numero, materia, enunciado, alternativas, resposta_correta, 
                  dia=None, caderno=None, assunto=None, explicacao=None, dificuldade=None):
@@ -30,31 +59,25 @@ class Questao(db.Model):
         self.materia = materia
         self.assunto = assunto
         self.enunciado = enunciado
-        self.alternativas = json.dumps(alternativas) if isinstance(alternativas, list) else alternativas
+        self.alternativas = como_lista(alternativas)
         self.resposta_correta = resposta_correta
         self.explicacao = explicacao
         self.dificuldade = dificuldade
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'ano': self.ano,
-            'vestibular': self.vestibular,
-            'dia': self.dia,
-            'caderno': self.caderno,
-            'numero': self.numero,
-            'materia': self.materia,
-            'assunto': self.assunto,
-            'enunciado': self.enunciado,
-            'alternativas': json.loads(self.alternativas) if self.alternativas else [],
-            'resposta_correta': self.resposta_correta,
-            'explicacao': self.explicacao,
-            'dificuldade': self.dificuldade,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+    @classmethod
+    def expressoes(cls):
+        """Campos calculados pelo banco, disponíveis em ?fields="""
+        return {'trecho': func.substr(cls.enunciado, 1, TAMANHO_TRECHO)}
+    
+    def to_dict(self, campos=None):
+        """Dicionário da questão; campos limita a projeção (veja VISOES)"""
+        return projetar(self, campos or self.CAMPOS, self.LISTAS)
 
 class Simulado(db.Model):
     __tablename__ = 'simulados'
+    __table_args__ = (
+        db.Index('ix_simulados_created_at', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(200), nullable=False)
@@ -62,6 +85,8 @@ class Simulado(db.Model):
     questoes_ids = db.Column(db.Text, nullable=False)  # JSON string com IDs das questões
     tempo_limite = db.Column(db.Integer, nullable=True)  # em minutos
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # JSON pronto do simulado com as questões na ordem, compilado na criação
+    conteudo = db.deferred(db.Column(db.Text, nullable=True))
     
     def __init__(self, nome, questoes_ids, descricao=None, tempo_limite=None):
         self.nome = nome
@@ -79,8 +104,23 @@ class Simulado(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+class SimuladoQuestao(db.Model):
+    """Questões de um simulado, na ordem em que devem ser apresentadas"""
+    __tablename__ = 'simulados_questoes'
+    __table_args__ = (
+        db.Index('ix_simulados_questoes_questao', 'questao_id'),
+    )
+    
+    simulado_id = db.Column(db.Integer, db.ForeignKey('simulados.id'), primary_key=True)
+    posicao = db.Column(db.Integer, primary_key=True)
+    questao_id = db.Column(db.Integer, db.ForeignKey('questoes.id'), nullable=False)
+
 class ResultadoSimulado(db.Model):
     __tablename__ = 'resultados_simulados'
+    __table_args__ = (
+        db.Index('ix_resultados_simulados_usuario', 'usuario_nome', 'created_at'),
+        db.Index('ix_resultados_simulados_simulado', 'simulado_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     simulado_id = db.Column(db.Integer, db.ForeignKey('simulados.id'), nullable=False)
@@ -1,9 +1,23 @@
 from src.models.user import db
+from src.models.tipos import TAMANHO_TRECHO, ListaTexto, como_lista, projetar
+from sqlalchemy import func
 from datetime import datetime
-import json
 
 class QuestaoNova(db.Model):
     __tablename__ = 'questoes_novas'
+    __table_args__ = (
+        # Chave natural da questão, usada pelo upsert da importação
+        db.Index('uq_questoes_novas_vestibular_ano_numero', 'vestibular', db.desc('ano'), 'numero', unique=True),
+        # Listagem completa do PAS-UEM, ordenada só pelo número
+        db.Index('ix_questoes_novas_vestibular_numero', 'vestibular', 'numero'),
+        # Filtros de texto da listagem, sem diferenciar maiúsculas (veja
+        # filtro_igual), já na ordem ano DESC, numero ASC
+        db.Index('ix_questoes_novas_vestibular_ano_numero', db.text('vestibular COLLATE NOCASE'), db.desc('ano'), 'numero'),
+        db.Index('ix_questoes_novas_materia_ano_numero', db.text('materia COLLATE NOCASE'), db.desc('ano'), 'numero'),
+        db.Index('ix_questoes_novas_assunto_ano_numero', db.text('assunto COLLATE NOCASE'), db.desc('ano'), 'numero'),
+        # Ordem padrão da listagem (e da paginação por cursor)
+        db.Index('ix_questoes_novas_ano_numero', db.desc('ano'), 'numero', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     vestibular = db.Column(db.String(50), nullable=False)
@@ -13,13 +27,28 @@ class QuestaoNova(db.Model):
     materia = db.Column(db.String(100), nullable=False)
     assunto = db.Column(db.String(200))
     enunciado = db.Column(db.Text, nullable=False)
-    alternativas = db.Column(db.Text, nullable=False)  # JSON string com lista de alternativas
-    alternativas_numeracao = db.Column(db.Text, nullable=False)  # JSON string com numeração (01, 02, 04, 08, 16)
+    alternativas = db.Column(ListaTexto, nullable=False)  # Lista de alternativas
+    alternativas_numeracao = db.Column(ListaTexto, nullable=False)  # Numeração (01, 02, 04, 08, 16)
     resposta_correta = db.Column(db.String(10), nullable=False)  # Soma das alternativas corretas
-    alternativas_corretas = db.Column(db.Text, nullable=False)  # JSON string com lista das alternativas corretas
+    alternativas_corretas = db.Column(ListaTexto, nullable=False)  # Lista das alternativas corretas
     explicacao = db.Column(db.Text)
     dificuldade = db.Column(db.String(20), default='Média')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Também mantido por gatilho para escritas fora do ORM (veja src/services/sincronizacao.py)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Início do enunciado, calculado na consulta quando pedido (campo 'trecho')
+    trecho = db.query_expression()
+    
+    CAMPOS = ('id', 'vestibular', 'ano', 'etapa', 'numero', 'materia', 'assunto', 'enunciado', 'alternativas',
+              'alternativas_numeracao', 'resposta_correta', 'alternativas_corretas', 'explicacao',
+              'dificuldade', 'created_at', 'updated_at')
+    LISTAS = ('alternativas', 'alternativas_numeracao', 'alternativas_corretas')
+    # Visões das listagens (?view=); summary não lê enunciado, alternativas nem
+    # explicação do banco, só o trecho inicial do enunciado
+    VISOES = {
+        'summary': ('id', 'vestibular', 'ano', 'etapa', 'numero', 'materia', 'assunto', 'dificuldade', 'trecho'),
+        'full': CAMPOS,
+    }
     
     def __init__(self, vestibular, ano, numero, materia, enunciado, alternativas, 
                  alternativas_numeracao, resposta_correta, alternativas_corretas,
@@ -31,29 +60,19 @@ class QuestaoNova(db.Model):
         self.materia = materia
         self.assunto = assunto
         self.enunciado = enunciado
-        self.alternativas = json.dumps(alternativas) if isinstance(alternativas, list) else alternativas
-        self.alternativas_numeracao = json.dumps(alternativas_numeracao) if isinstance(alternativas_numeracao, list) else alternativas_numeracao
+        self.alternativas = como_lista(alternativas)
+        self.alternativas_numeracao = como_lista(alternativas_numeracao)
         self.resposta_correta = resposta_correta
-        self.alternativas_corretas = json.dumps(alternativas_corretas) if isinstance(alternativas_corretas, list) else alternativas_corretas
+        self.alternativas_corretas = como_lista(alternativas_corretas)
         self.explicacao = explicacao
         self.dificuldade = dificuldade
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'vestibular': self.vestibular,
-            'ano': self.ano,
-            'etapa': self.etapa,
-            'numero': self.numero,
-            'materia': self.materia,
-            'assunto': self.assunto,
-            'enunciado': self.enunciado,
-            'alternativas': json.loads(self.alternativas) if self.alternativas else [],
-            'alternativas_numeracao': json.loads(self.alternativas_numeracao) if self.alternativas_numeracao else [],
-            'resposta_correta': self.resposta_correta,
-            'alternativas_corretas': json.loads(self.alternativas_corretas) if self.alternativas_corretas else [],
-            'explicacao': self.explicacao,
-            'dificuldade': self.dificuldade,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+    @classmethod
+    def expressoes(cls):
+        """Campos calculados pelo banco, disponíveis em ?fields="""
+        return {'trecho': func.substr(cls.enunciado, 1, TAMANHO_TRECHO)}
+    
+    def to_dict(self, campos=None):
+        """Dicionário da questão; campos limita a projeção (veja VISOES)"""
+        return projetar(self, campos or self.CAMPOS, self.LISTAS)
 
@@ -0,0 +1,127 @@
+import json
+import string
+from datetime import datetime
+from sqlalchemy.orm import load_only, with_expression
+from sqlalchemy.types import Text, TypeDecorator
+
+# Separador de unidade do ASCII: não aparece em texto de questões
+SEPARADOR_LISTA = '\x1f'
+
+# Colunas sempre carregadas nas projeções: chave da ordenação e do cursor
+CAMPOS_ORDENACAO = ('id', 'ano', 'numero')
+# Caracteres do enunciado no campo calculado 'trecho'
+TAMANHO_TRECHO = 200
+# Filtros de texto das listagens, comparados sem diferenciar maiúsculas de
+# minúsculas (COLLATE NOCASE, que só iguala as letras ASCII)
+FILTROS_SEM_CAIXA = ('vestibular', 'materia', 'assunto')
+_MINUSCULAS_ASCII = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+class ListaTexto(TypeDecorator):
+    """Lista de strings guardada em uma coluna de texto
+
+    Os itens são unidos pelo separador de unidade do ASCII, de modo que ler
+    a lista é um único str.split(), bem mais barato que um json.loads por
+    coluna em cada linha. O atributo do modelo já é uma lista Python.
+    """
+
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        itens = [str(item) for item in value]
+        if any(SEPARADOR_LISTA in item for item in itens):
+            raise ValueError('Item de lista contém o caractere separador \\x1f')
+        return SEPARADOR_LISTA.join(itens)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if value == '':
+            return []
+        return value.split(SEPARADOR_LISTA)
+
+
+def como_lista(valor):
+    """Aceitar uma lista ou a string JSON usada pelo formato antigo"""
+    if valor is None or isinstance(valor, list):
+        return valor
+    if isinstance(valor, tuple):
+        return list(valor)
+    return json.loads(valor)
+
+
+def sem_caixa(valor):
+    """Valor normalizado do jeito que o COLLATE NOCASE do SQLite o compara"""
+    return valor.translate(_MINUSCULAS_ASCII) if isinstance(valor, str) else valor
+
+
+def filtro_igual(modelo, campo, valor):
+    """Condição campo = valor de um filtro das listagens
+
+    Os campos de FILTROS_SEM_CAIXA comparam com COLLATE NOCASE, atendidos
+    pelos índices declarados com a mesma collation.
+    """
+    coluna = getattr(modelo, campo)
+    if campo in FILTROS_SEM_CAIXA:
+        coluna = coluna.collate('NOCASE')
+    return coluna == valor
+
+
+class CampoInvalido(ValueError):
+    """Visão ou campo pedido na projeção não existe no modelo"""
+
+
+def projetar(objeto, campos, listas=()):
+    """Dicionário só com os campos pedidos, na ordem pedida
+
+    Só os atributos listados são lidos, então colunas que a consulta não
+    carregou não disparam novas consultas. Campos em listas viram sempre
+    uma lista e datas são enviadas em ISO 8601.
+    """
+    dados = {}
+    for campo in campos:
+        valor = getattr(objeto, campo)
+        if campo in listas:
+            valor = list(valor) if valor else []
+        elif isinstance(valor, datetime):
+            valor = valor.isoformat()
+        dados[campo] = valor
+    return dados
+
+
+def resolver_campos(modelo, visao=None, campos=None):
+    """Campos pedidos por ?fields=a,b,c ou pela visão nomeada (modelo.VISOES)
+
+    fields tem precedência; sem nenhum dos dois vale a visão 'full'.
+    """
+    if campos:
+        campos = tuple(dict.fromkeys(campo.strip() for campo in campos.split(',') if campo.strip()))
+        disponiveis = (*modelo.CAMPOS, *modelo.expressoes())
+        invalidos = [campo for campo in campos if campo not in disponiveis]
+        if invalidos or not campos:
+            raise CampoInvalido(f"Campos inválidos: {', '.join(invalidos)}")
+        return campos
+    try:
+        return modelo.VISOES[visao or 'full']
+    except KeyError:
+        raise CampoInvalido(f'Visão inválida: {visao}')
+
+
+def projetar_consulta(query, modelo, campos):
+    """Ler do banco só as colunas usadas pelos campos
+
+    As demais colunas (ex.: enunciado e explicacao, os textos longos) ficam
+    fora do SELECT. Campos calculados (modelo.expressoes(), ex.: trecho) são
+    avaliados pelo próprio banco.
+    """
+    expressoes = modelo.expressoes()
+    colunas = [
+        getattr(modelo, campo) for campo in dict.fromkeys((*CAMPOS_ORDENACAO, *campos))
+        if campo not in expressoes
+    ]
+    opcoes = [load_only(*colunas)]
+    opcoes += [with_expression(getattr(modelo, campo), expressoes[campo]) for campo in campos if campo in expressoes]
+    return query.options(*opcoes)
@@ -0,0 +1,50 @@
+from flask import Blueprint, request, jsonify
+from src.services.desempenho import perfil, percentil, tendencia, topicos_mais_fracos
+
+desempenho_bp = Blueprint('desempenho', __name__)
+
+@desempenho_bp.route('/desempenho/<usuario_nome>', methods=['GET'])
+def get_desempenho(usuario_nome):
+    """Resumo e acertos por matéria/assunto do usuário"""
+    try:
+        dados = perfil(usuario_nome)
+        if dados is None:
+            return jsonify({'error': 'Usuário sem resultados'}), 404
+        return jsonify(dados)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@desempenho_bp.route('/desempenho/<usuario_nome>/tendencia', methods=['GET'])
+def get_tendencia(usuario_nome):
+    """Percentual de acertos dos últimos resultados, com média móvel"""
+    try:
+        limite = request.args.get('limite', 20, type=int)
+        return jsonify({'usuario_nome': usuario_nome, 'resultados': tendencia(usuario_nome, limite)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@desempenho_bp.route('/desempenho/<usuario_nome>/topicos-fracos', methods=['GET'])
+def get_topicos_fracos(usuario_nome):
+    """Tópicos com menor percentual de acertos do usuário"""
+    try:
+        topicos = topicos_mais_fracos(
+            usuario_nome,
+            limite=request.args.get('limite', 5, type=int),
+            minimo_tentativas=request.args.get('minimo', 3, type=int)
+        )
+        if topicos is None:
+            return jsonify({'error': 'Usuário sem resultados'}), 404
+        return jsonify({'usuario_nome': usuario_nome, 'topicos': topicos})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@desempenho_bp.route('/desempenho/<usuario_nome>/percentil', methods=['GET'])
+def get_percentil(usuario_nome):
+    """Percentil do usuário entre todos os usuários, pelo percentual de acertos"""
+    try:
+        dados = percentil(usuario_nome)
+        if dados is None:
+            return jsonify({'error': 'Usuário sem resultados'}), 404
+        return jsonify(dados)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
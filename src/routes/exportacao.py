@@ -0,0 +1,43 @@
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from src.models.questao import Questao, ResultadoSimulado
+from src.models.questao_nova import QuestaoNova
+from src.models.tipos import CampoInvalido, resolver_campos
+from src.services.exportacao import FORMATOS, ExportacaoInvalida, comprimir, exportar, ler_filtros
+
+exportacao_bp = Blueprint('exportacao', __name__)
+
+# Tabela exportada por cada URL
+TABELAS = {
+    'questoes': Questao,
+    'questoes-novas': QuestaoNova,
+    'resultados': ResultadoSimulado,
+}
+
+@exportacao_bp.route('/exportar/<tabela>', methods=['GET'])
+def exportar_tabela(tabela):
+    """Exportar uma tabela inteira (ou filtrada) em NDJSON ou CSV, em streaming"""
+    try:
+        if tabela not in TABELAS:
+            return jsonify({'error': 'Tabela não encontrada'}), 404
+        modelo = TABELAS[tabela]
+        
+        formato = request.args.get('formato', 'ndjson')
+        campos = None
+        if modelo is not ResultadoSimulado:
+            campos = resolver_campos(modelo, request.args.get('view'), request.args.get('fields'))
+        # Validar tudo antes de começar a enviar: depois do primeiro pedaço não
+        # há mais como responder com um erro
+        pedacos = exportar(modelo, formato, ler_filtros(modelo, request.args), request.args.get('busca'), campos)
+        
+        cabecalhos = {'Content-Disposition': f'attachment; filename={tabela}.{formato}'}
+        if request.accept_encodings['gzip'] > 0:
+            pedacos = comprimir(pedacos)
+            cabecalhos['Content-Encoding'] = 'gzip'
+        resposta = Response(stream_with_context(pedacos), mimetype=FORMATOS[formato], headers=cabecalhos)
+        resposta.vary.add('Accept-Encoding')
+        return resposta
+        
+    except (CampoInvalido, ExportacaoInvalida) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
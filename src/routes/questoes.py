@@ -1,60 +1,105 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from src.models.questao import db, Questao, Simulado, ResultadoSimulado
-from sqlalchemy import and_, or_
-import json
+from src.models.estatistica import EstatisticaQuestao, EstatisticaSimulado
+from src.models.tipos import CampoInvalido, projetar_consulta, resolver_campos
+from src.services.cache_consultas import cache_consultas, chave_consulta
+from src.services.cache_resposta import responder
+from src.services.contadores import contagem_total, ler_contadores
+from src.services.exportacao import aplicar_filtros
+from src.services.facetas import IndiceFacetas
+from src.services.instantaneo import pagina_json, resposta_json, tabela_instantaneo
+from src.services.paginacao import CursorInvalido, paginar_por_cursor
+from src.services.resultados import TempoInvalido, registrar_resultado
+from src.services.simulados import conteudo_simulado, criar_simulado, questoes_do_simulado
+from src.services.sorteio import CotaInsuficiente, FiltroInvalido, IndiceSorteio, questoes_respondidas
+from src.services.versao import versao_atual
 
 questoes_bp = Blueprint('questoes', __name__)
 
+_facetas_questoes = IndiceFacetas(Questao, ('ano', 'vestibular', 'materia', 'assunto', 'dificuldade'))
+_indice_sorteio = IndiceSorteio(Questao)
+
+# Parâmetros que mudam a resposta da listagem (e entram na chave do cache)
+PARAMETROS_LISTAGEM = ('ano', 'vestibular', 'materia', 'assunto', 'dificuldade', 'busca',
+                       'page', 'per_page', 'cursor', 'view', 'fields')
+PADROES_LISTAGEM = {'page': '1', 'per_page': '10', 'view': 'full'}
+
+def _listar_questoes():
+    """Corpo JSON (bytes) da listagem pedida em request.args"""
+    # Parâmetros de filtro
+    ano = request.args.get('ano', type=int)
+    vestibular = request.args.get('vestibular')
+    materia = request.args.get('materia')
+    assunto = request.args.get('assunto')
+    dificuldade = request.args.get('dificuldade')
+    busca = request.args.get('busca')
+    
+    # Parâmetros de paginação
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 10, type=int)
+    cursor = request.args.get('cursor')
+    
+    # Campos de cada questão na resposta (?fields=a,b ou ?view=summary|full)
+    campos = resolver_campos(Questao, request.args.get('view'), request.args.get('fields'))
+    
+    # Filtros exatos com a visão completa saem do instantâneo em memória
+    instantaneo = None
+    if not busca and cursor is None and campos == Questao.VISOES['full']:
+        instantaneo = tabela_instantaneo('questoes')
+    if instantaneo is not None:
+        posicoes = instantaneo.filtrar({
+            'ano': ano, 'vestibular': vestibular, 'materia': materia,
+            'assunto': assunto, 'dificuldade': dificuldade
+        })
+        return pagina_json(instantaneo, posicoes, page, per_page)
+    
+    # Construir query, lendo só as colunas dos campos pedidos (mesmos filtros da exportação)
+    query = aplicar_filtros(projetar_consulta(Questao.query, Questao, campos), Questao, {
+        'ano': ano, 'vestibular': vestibular, 'materia': materia,
+        'assunto': assunto, 'dificuldade': dificuldade
+    }, busca)
+    
+    # Modo cursor (opcional): sem COUNT(*) e sem OFFSET
+    if cursor is not None:
+        itens, next_cursor = paginar_por_cursor(query, Questao, cursor, per_page)
+        return current_app.json.dumps({
+            'questoes': [q.to_dict(campos) for q in itens],
+            'per_page': per_page,
+            'next_cursor': next_cursor,
+            'has_next': next_cursor is not None
+        }).encode('utf-8')
+    
+    # Mesma ordem do instantâneo e do cursor (após a relevância, quando há busca)
+    query = query.order_by(Questao.ano.desc(), Questao.numero.asc(), Questao.id.asc())
+    
+    # Executar query com paginação
+    questoes_paginadas = query.paginate(
+        page=page, 
+        per_page=per_page, 
+        error_out=False
+    )
+    
+    return current_app.json.dumps({
+        'questoes': [q.to_dict(campos) for q in questoes_paginadas.items],
+        'total': questoes_paginadas.total,
+        'pages': questoes_paginadas.pages,
+        'current_page': page,
+        'per_page': per_page
+    }).encode('utf-8')
+
 @questoes_bp.route('/questoes', methods=['GET'])
 def get_questoes():
     """Buscar questões com filtros opcionais"""
     try:
-        # Parâmetros de filtro
-        ano = request.args.get('ano', type=int)
-        vestibular = request.args.get('vestibular')
-        materia = request.args.get('materia')
-        assunto = request.args.get('assunto')
-        dificuldade = request.args.get('dificuldade')
-        busca = request.args.get('busca')
-        
-        # Parâmetros de paginação
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-        
-        # Construir query
-        query = Questao.query
-        
-        if ano:
-            query = query.filter(Questao.ano == ano)
-        if vestibular:
-            query = query.filter(Questao.vestibular.ilike(f'%{vestibular}%'))
-        if materia:
-            query = query.filter(Questao.materia.ilike(f'%{materia}%'))
-        if assunto:
-            query = query.filter(Questao.assunto.ilike(f'%{assunto}%'))
-        if dificuldade:
-            query = query.filter(Questao.dificuldade == dificuldade)
-        if busca:
-            query = query.filter(or_(
-                Questao.enunciado.ilike(f'%{busca}%'),
-                Questao.assunto.ilike(f'%{busca}%')
-            ))
-        
-        # Executar query com paginação
-        questoes_paginadas = query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
-        
-        return jsonify({
-            'questoes': [q.to_dict() for q in questoes_paginadas.items],
-            'total': questoes_paginadas.total,
-            'pages': questoes_paginadas.pages,
-            'current_page': page,
-            'per_page': per_page
-        })
+        # Páginas já montadas ficam em cache até a próxima escrita em questoes
+        chave = chave_consulta('questoes', request.args, PARAMETROS_LISTAGEM, PADROES_LISTAGEM)
+        corpo = cache_consultas().obter(chave, versao_atual('questoes'), _listar_questoes)
+        return resposta_json(corpo)
         
+    except CursorInvalido:
+        return jsonify({'error': 'Cursor inválido'}), 400
+    except CampoInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -62,6 +107,13 @@ def get_questoes():
 def get_questao(questao_id):
     """Buscar uma questão específica"""
     try:
+        instantaneo = tabela_instantaneo('questoes')
+        if instantaneo is not None:
+            dados = instantaneo.json_por_id(questao_id)
+            if dados is None:
+                return jsonify({'error': 'Questão não encontrada'}), 404
+            return resposta_json(dados)
+        
         questao = Questao.query.get_or_404(questao_id)
         return jsonify(questao.to_dict())
     except Exception as e:
@@ -99,20 +151,30 @@ def create_questao():
 
 @questoes_bp.route('/questoes/filtros', methods=['GET'])
 def get_filtros():
-    """Obter opções disponíveis para filtros"""
+    """Obter opções disponíveis para filtros, com a quantidade de questões de cada uma"""
     try:
-        anos = db.session.query(Questao.ano.distinct()).all()
-        vestibulares = db.session.query(Questao.vestibular.distinct()).all()
-        materias = db.session.query(Questao.materia.distinct()).all()
-        assuntos = db.session.query(Questao.assunto.distinct()).filter(Questao.assunto.isnot(None)).all()
-        dificuldades = db.session.query(Questao.dificuldade.distinct()).filter(Questao.dificuldade.isnot(None)).all()
+        # Filtros já escolhidos restringem as contagens das demais facetas
+        contagens = _facetas_questoes.contagens({
+            'ano': request.args.get('ano', type=int),
+            'vestibular': request.args.get('vestibular'),
+            'materia': request.args.get('materia'),
+            'assunto': request.args.get('assunto'),
+            'dificuldade': request.args.get('dificuldade')
+        })
         
         return jsonify({
-            'anos': sorted([a[0] for a in anos], reverse=True),
-            'vestibulares': sorted([v[0] for v in vestibulares]),
-            'materias': sorted([m[0] for m in materias]),
-            'assuntos': sorted([a[0] for a in assuntos]),
-            'dificuldades': sorted([d[0] for d in dificuldades])
+            'anos': sorted(contagens['ano'], reverse=True),
+            'vestibulares': sorted(contagens['vestibular']),
+            'materias': sorted(contagens['materia']),
+            'assuntos': sorted(contagens['assunto']),
+            'dificuldades': sorted(contagens['dificuldade']),
+            'contagens': {
+                'anos': contagens['ano'],
+                'vestibulares': contagens['vestibular'],
+                'materias': contagens['materia'],
+                'assuntos': contagens['assunto'],
+                'dificuldades': contagens['dificuldade']
+            }
         })
         
     except Exception as e:
@@ -133,18 +195,52 @@ def create_simulado():
     try:
         data = request.get_json()
         
-        simulado = Simulado(
+        simulado = criar_simulado(
             nome=data['nome'],
             questoes_ids=data['questoes_ids'],
             descricao=data.get('descricao'),
             tempo_limite=data.get('tempo_limite')
         )
+        db.session.commit()
+        
+        return jsonify(simulado.to_dict()), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@questoes_bp.route('/simulados/gerar', methods=['POST'])
+def gerar_simulado():
+    """Gerar um simulado sorteando questões por cotas (ex.: 10 de Biologia, 8 de Química)"""
+    try:
+        data = request.get_json()
+        
+        # Filtros comuns valem para todas as cotas; os da cota têm precedência
+        filtros = data.get('filtros', {})
+        cotas = [{**filtros, **cota} for cota in data.get('cotas', [])]
+        if not cotas:
+            return jsonify({'error': 'Informe ao menos uma cota'}), 400
+        
+        excluir = frozenset()
+        usuario_nome = data.get('usuario_nome')
+        if usuario_nome and data.get('excluir_respondidas', True):
+            excluir = questoes_respondidas(usuario_nome)
         
-        db.session.add(simulado)
+        questoes_ids = _indice_sorteio.sortear(cotas, excluir, data.get('semente'))
+        
+        simulado = criar_simulado(
+            nome=data.get('nome', 'Simulado gerado'),
+            questoes_ids=questoes_ids,
+            descricao=data.get('descricao'),
+            tempo_limite=data.get('tempo_limite')
+        )
         db.session.commit()
         
         return jsonify(simulado.to_dict()), 201
         
+    except (CotaInsuficiente, FiltroInvalido) as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -153,41 +249,61 @@ def create_simulado():
 def get_simulado(simulado_id):
     """Buscar um simulado específico com suas questões"""
     try:
-        simulado = Simulado.query.get_or_404(simulado_id)
-        questoes_ids = json.loads(simulado.questoes_ids)
-        questoes = Questao.query.filter(Questao.id.in_(questoes_ids)).all()
-        
-        simulado_dict = simulado.to_dict()
-        simulado_dict['questoes'] = [q.to_dict() for q in questoes]
-        
-        return jsonify(simulado_dict)
+        # Conteúdo compilado na criação, servido da memória com ETag
+        conteudo = conteudo_simulado(simulado_id)
+        if conteudo is None:
+            return jsonify({'error': 'Simulado não encontrado'}), 404
+        return responder(conteudo)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @questoes_bp.route('/simulados/<int:simulado_id>/resultado', methods=['POST'])
 def salvar_resultado_simulado(simulado_id):
-    """Salvar resultado de um simulado"""
+    """Salvar resultado de um simulado, corrigido no servidor"""
     try:
         data = request.get_json()
         
-        resultado = ResultadoSimulado(
-            simulado_id=simulado_id,
+        simulado = db.session.get(Simulado, simulado_id)
+        if simulado is None:
+            return jsonify({'error': 'Simulado não encontrado'}), 404
+        
+        # Pontuação e total são calculados a partir do gabarito, não do cliente;
+        # a gravação passa pela fila de escrita, que já faz o commit
+        resultado = registrar_resultado(
+            simulado_id,
             usuario_nome=data['usuario_nome'],
             respostas=data['respostas'],
-            pontuacao=data['pontuacao'],
-            total_questoes=data['total_questoes'],
             tempo_gasto=data.get('tempo_gasto')
         )
         
-        db.session.add(resultado)
-        db.session.commit()
-        
-        return jsonify(resultado.to_dict()), 201
+        return jsonify(resultado), 201
         
+    except TempoInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@questoes_bp.route('/simulados/<int:simulado_id>/estatisticas', methods=['GET'])
+def get_estatisticas_simulado(simulado_id):
+    """Obter os agregados pré-calculados de um simulado e de suas questões"""
+    try:
+        if db.session.get(Simulado, simulado_id) is None:
+            return jsonify({'error': 'Simulado não encontrado'}), 404
+        questoes_ids = [linha[0] for linha in questoes_do_simulado(simulado_id, Questao.id)]
+        
+        estatistica = db.session.get(EstatisticaSimulado, simulado_id) or EstatisticaSimulado(
+            simulado_id=simulado_id, tentativas=0, soma_pontuacao=0, soma_questoes=0, soma_tempo_gasto=0
+        )
+        por_questao = EstatisticaQuestao.query.filter(EstatisticaQuestao.questao_id.in_(questoes_ids)).all()
+        
+        estatistica_dict = estatistica.to_dict()
+        estatistica_dict['questoes'] = [e.to_dict() for e in por_questao]
+        
+        return jsonify(estatistica_dict)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @questoes_bp.route('/resultados/<usuario_nome>', methods=['GET'])
 def get_resultados_usuario(usuario_nome):
     """Buscar resultados de um usuário"""
@@ -201,28 +317,19 @@ def get_resultados_usuario(usuario_nome):
 def get_estatisticas():
     """Obter estatísticas gerais do banco de questões"""
     try:
-        total_questoes = Questao.query.count()
-        total_simulados = Simulado.query.count()
-        total_resultados = ResultadoSimulado.query.count()
-        
-        questoes_por_vestibular = db.session.query(
-            Questao.vestibular, 
-            db.func.count(Questao.id)
-        ).group_by(Questao.vestibular).all()
-        
-        questoes_por_materia = db.session.query(
-            Questao.materia, 
-            db.func.count(Questao.id)
-        ).group_by(Questao.materia).all()
+        # Contadores materializados: leitura por chave, sem varrer as tabelas
+        contadores = ler_contadores(
+            'questoes.total', 'simulados.total', 'resultados_simulados.total',
+            'questoes.vestibular', 'questoes.materia'
+        )
         
         return jsonify({
-            'total_questoes': total_questoes,
-            'total_simulados': total_simulados,
-            'total_resultados': total_resultados,
-            'questoes_por_vestibular': dict(questoes_por_vestibular),
-            'questoes_por_materia': dict(questoes_por_materia)
+            'total_questoes': contagem_total(contadores, 'questoes'),
+            'total_simulados': contagem_total(contadores, 'simulados'),
+            'total_resultados': contagem_total(contadores, 'resultados_simulados'),
+            'questoes_por_vestibular': contadores['questoes.vestibular'],
+            'questoes_por_materia': contadores['questoes.materia']
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-
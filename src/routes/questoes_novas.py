@@ -1,77 +1,122 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from src.models.user import db
 from src.models.questao_nova import QuestaoNova
-from sqlalchemy import or_, and_
+from src.models.tipos import CampoInvalido, projetar_consulta, resolver_campos
+from src.models.questao import ResultadoSimulado, Simulado
+from src.services.cache_consultas import cache_consultas, chave_consulta
+from src.services.contadores import contagem_total, ler_contadores
+from src.services.exportacao import aplicar_filtros
+from src.services.facetas import IndiceFacetas
+from src.services.instantaneo import pagina_json, resposta_json, tabela_instantaneo
+from src.services.gabarito import (
+    AlternativaInvalida, obter_gabarito, obter_gabaritos, para_lista, para_mascara, pontuar
+)
+from src.services.paginacao import CursorInvalido, paginar_por_cursor
+from src.services.desempenho import acumular_topico
+from src.services.resultados import TempoInvalido, salvar_resultado
+from src.services.versao import versao_atual
 
 questoes_novas_bp = Blueprint('questoes_novas', __name__)
 
+_facetas_questoes_novas = IndiceFacetas(QuestaoNova, ('ano', 'materia', 'assunto', 'vestibular'))
+
+# Parâmetros que mudam a resposta da listagem (e entram na chave do cache)
+PARAMETROS_LISTAGEM = ('busca', 'ano', 'materia', 'assunto', 'vestibular',
+                       'page', 'per_page', 'cursor', 'view', 'fields')
+PADROES_LISTAGEM = {'page': '1', 'per_page': '10', 'view': 'full'}
+
+def _listar_questoes_novas():
+    """Corpo JSON (bytes) da listagem pedida em request.args"""
+    # Parâmetros de paginação
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 10, type=int)
+    cursor = request.args.get('cursor')
+    
+    # Parâmetros de filtro
+    busca = request.args.get('busca', '')
+    ano = request.args.get('ano', '')
+    materia = request.args.get('materia', '')
+    assunto = request.args.get('assunto', '')
+    vestibular = request.args.get('vestibular', '')
+    
+    # Campos de cada questão na resposta (?fields=a,b ou ?view=summary|full)
+    campos = resolver_campos(QuestaoNova, request.args.get('view'), request.args.get('fields'))
+    
+    # Filtros exatos com a visão completa saem do instantâneo em memória
+    instantaneo = None
+    if not busca and cursor is None and campos == QuestaoNova.VISOES['full']:
+        instantaneo = tabela_instantaneo('questoes_novas')
+    if instantaneo is not None:
+        posicoes = instantaneo.filtrar({
+            'ano': int(ano) if ano else None, 'materia': materia,
+            'assunto': assunto, 'vestibular': vestibular
+        })
+        return pagina_json(instantaneo, posicoes, page, per_page, navegacao=True)
+    
+    # Construir query base, lendo só as colunas dos campos pedidos (mesmos filtros da exportação)
+    query = aplicar_filtros(projetar_consulta(QuestaoNova.query, QuestaoNova, campos), QuestaoNova, {
+        'ano': int(ano) if ano else None, 'materia': materia,
+        'assunto': assunto, 'vestibular': vestibular
+    }, busca)
+    
+    # Ordenar por ano e número (após a relevância, quando há busca)
+    query = query.order_by(QuestaoNova.ano.desc(), QuestaoNova.numero.asc())
+    
+    # Modo cursor (opcional): sem COUNT(*) e sem OFFSET
+    if cursor is not None:
+        itens, next_cursor = paginar_por_cursor(query, QuestaoNova, cursor, per_page)
+        return current_app.json.dumps({
+            'questoes': [questao.to_dict(campos) for questao in itens],
+            'per_page': per_page,
+            'next_cursor': next_cursor,
+            'has_next': next_cursor is not None
+        }).encode('utf-8')
+    
+    # Paginar
+    questoes_paginadas = query.paginate(
+        page=page, 
+        per_page=per_page, 
+        error_out=False
+    )
+    
+    # Converter para dicionário
+    questoes = [questao.to_dict(campos) for questao in questoes_paginadas.items]
+    
+    return current_app.json.dumps({
+        'questoes': questoes,
+        'total': questoes_paginadas.total,
+        'pages': questoes_paginadas.pages,
+        'current_page': page,
+        'per_page': per_page,
+        'has_next': questoes_paginadas.has_next,
+        'has_prev': questoes_paginadas.has_prev
+    }).encode('utf-8')
+
 @questoes_novas_bp.route('/api/questoes-novas', methods=['GET'])
 def listar_questoes_novas():
     try:
-        # Parâmetros de paginação
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-        
-        # Parâmetros de filtro
-        busca = request.args.get('busca', '')
-        ano = request.args.get('ano', '')
-        materia = request.args.get('materia', '')
-        assunto = request.args.get('assunto', '')
-        vestibular = request.args.get('vestibular', '')
-        
-        # Construir query base
-        query = QuestaoNova.query
-        
-        # Aplicar filtros
-        if busca:
-            query = query.filter(
-                or_(
-                    QuestaoNova.enunciado.contains(busca),
-                    QuestaoNova.assunto.contains(busca)
-                )
-            )
-        
-        if ano:
-            query = query.filter(QuestaoNova.ano == int(ano))
-        
-        if materia:
-            query = query.filter(QuestaoNova.materia.contains(materia))
-        
-        if assunto:
-            query = query.filter(QuestaoNova.assunto.contains(assunto))
-        
-        if vestibular:
-            query = query.filter(QuestaoNova.vestibular.contains(vestibular))
-        
-        # Ordenar por ano e número
-        query = query.order_by(QuestaoNova.ano.desc(), QuestaoNova.numero.asc())
-        
-        # Paginar
-        questoes_paginadas = query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
-        
-        # Converter para dicionário
-        questoes = [questao.to_dict() for questao in questoes_paginadas.items]
-        
-        return jsonify({
-            'questoes': questoes,
-            'total': questoes_paginadas.total,
-            'pages': questoes_paginadas.pages,
-            'current_page': page,
-            'per_page': per_page,
-            'has_next': questoes_paginadas.has_next,
-            'has_prev': questoes_paginadas.has_prev
-        })
+        # Páginas já montadas ficam em cache até a próxima escrita em questoes_novas
+        chave = chave_consulta('questoes-novas', request.args, PARAMETROS_LISTAGEM, PADROES_LISTAGEM)
+        corpo = cache_consultas().obter(chave, versao_atual('questoes_novas'), _listar_questoes_novas)
+        return resposta_json(corpo)
         
+    except CursorInvalido:
+        return jsonify({'error': 'Cursor inválido'}), 400
+    except CampoInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @questoes_novas_bp.route('/api/questoes-novas/<int:questao_id>', methods=['GET'])
 def obter_questao_nova(questao_id):
     try:
+        instantaneo = tabela_instantaneo('questoes_novas')
+        if instantaneo is not None:
+            dados = instantaneo.json_por_id(questao_id)
+            if dados is None:
+                return jsonify({'error': 'Questão não encontrada'}), 404
+            return resposta_json(dados)
+        
         questao = QuestaoNova.query.get_or_404(questao_id)
         return jsonify(questao.to_dict())
     except Exception as e:
@@ -80,17 +125,25 @@ def obter_questao_nova(questao_id):
 @questoes_novas_bp.route('/api/questoes-novas/filtros', methods=['GET'])
 def obter_filtros_questoes_novas():
     try:
-        # Obter valores únicos para filtros
-        anos = db.session.query(QuestaoNova.ano).distinct().order_by(QuestaoNova.ano.desc()).all()
-        materias = db.session.query(QuestaoNova.materia).distinct().order_by(QuestaoNova.materia).all()
-        assuntos = db.session.query(QuestaoNova.assunto).filter(QuestaoNova.assunto.isnot(None)).distinct().order_by(QuestaoNova.assunto).all()
-        vestibulares = db.session.query(QuestaoNova.vestibular).distinct().order_by(QuestaoNova.vestibular).all()
+        # Valores únicos e contagens vêm do índice de facetas em memória
+        contagens = _facetas_questoes_novas.contagens({
+            'ano': request.args.get('ano', type=int),
+            'materia': request.args.get('materia'),
+            'assunto': request.args.get('assunto'),
+            'vestibular': request.args.get('vestibular')
+        })
         
         return jsonify({
-            'anos': [ano[0] for ano in anos],
-            'materias': [materia[0] for materia in materias],
-            'assuntos': [assunto[0] for assunto in assuntos if assunto[0]],
-            'vestibulares': [vestibular[0] for vestibular in vestibulares]
+            'anos': sorted(contagens['ano'], reverse=True),
+            'materias': sorted(contagens['materia']),
+            'assuntos': sorted(contagens['assunto']),
+            'vestibulares': sorted(contagens['vestibular']),
+            'contagens': {
+                'anos': contagens['ano'],
+                'materias': contagens['materia'],
+                'assuntos': contagens['assunto'],
+                'vestibulares': contagens['vestibular']
+            }
         })
         
     except Exception as e:
@@ -101,62 +154,129 @@ def verificar_resposta(questao_id):
     try:
         data = request.get_json()
         alternativas_selecionadas = data.get('alternativas_selecionadas', [])
+        if not isinstance(alternativas_selecionadas, list):
+            return jsonify({'error': 'alternativas_selecionadas deve ser uma lista'}), 400
         
-        questao = QuestaoNova.query.get_or_404(questao_id)
-        
-        # Converter alternativas selecionadas para conjunto
-        selecionadas_set = set(alternativas_selecionadas)
-        corretas_set = set(questao.to_dict()['alternativas_corretas'])
-        
-        # Verificar se a resposta está correta
-        resposta_correta = selecionadas_set == corretas_set
-        
-        # Calcular pontuação parcial
-        acertos = len(selecionadas_set.intersection(corretas_set))
-        erros = len(selecionadas_set.difference(corretas_set))
-        total_corretas = len(corretas_set)
+        # Gabarito vem do cache em memória, sem consulta ao banco
+        gabarito = obter_gabarito(questao_id)
+        if gabarito is None:
+            return jsonify({'error': 'Questão não encontrada'}), 404
         
-        pontuacao_parcial = max(0, acertos - erros) / total_corretas if total_corretas > 0 else 0
+        selecionadas = para_mascara(alternativas_selecionadas)
+        correto, acertos, erros, pontuacao_parcial = pontuar(selecionadas, gabarito.mascara)
         
         return jsonify({
-            'correto': resposta_correta,
-            'alternativas_corretas': list(corretas_set),
+            'correto': correto,
+            'alternativas_corretas': para_lista(gabarito.mascara),
             'alternativas_selecionadas': alternativas_selecionadas,
             'acertos': acertos,
             'erros': erros,
-            'pontuacao_parcial': round(pontuacao_parcial * 100, 1),
-            'explicacao': questao.explicacao,
-            'resposta_esperada': questao.resposta_correta
+            'pontuacao_parcial': pontuacao_parcial,
+            'explicacao': gabarito.explicacao,
+            'resposta_esperada': gabarito.resposta_correta
         })
         
+    except AlternativaInvalida as e:
+        return jsonify({'error': f'Alternativa inválida: {e}'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@questoes_novas_bp.route('/api/questoes-novas/verificar-respostas', methods=['POST'])
+def verificar_respostas():
+    """Corrigir um simulado inteiro em uma única requisição"""
+    try:
+        data = request.get_json()
+        respostas = data.get('respostas', {})
+        dados_resultado = data.get('resultado')
+        if not isinstance(respostas, dict):
+            return jsonify({'error': 'respostas deve ser um objeto {questao_id: [alternativas]}'}), 400
+        invalidas = sorted(questao_id for questao_id, alternativas in respostas.items() if not isinstance(alternativas, list))
+        if invalidas:
+            return jsonify({'error': f'As alternativas devem ser uma lista: {", ".join(invalidas)}'}), 400
+        
+        try:
+            selecionadas = {int(questao_id): para_mascara(alternativas) for questao_id, alternativas in respostas.items()}
+        except ValueError as e:
+            return jsonify({'error': f'Resposta inválida: {e}'}), 400
+        
+        # Todos os gabaritos de uma vez (cache em memória + um único IN para os ausentes)
+        gabaritos = obter_gabaritos(list(selecionadas))
+        
+        resultados = {}
+        por_topico = {}
+        nao_encontradas = []
+        total_corretas = 0
+        soma_pontuacao = 0
+        for questao_id, mascara in selecionadas.items():
+            gabarito = gabaritos.get(questao_id)
+            if gabarito is None:
+                nao_encontradas.append(questao_id)
+                continue
+            correto, acertos, erros, pontuacao_parcial = pontuar(mascara, gabarito.mascara)
+            total_corretas += correto
+            soma_pontuacao += pontuacao_parcial
+            acumular_topico(por_topico, gabarito.materia, gabarito.assunto, correto)
+            resultados[questao_id] = {
+                'correto': correto,
+                'alternativas_corretas': para_lista(gabarito.mascara),
+                'alternativas_selecionadas': para_lista(mascara),
+                'acertos': acertos,
+                'erros': erros,
+                'pontuacao_parcial': pontuacao_parcial,
+                'explicacao': gabarito.explicacao,
+                'resposta_esperada': gabarito.resposta_correta
+            }
+        
+        total_questoes = len(resultados)
+        resposta = {
+            'resultados': resultados,
+            'nao_encontradas': nao_encontradas,
+            'total_questoes': total_questoes,
+            'total_corretas': total_corretas,
+            'pontuacao_parcial_media': round(soma_pontuacao / total_questoes, 1) if total_questoes > 0 else 0
+        }
+        
+        # Opcionalmente registrar o resultado do simulado na mesma requisição
+        if dados_resultado:
+            try:
+                simulado_id = int(dados_resultado.get('simulado_id'))
+            except (TypeError, ValueError):
+                simulado_id = None
+            if simulado_id is None or db.session.get(Simulado, simulado_id) is None:
+                return jsonify({'error': 'Simulado não encontrado'}), 404
+            resultado = ResultadoSimulado(
+                simulado_id=simulado_id,
+                usuario_nome=dados_resultado['usuario_nome'],
+                respostas=respostas,
+                pontuacao=total_corretas,
+                total_questoes=total_questoes,
+                tempo_gasto=dados_resultado.get('tempo_gasto')
+            )
+            resposta['resultado'] = salvar_resultado(resultado, por_topico)
+        
+        return jsonify(resposta)
+        
+    except TempoInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @questoes_novas_bp.route('/api/questoes-novas/estatisticas', methods=['GET'])
 def estatisticas_questoes_novas():
     try:
-        total_questoes = QuestaoNova.query.count()
-        
-        # Estatísticas por matéria
-        materias_stats = db.session.query(
-            QuestaoNova.materia,
-            db.func.count(QuestaoNova.id)
-        ).group_by(QuestaoNova.materia).all()
-        
-        # Estatísticas por ano
-        anos_stats = db.session.query(
-            QuestaoNova.ano,
-            db.func.count(QuestaoNova.id)
-        ).group_by(QuestaoNova.ano).order_by(QuestaoNova.ano.desc()).all()
-        
-        # Estatísticas por vestibular
-        vestibulares_stats = db.session.query(
-            QuestaoNova.vestibular,
-            db.func.count(QuestaoNova.id)
-        ).group_by(QuestaoNova.vestibular).all()
+        # Contadores materializados: leitura por chave, sem varrer a tabela
+        contadores = ler_contadores(
+            'questoes_novas.total', 'questoes_novas.materia',
+            'questoes_novas.ano', 'questoes_novas.vestibular'
+        )
+        
+        materias_stats = sorted(contadores['questoes_novas.materia'].items())
+        anos_stats = sorted(((int(ano), n) for ano, n in contadores['questoes_novas.ano'].items()), reverse=True)
+        vestibulares_stats = sorted(contadores['questoes_novas.vestibular'].items())
         
         return jsonify({
-            'total_questoes': total_questoes,
+            'total_questoes': contagem_total(contadores, 'questoes_novas'),
             'por_materia': [{'materia': m[0], 'quantidade': m[1]} for m in materias_stats],
             'por_ano': [{'ano': a[0], 'quantidade': a[1]} for a in anos_stats],
             'por_vestibular': [{'vestibular': v[0], 'quantidade': v[1]} for v in vestibulares_stats]
@@ -164,4 +284,3 @@ def estatisticas_questoes_novas():
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-
@@ -1,20 +1,41 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, current_app, jsonify, request
 from src.models.questao_nova import QuestaoNova
+from src.models.tipos import CampoInvalido, projetar_consulta, resolver_campos
+from src.services.cache_resposta import CacheRespostas, RespostaCacheada, responder
+from src.services.instantaneo import tabela_instantaneo
+from src.services.versao import versao_atual
 
 questoes_pas_uem_bp = Blueprint('questoes_pas_uem', __name__)
 
+# Lista serializada do PAS UEM, refeita apenas quando questoes_novas muda
+_cache_pas_uem = CacheRespostas()
+
+def _serializar_questoes_pas_uem(campos, precomprimir):
+    instantaneo = tabela_instantaneo('questoes_novas') if campos == QuestaoNova.VISOES['full'] else None
+    if instantaneo is not None:
+        # JSONs prontos do instantâneo, na ordem do número
+        posicoes = sorted(instantaneo.filtrar({'vestibular': 'PAS-UEM'}), key=instantaneo.numeros.__getitem__)
+        return RespostaCacheada(b'[' + b','.join(instantaneo.json_posicao(p) for p in posicoes) + b']', precomprimir=precomprimir)
+    
+    query = projetar_consulta(QuestaoNova.query, QuestaoNova, campos)
+    questoes = query.filter_by(vestibular='PAS-UEM').order_by(QuestaoNova.numero.asc()).all()
+    questoes_dict = [questao.to_dict(campos) for questao in questoes]
+    return RespostaCacheada(current_app.json.dumps(questoes_dict).encode('utf-8'), precomprimir=precomprimir)
+
 @questoes_pas_uem_bp.route('/api/questoes_pas_uem', methods=['GET'])
 def listar_questoes_pas_uem():
     """Listar todas as questões do PAS UEM sem paginação para compatibilidade com o frontend"""
     try:
-        # Buscar todas as questões do PAS UEM
-        questoes = QuestaoNova.query.filter_by(vestibular='PAS-UEM').order_by(QuestaoNova.numero.asc()).all()
-        
-        # Converter para dicionário
-        questoes_dict = [questao.to_dict() for questao in questoes]
-        
-        return jsonify(questoes_dict)
+        # Campos de cada questão na resposta (?fields=a,b ou ?view=summary|full)
+        campos = resolver_campos(QuestaoNova, request.args.get('view'), request.args.get('fields'))
+        # Só as visões nomeadas ficam em cache; combinações de fields= são montadas na hora
+        versao = None if request.args.get('fields') else versao_atual('questoes_novas')
+        chave = 'pas-uem:' + ','.join(campos)
+        # Respostas fora do cache são usadas uma vez só: nada de pré-compressão
+        cacheada = _cache_pas_uem.obter(chave, versao, lambda: _serializar_questoes_pas_uem(campos, versao is not None))
+        return responder(cacheada)
         
+    except CampoInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-
@@ -0,0 +1,28 @@
+from flask import Blueprint, request, jsonify
+from src.models.questao import Questao
+from src.models.questao_nova import QuestaoNova
+from src.services.sincronizacao import LIMITE_SINCRONIZACAO, sincronizar
+
+sincronizacao_bp = Blueprint('sincronizacao', __name__)
+
+# Tabela de questões de cada URL e os filtros aceitos por ela
+TABELAS = {
+    'questoes': (Questao, ('vestibular', 'materia', 'ano')),
+    'questoes-novas': (QuestaoNova, ('vestibular', 'materia', 'ano')),
+}
+
+@sincronizacao_bp.route('/sincronizacao/<tabela>', methods=['GET'])
+def get_sincronizacao(tabela):
+    """Questões inseridas, alteradas ou removidas desde a versão since"""
+    try:
+        if tabela not in TABELAS:
+            return jsonify({'error': 'Tabela não encontrada'}), 404
+        modelo, colunas = TABELAS[tabela]
+        
+        since = request.args.get('since', 0, type=int)
+        limite = request.args.get('limite', LIMITE_SINCRONIZACAO, type=int)
+        filtros = {coluna: request.args.get(coluna, type=int if coluna == 'ano' else None) for coluna in colunas}
+        
+        return jsonify(sincronizar(modelo, since=since, limite=limite, filtros=filtros))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,43 @@
+from sqlalchemy import event
+
+# Pragmas aplicados a cada nova conexão SQLite (veja SQLITE_PRAGMAS em src/config.py).
+# journal_mode=WAL deixa leitores e o escritor trabalharem ao mesmo tempo e,
+# com synchronous=NORMAL, o commit não espera um fsync por transação.
+PRAGMAS_PADRAO = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+    'cache_size': -16000,
+}
+
+
+def configurar_sqlite(engine, pragmas=None):
+    """Registrar o evento que aplica os pragmas em cada conexão do engine"""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = PRAGMAS_PADRAO if pragmas is None else pragmas
+
+    @event.listens_for(engine, 'connect')
+    def _aplicar_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for nome, valor in pragmas.items():
+                cursor.execute(f'PRAGMA {nome}={valor}')
+        finally:
+            cursor.close()
+
+
+def iniciar_escrita(connection):
+    """Abrir a transação com BEGIN IMMEDIATE, reservando a escrita logo no início
+
+    O pysqlite só emite BEGIN (DEFERRED) antes do primeiro INSERT/UPDATE; uma
+    transação que leu antes de escrever pode então receber SQLITE_BUSY sem
+    passar pelo busy_timeout. Com o lock reservado na abertura, a espera por
+    outro escritor respeita o busy_timeout.
+    """
+    if connection.dialect.name != 'sqlite':
+        return
+    if not connection.connection.driver_connection.in_transaction:
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
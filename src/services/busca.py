@@ -0,0 +1,121 @@
+import re
+from sqlalchemy import column, false, or_, select, table, text
+
+# Tabela de conteúdo -> tabela virtual FTS5 correspondente
+TABELAS_BUSCA = {
+    'questoes': 'questoes_fts',
+    'questoes_novas': 'questoes_novas_fts',
+}
+
+COLUNAS_BUSCA = ('enunciado', 'assunto', 'explicacao')
+
+# Pesos do bm25 na mesma ordem de COLUNAS_BUSCA: o assunto é curto e muito
+# específico, o enunciado é o texto principal e a explicação só desempata.
+PESOS_RANKING = 'bm25(5.0, 10.0, 1.0)'
+
+_disponibilidade = {}
+
+
+def configurar_busca(connection):
+    """Criar as tabelas FTS5 e os gatilhos que as mantêm sincronizadas"""
+    if connection.dialect.name != 'sqlite':
+        return
+
+    colunas = ', '.join(COLUNAS_BUSCA)
+    novos = ', '.join(f'new.{c}' for c in COLUNAS_BUSCA)
+    antigos = ', '.join(f'old.{c}' for c in COLUNAS_BUSCA)
+
+    for tabela, fts in TABELAS_BUSCA.items():
+        existia = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nome"),
+            {'nome': fts}
+        ).first() is not None
+
+        # remove_diacritics faz "ação" e "acao" gerarem o mesmo token
+        connection.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{colunas}, content='{tabela}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2')"
+        ))
+        connection.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tabela} BEGIN
+                INSERT INTO {fts}(rowid, {colunas}) VALUES (new.id, {novos});
+            END
+        """))
+        connection.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tabela} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {colunas}) VALUES ('delete', old.id, {antigos});
+            END
+        """))
+        connection.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {colunas} ON {tabela} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {colunas}) VALUES ('delete', old.id, {antigos});
+                INSERT INTO {fts}(rowid, {colunas}) VALUES (new.id, {novos});
+            END
+        """))
+
+        if not existia:
+            # Indexar as questões que já estavam no banco
+            connection.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+            connection.execute(text(f"INSERT INTO {fts}({fts}, rank) VALUES ('rank', '{PESOS_RANKING}')"))
+
+        _disponibilidade[fts] = True
+
+
+def _busca_disponivel(session, fts):
+    """Verificar (uma única vez por processo) se o índice FTS5 existe"""
+    if fts not in _disponibilidade:
+        bind = session.get_bind()
+        if bind.dialect.name != 'sqlite':
+            _disponibilidade[fts] = False
+        else:
+            _disponibilidade[fts] = session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nome"),
+                {'nome': fts}
+            ).first() is not None
+    return _disponibilidade[fts]
+
+
+def expressao_fts(busca):
+    """Converter o texto digitado em uma expressão MATCH do FTS5
+
+    Cada palavra vira um termo entre aspas com busca por prefixo, de modo que
+    a busca funcione enquanto o usuário ainda está digitando.
+    """
+    termos = re.findall(r'\w+', busca or '')
+    if not termos:
+        return None
+    return ' '.join(f'"{termo}"*' for termo in termos)
+
+
+def aplicar_busca(query, modelo, busca, ordenar=True):
+    """Filtrar a query pelo texto de busca, ordenando pela relevância
+
+    Usa o índice FTS5 quando disponível e recai no LIKE sobre enunciado e
+    assunto caso contrário (por exemplo, em bancos que não são SQLite).
+    """
+    fts = TABELAS_BUSCA[modelo.__tablename__]
+
+    if not _busca_disponivel(query.session, fts):
+        return query.filter(or_(
+            modelo.enunciado.ilike(f'%{busca}%'),
+            modelo.assunto.ilike(f'%{busca}%')
+        ))
+
+    expressao = expressao_fts(busca)
+    if expressao is None:
+        # Só pontuação: nenhum termo a procurar, então nenhuma questão corresponde
+        return query.filter(false())
+
+    indice = table(fts, column('rowid'), column('rank'))
+    resultados = select(
+        indice.c.rowid.label('id'),
+        indice.c.rank.label('rank')
+    ).where(
+        text(f'{fts} MATCH :expressao').bindparams(expressao=expressao)
+    ).subquery()
+
+    query = query.join(resultados, resultados.c.id == modelo.id)
+    if ordenar:
+        query = query.order_by(resultados.c.rank)
+    return query
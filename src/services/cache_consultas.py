@@ -0,0 +1,188 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+from flask import current_app
+
+
+def chave_consulta(prefixo, args, parametros, padroes=None):
+    """Chave estável para os parâmetros de uma listagem
+
+    Só entram os parâmetros que o endpoint lê (um ?_=timestamp não cria
+    outra entrada); vazios e iguais ao padrão são descartados e o restante
+    vai em ordem alfabética, então ?page=1&materia=X e ?materia=X geram a
+    mesma chave.
+    """
+    padroes = padroes or {}
+    itens = sorted(
+        (nome, valor.strip()) for nome in parametros for valor in args.getlist(nome)
+        if valor.strip() and valor.strip() != padroes.get(nome)
+    )
+    return f'{prefixo}?{urlencode(itens)}'
+
+
+class BackendMemoria:
+    """Entradas no próprio processo, descartadas pela ordem de uso (LRU)"""
+
+    def __init__(self, maximo=1024):
+        self.maximo = maximo
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def ler(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None:
+                self._itens.move_to_end(chave)
+            return item
+
+    def gravar(self, chave, versao, expira, valor):
+        with self._lock:
+            self._itens[chave] = (versao, expira, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.maximo:
+                self._itens.popitem(last=False)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+
+class BackendSQLite:
+    """Entradas em um arquivo SQLite local, compartilhado pelos workers
+
+    Fica fora do banco principal para não disputar a trava de escrita com
+    os resultados. O último acesso só é regravado quando tem mais de
+    INTERVALO_ACESSO segundos, então o descarte é um LRU aproximado.
+    """
+
+    INTERVALO_ACESSO = 10
+    # Gravações entre duas podas do excesso de entradas
+    GRAVACOES_POR_PODA = 64
+
+    def __init__(self, caminho, maximo=10000):
+        self.caminho = caminho
+        self.maximo = maximo
+        self._local = threading.local()
+        self._gravacoes = 0
+        with self._conexao() as conexao:
+            conexao.execute("""
+                CREATE TABLE IF NOT EXISTS cache_consultas (
+                    chave TEXT NOT NULL PRIMARY KEY,
+                    versao INTEGER NOT NULL,
+                    expira REAL NOT NULL,
+                    acesso REAL NOT NULL,
+                    valor BLOB NOT NULL
+                )
+            """)
+            conexao.execute('CREATE INDEX IF NOT EXISTS ix_cache_consultas_acesso ON cache_consultas (acesso)')
+
+    def _conexao(self):
+        # Uma conexão por thread e por processo (o gunicorn faz fork após o preload)
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None or self._local.pid != os.getpid():
+            conexao = sqlite3.connect(self.caminho, timeout=5, isolation_level=None)
+            conexao.execute('PRAGMA journal_mode=WAL')
+            conexao.execute('PRAGMA synchronous=OFF')
+            self._local.conexao = conexao
+            self._local.pid = os.getpid()
+        return conexao
+
+    def ler(self, chave):
+        conexao = self._conexao()
+        linha = conexao.execute(
+            'SELECT versao, expira, acesso, valor FROM cache_consultas WHERE chave = ?', (chave,)
+        ).fetchone()
+        if linha is None:
+            return None
+        versao, expira, acesso, valor = linha
+        agora = time.time()
+        if agora - acesso > self.INTERVALO_ACESSO:
+            conexao.execute('UPDATE cache_consultas SET acesso = ? WHERE chave = ?', (agora, chave))
+        return versao, expira, valor
+
+    def gravar(self, chave, versao, expira, valor):
+        conexao = self._conexao()
+        conexao.execute(
+            'INSERT OR REPLACE INTO cache_consultas (chave, versao, expira, acesso, valor) VALUES (?, ?, ?, ?, ?)',
+            (chave, versao, expira, time.time(), valor)
+        )
+        self._gravacoes += 1
+        if self._gravacoes % self.GRAVACOES_POR_PODA == 0:
+            conexao.execute("""
+                DELETE FROM cache_consultas WHERE chave IN (
+                    SELECT chave FROM cache_consultas ORDER BY acesso DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.maximo,))
+
+    def limpar(self):
+        self._conexao().execute('DELETE FROM cache_consultas')
+
+
+class CacheConsultas:
+    """Cache das páginas serializadas das listagens, com versão e TTL
+
+    Uma entrada vale enquanto a versão dos dados (versoes_dados, mantida por
+    gatilhos a cada escrita nas questões) for a mesma de quando foi gravada e
+    por no máximo ttl segundos. Sem backend, obter() só constrói.
+    """
+
+    def __init__(self, backend=None, ttl=300):
+        self.backend = backend
+        self.ttl = ttl
+        self.acertos = 0
+        self.faltas = 0
+        self.invalidadas = 0
+
+    def obter(self, chave, versao, construir):
+        """Devolver o corpo em cache ou construí-lo (bytes) com construir()"""
+        if self.backend is None or versao is None:
+            return construir()
+
+        item = self.backend.ler(chave)
+        if item is not None:
+            versao_item, expira, valor = item
+            if versao_item == versao and expira > time.time():
+                self.acertos += 1
+                return valor
+            self.invalidadas += 1
+        self.faltas += 1
+
+        valor = construir()
+        self.backend.gravar(chave, versao, time.time() + self.ttl, valor)
+        return valor
+
+    def taxa_acerto(self):
+        consultas = self.acertos + self.faltas
+        return self.acertos / consultas if consultas else 0.0
+
+    def metricas(self):
+        """Contadores deste processo como (nome, tipo, ajuda, valor), para /metrics"""
+        return [
+            ('cache_consultas_acertos_total', 'counter', 'Listagens servidas do cache.', self.acertos),
+            ('cache_consultas_faltas_total', 'counter', 'Listagens construídas por falta no cache.', self.faltas),
+            ('cache_consultas_invalidadas_total', 'counter',
+             'Entradas descartadas por versão ou TTL vencidos.', self.invalidadas),
+            ('cache_consultas_taxa_acerto', 'gauge', 'Acertos / (acertos + faltas).', round(self.taxa_acerto(), 4)),
+        ]
+
+
+def criar_cache_consultas(config):
+    """CacheConsultas com o backend escolhido em CACHE_CONSULTAS ('memoria', 'sqlite' ou None)"""
+    tipo = config['CACHE_CONSULTAS']
+    if tipo == 'memoria':
+        backend = BackendMemoria(config['CACHE_CONSULTAS_MAXIMO'])
+    elif tipo == 'sqlite':
+        backend = BackendSQLite(config['CACHE_CONSULTAS_CAMINHO'], config['CACHE_CONSULTAS_MAXIMO'])
+    elif tipo is None:
+        backend = None
+    else:
+        raise ValueError(f'CACHE_CONSULTAS inválido: {tipo}')
+    return CacheConsultas(backend, ttl=config['CACHE_CONSULTAS_TTL'])
+
+
+def cache_consultas():
+    """Cache de listagens da aplicação atual"""
+    return current_app.extensions['cache_consultas']
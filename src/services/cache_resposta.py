@@ -0,0 +1,115 @@
+import gzip
+import hashlib
+import threading
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional; sem ele só há a variante gzip
+    brotli = None
+
+# Abaixo deste tamanho a compressão não compensa o custo do cabeçalho
+TAMANHO_MINIMO_COMPRESSAO = 1024
+
+
+class RespostaCacheada:
+    """Corpo já serializado, com ETag e variantes pré-comprimidas
+
+    variantes ({'br': ..., 'gzip': ...}), se informadas, são usadas no lugar
+    da compressão feita aqui (ex.: arquivos .br/.gz gerados no build). Com
+    precomprimir=False, para respostas que não vão para o cache, nada é
+    comprimido de antemão: só a codificação negociada é gerada, em nível
+    baixo, no momento do envio.
+    """
+
+    def __init__(self, corpo, mimetype='application/json', variantes=None, precomprimir=True):
+        self.corpo = corpo
+        self.mimetype = mimetype
+        self.etag = hashlib.sha256(corpo).hexdigest()[:32]
+        self.variantes = {}
+        self.comprimir_no_envio = False
+        if variantes is not None:
+            self.variantes = dict(variantes)
+        elif len(corpo) >= TAMANHO_MINIMO_COMPRESSAO:
+            if not precomprimir:
+                self.comprimir_no_envio = True
+            else:
+                if brotli is not None:
+                    self.variantes['br'] = brotli.compress(corpo)
+                self.variantes['gzip'] = gzip.compress(corpo, compresslevel=9, mtime=0)
+
+    def codificacoes(self):
+        if self.comprimir_no_envio:
+            return ['br', 'gzip'] if brotli is not None else ['gzip']
+        return list(self.variantes)
+
+    def comprimido(self, codificacao):
+        variante = self.variantes.get(codificacao)
+        if variante is not None:
+            return variante
+        # Resposta de uso único: compressão rápida, sem guardar o resultado
+        if codificacao == 'br':
+            return brotli.compress(self.corpo, quality=1)
+        return gzip.compress(self.corpo, compresslevel=1, mtime=0)
+
+    def etags(self):
+        # Cada codificação tem sua própria ETag forte, como exige o HTTP
+        return [self.etag] + [f'{self.etag}-{codificacao}' for codificacao in self.codificacoes()]
+
+
+class CacheRespostas:
+    """Cache em memória de respostas serializadas, indexado por versão
+
+    Cada chave guarda uma única resposta, que é descartada assim que a
+    versão dos dados informada em obter() muda. Com maximo, as chaves mais
+    antigas são descartadas quando o cache fica cheio.
+    """
+
+    def __init__(self, maximo=None):
+        self.maximo = maximo
+        self._itens = {}
+        self._lock = threading.Lock()
+
+    def obter(self, chave, versao, construir):
+        """Devolver a resposta em cache ou construí-la com construir()"""
+        item = self._itens.get(chave)
+        if item is not None and versao is not None and item[0] == versao:
+            return item[1]
+
+        resposta = construir()
+        if versao is not None:
+            with self._lock:
+                if self.maximo is not None and chave not in self._itens and len(self._itens) >= self.maximo:
+                    self._itens.pop(next(iter(self._itens)))
+                self._itens[chave] = (versao, resposta)
+        return resposta
+
+    def invalidar(self, chave=None):
+        with self._lock:
+            if chave is None:
+                self._itens.clear()
+            else:
+                self._itens.pop(chave, None)
+
+
+def responder(cacheada, cache_control='no-cache'):
+    """Enviar a resposta em cache respeitando If-None-Match e Accept-Encoding"""
+    if any(request.if_none_match.contains(etag) for etag in cacheada.etags()):
+        resposta = Response(status=304)
+        resposta.set_etag(cacheada.etag)
+    else:
+        codificacao = next(
+            (c for c in ('br', 'gzip') if c in cacheada.codificacoes() and request.accept_encodings[c] > 0),
+            None
+        )
+        if codificacao is None:
+            resposta = Response(cacheada.corpo, mimetype=cacheada.mimetype)
+            resposta.set_etag(cacheada.etag)
+        else:
+            resposta = Response(cacheada.comprimido(codificacao), mimetype=cacheada.mimetype)
+            resposta.headers['Content-Encoding'] = codificacao
+            resposta.set_etag(f'{cacheada.etag}-{codificacao}')
+
+    resposta.headers['Cache-Control'] = cache_control
+    resposta.vary.add('Accept-Encoding')
+    return resposta
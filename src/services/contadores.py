@@ -0,0 +1,138 @@
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.dialects.sqlite import insert
+from src.models.user import db
+from src.models.contador import Contador
+from src.models.estatistica import EstatisticaUsuario
+from src.models.questao import Questao, Simulado, ResultadoSimulado
+from src.models.questao_nova import QuestaoNova
+
+# Modelo -> dimensões contadas além do total
+DIMENSOES = {
+    Questao: ('vestibular', 'materia', 'ano'),
+    QuestaoNova: ('vestibular', 'materia', 'ano'),
+    Simulado: (),
+    ResultadoSimulado: (),
+}
+
+# Histograma dos usuários por percentual de acertos, em faixas de 0,1 ponto
+# (chave '0000' a '1000'); base do percentil de cada usuário
+GRUPO_FAIXAS_USUARIOS = 'usuarios.faixa_acerto'
+
+_contadores = Contador.__table__
+
+
+def _chave(valor):
+    return '' if valor is None else str(valor)
+
+
+def faixa_acerto(acertos, questoes):
+    """Chave da faixa do histograma para acertos/questoes (None sem questões)"""
+    if not questoes:
+        return None
+    return f'{acertos * 1000 // questoes:04d}'
+
+
+def mover_faixa(connection, anterior, atual):
+    """Passar um usuário da faixa anterior para a atual no histograma"""
+    deltas = {}
+    if anterior is not None:
+        deltas[(GRUPO_FAIXAS_USUARIOS, anterior)] = -1
+    if atual is not None:
+        chave = (GRUPO_FAIXAS_USUARIOS, atual)
+        deltas[chave] = deltas.get(chave, 0) + 1
+    _aplicar(connection, deltas)
+
+
+def _aplicar(connection, deltas):
+    """Somar os deltas {(grupo, chave): n} aos contadores na conexão da transação"""
+    deltas = [
+        {'grupo': grupo, 'chave': chave, 'valor': delta}
+        for (grupo, chave), delta in deltas.items() if delta
+    ]
+    if not deltas:
+        return
+    insercao = insert(_contadores)
+    connection.execute(insercao.on_conflict_do_update(
+        index_elements=[_contadores.c.grupo, _contadores.c.chave],
+        set_={'valor': _contadores.c.valor + insercao.excluded.valor}
+    ), deltas)
+
+
+def _deltas(modelo, objeto, sinal):
+    tabela = modelo.__tablename__
+    deltas = {(f'{tabela}.total', ''): sinal}
+    for dimensao in DIMENSOES[modelo]:
+        deltas[(f'{tabela}.{dimensao}', _chave(getattr(objeto, dimensao)))] = sinal
+    return deltas
+
+
+def _registrar_eventos(modelo):
+    tabela = modelo.__tablename__
+
+    @event.listens_for(modelo, 'after_insert')
+    def _inserido(mapper, connection, objeto):
+        _aplicar(connection, _deltas(modelo, objeto, 1))
+
+    @event.listens_for(modelo, 'after_delete')
+    def _removido(mapper, connection, objeto):
+        _aplicar(connection, _deltas(modelo, objeto, -1))
+
+    @event.listens_for(modelo, 'after_update')
+    def _alterado(mapper, connection, objeto):
+        deltas = {}
+        estado = inspect(objeto)
+        for dimensao in DIMENSOES[modelo]:
+            historico = estado.attrs[dimensao].history
+            if not historico.has_changes():
+                continue
+            for antigo in historico.deleted:
+                chave = (f'{tabela}.{dimensao}', _chave(antigo))
+                deltas[chave] = deltas.get(chave, 0) - 1
+            for novo in historico.added:
+                chave = (f'{tabela}.{dimensao}', _chave(novo))
+                deltas[chave] = deltas.get(chave, 0) + 1
+        _aplicar(connection, deltas)
+
+
+for _modelo in DIMENSOES:
+    _registrar_eventos(_modelo)
+
+
+def reconstruir_contadores(connection):
+    """Recalcular todos os contadores a partir das tabelas (reparo de divergências)"""
+    connection.execute(_contadores.delete())
+    linhas = []
+    for modelo, dimensoes in DIMENSOES.items():
+        tabela = modelo.__tablename__
+        total = connection.execute(select(func.count()).select_from(modelo.__table__)).scalar()
+        linhas.append({'grupo': f'{tabela}.total', 'chave': '', 'valor': total})
+        for dimensao in dimensoes:
+            coluna = modelo.__table__.c[dimensao]
+            for valor, quantidade in connection.execute(
+                select(coluna, func.count()).group_by(coluna)
+            ):
+                linhas.append({'grupo': f'{tabela}.{dimensao}', 'chave': _chave(valor), 'valor': quantidade})
+
+    usuarios = EstatisticaUsuario.__table__
+    faixa = usuarios.c.soma_pontuacao * 1000 // usuarios.c.soma_questoes
+    for valor, quantidade in connection.execute(
+        select(faixa, func.count()).where(usuarios.c.soma_questoes > 0).group_by(faixa)
+    ):
+        linhas.append({'grupo': GRUPO_FAIXAS_USUARIOS, 'chave': f'{int(valor):04d}', 'valor': quantidade})
+    connection.execute(_contadores.insert(), linhas)
+
+
+def ler_contadores(*grupos):
+    """Ler os contadores dos grupos pedidos: {grupo: {chave: valor}}"""
+    resultado = {grupo: {} for grupo in grupos}
+    linhas = db.session.query(Contador.grupo, Contador.chave, Contador.valor).filter(
+        Contador.grupo.in_(grupos), Contador.valor > 0
+    ).all()
+    for grupo, chave, valor in linhas:
+        resultado[grupo][chave] = valor
+    return resultado
+
+
+def contagem_total(contadores, tabela):
+    """Total de linhas da tabela a partir do resultado de ler_contadores()"""
+    return contadores.get(f'{tabela}.total', {}).get('', 0)
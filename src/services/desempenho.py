@@ -0,0 +1,161 @@
+from sqlalchemy.dialects.sqlite import insert
+from src.models.user import db
+from src.models.questao import ResultadoSimulado
+from src.models.estatistica import EstatisticaUsuario, EstatisticaUsuarioTopico
+from src.services.cache_resposta import CacheRespostas
+from src.services.contadores import GRUPO_FAIXAS_USUARIOS, faixa_acerto, ler_contadores, mover_faixa
+
+# Perfis (resumo + tópicos) de usuários mantidos em memória
+MAXIMO_USUARIOS_EM_CACHE = 1024
+# Maior número de resultados devolvido pela tendência
+LIMITE_TENDENCIA = 200
+# Janela da média móvel da tendência
+JANELA_MEDIA_MOVEL = 5
+
+_perfis = CacheRespostas(maximo=MAXIMO_USUARIOS_EM_CACHE)
+
+
+def acumular_topico(por_topico, materia, assunto, acertou, tempo=0):
+    """Somar uma resposta em {(materia, assunto): [tentativas, acertos, tempo]}"""
+    totais = por_topico.setdefault((materia, assunto or ''), [0, 0, 0])
+    totais[0] += 1
+    totais[1] += int(acertou)
+    totais[2] += tempo or 0
+
+
+def atualizar_desempenho(usuario_nome, pontuacao, total_questoes, tempo_gasto, por_topico):
+    """Somar um resultado aos agregados do usuário (na transação da sessão atual)
+
+    Atualiza o resumo do usuário, seus acertos por matéria/assunto e move o
+    usuário de faixa no histograma usado pelo percentil. O custo depende só
+    do número de tópicos do resultado, não do histórico do usuário.
+    """
+    if por_topico:
+        insercao = insert(EstatisticaUsuarioTopico)
+        db.session.execute(insercao.on_conflict_do_update(
+            index_elements=[
+                EstatisticaUsuarioTopico.usuario_nome,
+                EstatisticaUsuarioTopico.materia,
+                EstatisticaUsuarioTopico.assunto
+            ],
+            set_={
+                'tentativas': EstatisticaUsuarioTopico.tentativas + insercao.excluded.tentativas,
+                'acertos': EstatisticaUsuarioTopico.acertos + insercao.excluded.acertos,
+                'soma_tempo_gasto': EstatisticaUsuarioTopico.soma_tempo_gasto + insercao.excluded.soma_tempo_gasto
+            }
+        ), [
+            {
+                'usuario_nome': usuario_nome,
+                'materia': materia,
+                'assunto': assunto,
+                'tentativas': tentativas,
+                'acertos': acertos,
+                'soma_tempo_gasto': tempo
+            }
+            for (materia, assunto), (tentativas, acertos, tempo) in por_topico.items()
+        ])
+
+    estatistica = db.session.get(EstatisticaUsuario, usuario_nome)
+    if estatistica is None:
+        estatistica = EstatisticaUsuario(
+            usuario_nome=usuario_nome, resultados=0, soma_pontuacao=0, soma_questoes=0, soma_tempo_gasto=0
+        )
+        db.session.add(estatistica)
+    anterior = faixa_acerto(estatistica.soma_pontuacao, estatistica.soma_questoes)
+    estatistica.resultados += 1
+    estatistica.soma_pontuacao += pontuacao
+    estatistica.soma_questoes += total_questoes
+    estatistica.soma_tempo_gasto += tempo_gasto or 0
+    db.session.flush()
+
+    atual = faixa_acerto(estatistica.soma_pontuacao, estatistica.soma_questoes)
+    if atual != anterior:
+        mover_faixa(db.session.connection(), anterior, atual)
+    _perfis.invalidar(usuario_nome)
+
+
+def perfil(usuario_nome):
+    """Resumo e tópicos do usuário, em cache até o próximo resultado dele
+
+    O número de resultados do usuário serve de versão: resultados gravados
+    por outros workers também renovam o cache. Retorna None se o usuário
+    não tiver resultados.
+    """
+    estatistica = db.session.get(EstatisticaUsuario, usuario_nome)
+    if estatistica is None:
+        return None
+
+    def construir():
+        topicos = EstatisticaUsuarioTopico.query.filter_by(usuario_nome=usuario_nome).all()
+        return {
+            'resumo': estatistica.to_dict(),
+            'topicos': [topico.to_dict() for topico in topicos]
+        }
+
+    return _perfis.obter(usuario_nome, estatistica.resultados, construir)
+
+
+def topicos_mais_fracos(usuario_nome, limite=5, minimo_tentativas=3):
+    """Tópicos com menor percentual de acertos (com ao menos minimo_tentativas)"""
+    dados = perfil(usuario_nome)
+    if dados is None:
+        return None
+    topicos = [t for t in dados['topicos'] if t['tentativas'] >= minimo_tentativas]
+    topicos.sort(key=lambda t: (t['percentual_acertos'], -t['tentativas']))
+    return topicos[:limite]
+
+
+def tendencia(usuario_nome, limite=20):
+    """Percentual de acertos dos últimos resultados, do mais antigo ao mais recente
+
+    Lê só as colunas de pontuação pelo índice (usuario_nome, created_at),
+    sem decodificar as respostas, e soma uma média móvel.
+    """
+    limite = max(1, min(limite, LIMITE_TENDENCIA))
+    linhas = db.session.query(
+        ResultadoSimulado.id,
+        ResultadoSimulado.simulado_id,
+        ResultadoSimulado.pontuacao,
+        ResultadoSimulado.total_questoes,
+        ResultadoSimulado.created_at
+    ).filter(
+        ResultadoSimulado.usuario_nome == usuario_nome
+    ).order_by(ResultadoSimulado.created_at.desc()).limit(limite).all()
+
+    pontos = []
+    janela = []
+    for resultado_id, simulado_id, pontuacao, total, created_at in reversed(linhas):
+        percentual = round(pontuacao / total * 100, 2) if total > 0 else 0
+        janela = (janela + [percentual])[-JANELA_MEDIA_MOVEL:]
+        pontos.append({
+            'resultado_id': resultado_id,
+            'simulado_id': simulado_id,
+            'percentual': percentual,
+            'media_movel': round(sum(janela) / len(janela), 2),
+            'created_at': created_at.isoformat() if created_at else None
+        })
+    return pontos
+
+
+def percentil(usuario_nome):
+    """Posição do percentual de acertos do usuário entre todos os usuários
+
+    Usa o histograma materializado em faixas de 0,1 ponto: no máximo 1001
+    linhas, qualquer que seja o número de usuários. Retorna None se o
+    usuário não tiver resultados.
+    """
+    estatistica = db.session.get(EstatisticaUsuario, usuario_nome)
+    if estatistica is None:
+        return None
+    faixa = faixa_acerto(estatistica.soma_pontuacao, estatistica.soma_questoes)
+    faixas = ler_contadores(GRUPO_FAIXAS_USUARIOS)[GRUPO_FAIXAS_USUARIOS]
+    total = sum(faixas.values())
+    abaixo = sum(quantidade for chave, quantidade in faixas.items() if chave < faixa) if faixa else 0
+    iguais = faixas.get(faixa, 0) if faixa else 0
+    return {
+        'usuario_nome': usuario_nome,
+        'percentual_acertos': estatistica.to_dict()['percentual_acertos'],
+        # Empates contam pela metade (percentil "médio")
+        'percentil': round((abaixo + iguais / 2) / total * 100, 1) if total > 0 else 0,
+        'usuarios': total
+    }
@@ -0,0 +1,109 @@
+import gzip
+import mimetypes
+import os
+import re
+from flask import send_file
+from src.services.cache_resposta import TAMANHO_MINIMO_COMPRESSAO, RespostaCacheada, brotli, responder
+
+# Arquivos gerados pelo Vite levam o hash do conteúdo no nome (index-D0WaytAX.js)
+ASSET_COM_HASH = re.compile(r'-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$')
+EXTENSOES_COMPRIMIVEIS = ('.js', '.mjs', '.css', '.html', '.svg', '.json', '.map', '.txt', '.ico', '.webmanifest')
+# Extensão no disco -> Content-Encoding
+VARIANTES = {'.br': 'br', '.gz': 'gzip'}
+# Arquivos maiores que isso são enviados do disco em vez de ficarem em memória
+TAMANHO_MAXIMO_EM_MEMORIA = 8 * 1024 * 1024
+
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+CACHE_REVALIDAR = 'no-cache'
+
+
+def _comprimivel(nome):
+    return nome.endswith(EXTENSOES_COMPRIMIVEIS)
+
+
+def _arquivos(pasta):
+    """Caminhos relativos (com '/') dos arquivos da pasta, sem as variantes comprimidas"""
+    for raiz, _, nomes in os.walk(pasta):
+        for nome in nomes:
+            if os.path.splitext(nome)[1] in VARIANTES:
+                continue
+            caminho = os.path.join(raiz, nome)
+            yield os.path.relpath(caminho, pasta).replace(os.sep, '/'), caminho
+
+
+def comprimir_estaticos(pasta):
+    """Gerar as variantes .gz (e .br, se houver brotli) dos arquivos de texto
+
+    Variantes já atualizadas são mantidas. Retorna quantos arquivos foram
+    gerados.
+    """
+    compressores = {'.gz': lambda dados: gzip.compress(dados, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressores['.br'] = brotli.compress
+
+    gerados = 0
+    for relativo, caminho in _arquivos(pasta):
+        if not _comprimivel(relativo) or os.path.getsize(caminho) < TAMANHO_MINIMO_COMPRESSAO:
+            continue
+        modificado = os.path.getmtime(caminho)
+        dados = None
+        for extensao, comprimir in compressores.items():
+            destino = caminho + extensao
+            if os.path.exists(destino) and os.path.getmtime(destino) >= modificado:
+                continue
+            if dados is None:
+                with open(caminho, 'rb') as arquivo:
+                    dados = arquivo.read()
+            with open(destino, 'wb') as arquivo:
+                arquivo.write(comprimir(dados))
+            gerados += 1
+    return gerados
+
+
+class ManifestoEstaticos:
+    """Arquivos estáticos lidos uma única vez, na criação da aplicação
+
+    Cada arquivo fica em memória como RespostaCacheada, com as variantes
+    .br/.gz geradas no build (flask comprimir-estaticos), de modo que as
+    requisições não consultam o sistema de arquivos. Arquivos com hash no
+    nome recebem cache imutável; os demais (index.html, favicon) são
+    revalidados pela ETag. Um novo build do frontend exige reiniciar a
+    aplicação.
+    """
+
+    def __init__(self, pasta):
+        self.pasta = pasta
+        self._arquivos = {}
+        self._grandes = {}
+        if pasta is None or not os.path.isdir(pasta):
+            return
+        for relativo, caminho in _arquivos(pasta):
+            mimetype = mimetypes.guess_type(relativo)[0] or 'application/octet-stream'
+            if os.path.getsize(caminho) > TAMANHO_MAXIMO_EM_MEMORIA:
+                self._grandes[relativo] = (caminho, mimetype)
+                continue
+            with open(caminho, 'rb') as arquivo:
+                corpo = arquivo.read()
+            variantes = {}
+            for extensao, codificacao in VARIANTES.items():
+                if os.path.exists(caminho + extensao):
+                    with open(caminho + extensao, 'rb') as arquivo:
+                        variantes[codificacao] = arquivo.read()
+            self._arquivos[relativo] = RespostaCacheada(corpo, mimetype, variantes)
+
+    def __contains__(self, relativo):
+        return relativo in self._arquivos or relativo in self._grandes
+
+    def responder(self, relativo):
+        """Resposta para o arquivo (caminho relativo à pasta), ou None se não existir"""
+        imutavel = relativo.startswith('assets/') and ASSET_COM_HASH.search(relativo)
+        cache_control = CACHE_IMUTAVEL if imutavel else CACHE_REVALIDAR
+        cacheada = self._arquivos.get(relativo)
+        if cacheada is not None:
+            return responder(cacheada, cache_control)
+        if relativo in self._grandes:
+            caminho, mimetype = self._grandes[relativo]
+            resposta = send_file(caminho, mimetype=mimetype, conditional=True)
+            resposta.headers['Cache-Control'] = cache_control
+            return resposta
+        return None
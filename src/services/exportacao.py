@@ -0,0 +1,156 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from src.models.questao import Questao, ResultadoSimulado
+from src.models.questao_nova import QuestaoNova
+from src.models.tipos import filtro_igual
+from src.services.busca import aplicar_busca
+from src.services.serializacao import orjson
+
+FORMATOS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+# Filtros exatos aceitos por cada tabela (os mesmos das listagens)
+FILTROS = {
+    Questao: ('ano', 'vestibular', 'materia', 'assunto', 'dificuldade'),
+    QuestaoNova: ('ano', 'vestibular', 'materia', 'assunto'),
+    ResultadoSimulado: ('usuario_nome', 'simulado_id'),
+}
+FILTROS_INTEIROS = ('ano', 'simulado_id')
+CAMPOS_RESULTADOS = ('id', 'simulado_id', 'usuario_nome', 'respostas', 'pontuacao', 'total_questoes',
+                     'tempo_gasto', 'created_at')
+# Linhas lidas do banco por vez e tamanho aproximado de cada pedaço enviado
+LINHAS_POR_LOTE = 1000
+TAMANHO_PEDACO = 64 * 1024
+
+
+class ExportacaoInvalida(ValueError):
+    """Formato ou filtro de exportação inválido"""
+
+
+def ler_filtros(modelo, args):
+    """{filtro: valor} a partir de request.args (ou de um dicionário), sem os vazios"""
+    filtros = {}
+    for nome in FILTROS[modelo]:
+        valor = args.get(nome)
+        if valor in (None, ''):
+            continue
+        if nome in FILTROS_INTEIROS:
+            try:
+                valor = int(valor)
+            except ValueError:
+                raise ExportacaoInvalida(f'{nome} inválido: {valor}')
+        filtros[nome] = valor
+    return filtros
+
+
+def aplicar_filtros(query, modelo, filtros, busca=None, ordenar_busca=True):
+    """Aplicar os filtros exatos e a busca textual das listagens"""
+    for nome, valor in filtros.items():
+        if valor:
+            query = query.filter(filtro_igual(modelo, nome, valor))
+    if busca:
+        query = aplicar_busca(query, modelo, busca, ordenar=ordenar_busca)
+    return query
+
+
+def _linhas(modelo, campos, filtros, busca):
+    """Tuplas com os campos pedidos, lidas do banco em lotes
+
+    Sem ORDER BY: a ordem é a do índice escolhido pelo SQLite (ids
+    crescentes sem filtros), o que evita ordenar o resultado inteiro numa
+    árvore temporária.
+    """
+    expressoes = modelo.expressoes() if hasattr(modelo, 'expressoes') else {}
+    colunas = [
+        expressoes[campo].label(campo) if campo in expressoes else getattr(modelo, campo)
+        for campo in campos
+    ]
+    query = aplicar_filtros(modelo.query, modelo, filtros, busca, ordenar_busca=False)
+    return query.with_entities(*colunas).yield_per(LINHAS_POR_LOTE)
+
+
+def _linha_json(registro):
+    # Sempre compacto (uma linha por registro), mesmo com o indent do modo debug
+    if orjson is not None:
+        try:
+            return orjson.dumps(registro).decode('utf-8')
+        except TypeError:
+            pass
+    return json.dumps(registro, ensure_ascii=False, separators=(',', ':'))
+
+
+def _valor_json(valor):
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return valor
+
+
+def _valor_csv(valor):
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    if isinstance(valor, list):
+        return json.dumps(valor, ensure_ascii=False)
+    return valor
+
+
+def _ndjson(linhas, campos):
+    decodificar = [campo == 'respostas' for campo in campos]
+    pedaco = []
+    tamanho = 0
+    for linha in linhas:
+        registro = {}
+        for campo, valor, json_texto in zip(campos, linha, decodificar):
+            # respostas fica guardado como texto JSON; vai como objeto, como no to_dict()
+            registro[campo] = json.loads(valor) if json_texto and valor else _valor_json(valor)
+        texto = _linha_json(registro)
+        pedaco.append(texto)
+        tamanho += len(texto)
+        if tamanho >= TAMANHO_PEDACO:
+            yield '\n'.join(pedaco) + '\n'
+            pedaco = []
+            tamanho = 0
+    if pedaco:
+        yield '\n'.join(pedaco) + '\n'
+
+
+def _csv(linhas, campos):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(campos)
+    for linha in linhas:
+        escritor.writerow([_valor_csv(valor) for valor in linha])
+        if buffer.tell() >= TAMANHO_PEDACO:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def exportar(modelo, formato='ndjson', filtros=None, busca=None, campos=None):
+    """Gerador de pedaços de texto (str) com a tabela no formato pedido
+
+    Lê LINHAS_POR_LOTE linhas por vez e não guarda o que já foi enviado,
+    então a memória usada não depende do tamanho da tabela. campos vale só
+    para as questões (veja resolver_campos); resultados saem com todas as
+    colunas.
+    """
+    if formato not in FORMATOS:
+        raise ExportacaoInvalida(f"Formato inválido: {formato} (use {', '.join(FORMATOS)})")
+    if modelo is ResultadoSimulado:
+        campos = CAMPOS_RESULTADOS
+        busca = None
+    campos = tuple(campos or modelo.CAMPOS)
+    linhas = _linhas(modelo, campos, filtros or {}, busca)
+    return _ndjson(linhas, campos) if formato == 'ndjson' else _csv(linhas, campos)
+
+
+def comprimir(pedacos, nivel=6):
+    """Comprimir um gerador de pedaços de texto como um único fluxo gzip"""
+    compressor = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+    for pedaco in pedacos:
+        dados = compressor.compress(pedaco.encode('utf-8'))
+        if dados:
+            yield dados
+    yield compressor.flush()
@@ -0,0 +1,87 @@
+import threading
+from sqlalchemy import func
+from src.models.tipos import FILTROS_SEM_CAIXA, sem_caixa
+from src.models.user import db
+from src.services.versao import versao_atual
+
+# Quantas combinações de filtros diferentes ficam com o resultado em cache
+MAXIMO_CONSULTAS_EM_CACHE = 256
+
+
+class IndiceFacetas:
+    """Contagens por valor de cada filtro, pré-calculadas por versão dos dados
+
+    Uma única consulta agrupa a tabela por todas as dimensões de filtro e
+    guarda as combinações existentes com sua quantidade. As contagens de cada
+    faceta, inclusive as contextuais ("matérias com ano=2023"), são somadas
+    em memória a partir dessas combinações, sem novos GROUP BY no banco. O
+    índice é refeito quando a versão da tabela muda. Os filtros de
+    FILTROS_SEM_CAIXA comparam como nas listagens, sem diferenciar
+    maiúsculas de minúsculas.
+    """
+
+    def __init__(self, modelo, dimensoes):
+        self.modelo = modelo
+        self.dimensoes = dimensoes
+        self._posicoes = {dimensao: i for i, dimensao in enumerate(dimensoes)}
+        self._sem_caixa = frozenset(i for i, dimensao in enumerate(dimensoes) if dimensao in FILTROS_SEM_CAIXA)
+        self._versao = None
+        self._combinacoes = []
+        self._consultas = {}
+        self._lock = threading.Lock()
+
+    def _atualizar(self):
+        versao = versao_atual(self.modelo.__tablename__)
+        if versao is not None and versao == self._versao:
+            return
+        colunas = [getattr(self.modelo, dimensao) for dimensao in self.dimensoes]
+        linhas = db.session.query(*colunas, func.count()).group_by(*colunas).all()
+        with self._lock:
+            # Cada combinação guarda também os valores como os filtros os comparam
+            self._combinacoes = [
+                (tuple(linha[:-1]), self._normalizar(linha[:-1]), linha[-1]) for linha in linhas
+            ]
+            self._consultas = {}
+            self._versao = versao
+
+    def _normalizar(self, valores):
+        return tuple(sem_caixa(valor) if i in self._sem_caixa else valor for i, valor in enumerate(valores))
+
+    def contagens(self, filtros=None):
+        """{dimensao: {valor: quantidade}} considerando os demais filtros
+
+        A contagem de cada dimensão ignora o filtro da própria dimensão, para
+        que a interface continue mostrando as alternativas ao valor escolhido.
+        """
+        filtros = {
+            d: sem_caixa(v) if d in FILTROS_SEM_CAIXA else v
+            for d, v in (filtros or {}).items() if v not in (None, '')
+        }
+        self._atualizar()
+
+        chave = tuple(sorted(filtros.items()))
+        resultado = self._consultas.get(chave)
+        if resultado is not None:
+            return resultado
+
+        resultado = {dimensao: {} for dimensao in self.dimensoes}
+        restricoes = [(self._posicoes[d], v) for d, v in filtros.items()]
+        for valores, normalizados, quantidade in self._combinacoes:
+            falhas = [i for i, valor in restricoes if normalizados[i] != valor]
+            if len(falhas) > 1:
+                continue
+            for i, dimensao in enumerate(self.dimensoes):
+                # Combinação que só falha no filtro desta dimensão ainda conta para ela
+                if falhas and falhas[0] != i:
+                    continue
+                valor = valores[i]
+                if valor is None:
+                    continue
+                contagem = resultado[dimensao]
+                contagem[valor] = contagem.get(valor, 0) + quantidade
+
+        with self._lock:
+            if len(self._consultas) >= MAXIMO_CONSULTAS_EM_CACHE:
+                self._consultas.clear()
+            self._consultas[chave] = resultado
+        return resultado
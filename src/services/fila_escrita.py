@@ -0,0 +1,105 @@
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from flask import current_app
+from src.models.user import db
+from src.services.banco import iniciar_escrita
+
+# Quantas escritas no máximo são agrupadas na mesma transação
+TAMANHO_MAXIMO_LOTE = 64
+
+
+class FilaEscrita:
+    """Serializar as escritas do processo em uma thread, com commits agrupados
+
+    As requisições enfileiram uma função e esperam pelo seu resultado. A
+    thread de escrita junta tudo o que estiver na fila (até
+    TAMANHO_MAXIMO_LOTE), executa cada função em um SAVEPOINT próprio e faz
+    um único commit para o lote: uma falha em uma escrita não desfaz as
+    outras, e N envios simultâneos custam uma transação em vez de N
+    disputando o lock do banco. Entre processos (workers do gunicorn) a
+    disputa fica com o BEGIN IMMEDIATE e o busy_timeout.
+
+    Com sincrona=True a função roda na própria requisição (usado nos testes
+    com banco em memória, que tem uma única conexão).
+    """
+
+    def __init__(self, app, sincrona=False, tamanho_lote=TAMANHO_MAXIMO_LOTE):
+        self.app = app
+        self.sincrona = sincrona
+        self.tamanho_lote = tamanho_lote
+        self._fila = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def executar(self, funcao, *args, **kwargs):
+        """Executar funcao(*args, **kwargs) na fila e devolver seu resultado
+
+        A função roda dentro de uma transação e deve deixar na sessão
+        (db.session) o que for gravar; o commit é feito pela fila. Exceções
+        da função são propagadas para quem chamou.
+        """
+        futuro = Future()
+        tarefa = (futuro, funcao, args, kwargs)
+        if self.sincrona:
+            self._gravar([tarefa])
+        else:
+            self._garantir_thread()
+            self._fila.put(tarefa)
+        return futuro.result()
+
+    def _garantir_thread(self):
+        # Threads não sobrevivem ao fork dos workers (preload_app): cada
+        # processo inicia a sua no primeiro uso
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._fila = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._processar, name='fila-escrita', daemon=True)
+                self._thread.start()
+
+    def _processar(self):
+        with self.app.app_context():
+            while True:
+                lote = [self._fila.get()]
+                while len(lote) < self.tamanho_lote:
+                    try:
+                        lote.append(self._fila.get_nowait())
+                    except queue.Empty:
+                        break
+                try:
+                    self._gravar(lote)
+                finally:
+                    db.session.remove()
+
+    def _gravar(self, lote):
+        concluidas = []
+        try:
+            iniciar_escrita(db.session.connection())
+            for futuro, funcao, args, kwargs in lote:
+                try:
+                    with db.session.begin_nested():
+                        valor = funcao(*args, **kwargs)
+                except Exception as e:
+                    futuro.set_exception(e)
+                else:
+                    concluidas.append((futuro, valor))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            # O commit falhou: nenhuma escrita do lote foi gravada
+            for futuro, _, _, _ in lote:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+        for futuro, valor in concluidas:
+            futuro.set_result(valor)
+
+
+def fila_escrita():
+    """Fila de escrita da aplicação atual"""
+    return current_app.extensions['fila_escrita']
@@ -0,0 +1,134 @@
+import threading
+from collections import namedtuple
+from sqlalchemy import event
+from src.models.user import db
+from src.models.questao_nova import QuestaoNova
+from src.services.versao import versao_atual
+
+# Por quanto tempo (s) a versão de questoes_novas lida do banco é reutilizada.
+# Escritas feitas neste processo invalidam o cache na hora; escritas de outros
+# workers passam a valer em no máximo esse intervalo.
+IDADE_MAXIMA_VERSAO = 1.0
+
+# mascara: alternativas corretas como bits (01, 02, 04, 08, 16 já são potências de 2)
+Gabarito = namedtuple('Gabarito', ['mascara', 'resposta_correta', 'explicacao', 'materia', 'assunto'])
+
+_gabaritos = {}
+_versao_gabaritos = None
+_lock = threading.Lock()
+
+
+class AlternativaInvalida(ValueError):
+    """Alternativa selecionada não é uma numeração válida"""
+
+
+def para_mascara(alternativas):
+    """Converter ['01', '04', ...] (ou [1, 4, ...]) em uma máscara de bits"""
+    mascara = 0
+    for alternativa in alternativas:
+        try:
+            valor = int(alternativa)
+        except (TypeError, ValueError):
+            raise AlternativaInvalida(alternativa)
+        if valor <= 0 or valor & (valor - 1):
+            raise AlternativaInvalida(alternativa)
+        mascara |= valor
+    return mascara
+
+
+def para_lista(mascara):
+    """Converter a máscara de volta para a numeração ['01', '04', ...]"""
+    lista = []
+    bit = 1
+    while bit <= mascara:
+        if mascara & bit:
+            lista.append(f'{bit:02d}')
+        bit <<= 1
+    return lista
+
+
+def pontuar(selecionadas, corretas):
+    """Aplicar a regra de pontuação parcial sobre máscaras de bits
+
+    Cada alternativa correta marcada vale um acerto e cada incorreta marcada
+    anula um acerto; o resultado é proporcional ao total de corretas.
+    Retorna (correto, acertos, erros, pontuacao_parcial em %).
+    """
+    acertos = (selecionadas & corretas).bit_count()
+    erros = (selecionadas & ~corretas).bit_count()
+    total_corretas = corretas.bit_count()
+    pontuacao_parcial = max(0, acertos - erros) / total_corretas if total_corretas > 0 else 0
+    return selecionadas == corretas, acertos, erros, round(pontuacao_parcial * 100, 1)
+
+
+def _validar_versao():
+    global _versao_gabaritos
+    versao = versao_atual('questoes_novas', max_idade=IDADE_MAXIMA_VERSAO)
+    if versao is None or versao != _versao_gabaritos:
+        with _lock:
+            _gabaritos.clear()
+            _versao_gabaritos = versao
+
+
+def obter_gabarito(questao_id):
+    """Gabarito da questão, lido do banco só na primeira vez (None se não existir)"""
+    _validar_versao()
+    gabarito = _gabaritos.get(questao_id)
+    if gabarito is None:
+        linha = db.session.query(
+            QuestaoNova.alternativas_corretas,
+            QuestaoNova.resposta_correta,
+            QuestaoNova.explicacao,
+            QuestaoNova.materia,
+            QuestaoNova.assunto
+        ).filter(QuestaoNova.id == questao_id).first()
+        if linha is None:
+            return None
+        gabarito = Gabarito(para_mascara(linha[0]), *linha[1:])
+        _gabaritos[questao_id] = gabarito
+    return gabarito
+
+
+def obter_gabaritos(questoes_ids):
+    """Gabaritos de várias questões, com uma única consulta IN para as ausentes
+
+    Retorna um dicionário questao_id -> Gabarito; ids inexistentes ficam de fora.
+    """
+    _validar_versao()
+    gabaritos = {}
+    ausentes = []
+    for questao_id in questoes_ids:
+        gabarito = _gabaritos.get(questao_id)
+        if gabarito is None:
+            ausentes.append(questao_id)
+        else:
+            gabaritos[questao_id] = gabarito
+
+    if ausentes:
+        linhas = db.session.query(
+            QuestaoNova.id,
+            QuestaoNova.alternativas_corretas,
+            QuestaoNova.resposta_correta,
+            QuestaoNova.explicacao,
+            QuestaoNova.materia,
+            QuestaoNova.assunto
+        ).filter(QuestaoNova.id.in_(ausentes)).all()
+        for questao_id, corretas, *demais in linhas:
+            gabarito = Gabarito(para_mascara(corretas), *demais)
+            _gabaritos[questao_id] = gabarito
+            gabaritos[questao_id] = gabarito
+    return gabaritos
+
+
+def invalidar_gabarito(questao_id=None):
+    with _lock:
+        if questao_id is None:
+            _gabaritos.clear()
+        else:
+            _gabaritos.pop(questao_id, None)
+
+
+@event.listens_for(QuestaoNova, 'after_update')
+@event.listens_for(QuestaoNova, 'after_delete')
+def _questao_alterada(mapper, connection, questao):
+    invalidar_gabarito(questao.id)
@@ -0,0 +1,162 @@
+import json
+import re
+from sqlalchemy import or_, select
+from sqlalchemy.dialects.sqlite import insert
+from src.models.user import db
+from src.models.tipos import como_lista
+from src.models.questao import Questao
+from src.models.questao_nova import QuestaoNova
+from src.services.contadores import reconstruir_contadores
+
+# Chave natural das questões; há um índice único sobre ela em cada tabela
+CHAVE = ('vestibular', 'ano', 'numero')
+
+# Modelo -> (campos obrigatórios, campos opcionais com valor padrão, campos de lista)
+CAMPOS = {
+    Questao: (
+        ('ano', 'vestibular', 'numero', 'materia', 'enunciado', 'alternativas', 'resposta_correta'),
+        {'dia': None, 'caderno': None, 'assunto': None, 'explicacao': None, 'dificuldade': None},
+        ('alternativas',),
+    ),
+    QuestaoNova: (
+        ('vestibular', 'ano', 'numero', 'materia', 'enunciado', 'alternativas',
+         'alternativas_numeracao', 'resposta_correta', 'alternativas_corretas'),
+        {'etapa': None, 'assunto': None, 'explicacao': None, 'dificuldade': 'Média'},
+        ('alternativas', 'alternativas_numeracao', 'alternativas_corretas'),
+    ),
+}
+
+TAMANHO_LOTE = 5000
+TAMANHO_BLOCO_LEITURA = 1 << 16
+
+_SEPARADORES = re.compile(r'[\s,]*')
+
+
+class RegistroInvalido(ValueError):
+    """Registro do arquivo sem algum campo obrigatório ou com tipo errado"""
+
+
+def _ler_array_json(arquivo):
+    """Iterar sobre os objetos de uma lista JSON sem carregar o arquivo inteiro"""
+    decodificador = json.JSONDecoder()
+    buffer = arquivo.read(TAMANHO_BLOCO_LEITURA)
+    posicao = _SEPARADORES.match(buffer).end()
+    if buffer[posicao:posicao + 1] != '[':
+        raise ValueError('O arquivo JSON deve conter uma lista de questões')
+    posicao += 1
+    fim_arquivo = False
+
+    while True:
+        posicao = _SEPARADORES.match(buffer, posicao).end()
+        if buffer[posicao:posicao + 1] == ']':
+            return
+        try:
+            if posicao >= len(buffer):
+                raise json.JSONDecodeError('Fim do bloco', buffer, posicao)
+            objeto, posicao = decodificador.raw_decode(buffer, posicao)
+        except json.JSONDecodeError:
+            # Objeto cortado no fim do bloco: ler mais e tentar de novo
+            if fim_arquivo:
+                raise ValueError('Lista JSON incompleta ou malformada')
+            bloco = arquivo.read(TAMANHO_BLOCO_LEITURA)
+            fim_arquivo = not bloco
+            buffer = buffer[posicao:] + bloco
+            posicao = 0
+            continue
+        yield objeto
+
+
+def ler_registros(caminho):
+    """Ler questões de um arquivo .json (lista) ou .jsonl/.ndjson (uma por linha)"""
+    with open(caminho, 'r', encoding='utf-8') as arquivo:
+        if caminho.endswith(('.jsonl', '.ndjson')):
+            for linha in arquivo:
+                if linha.strip():
+                    yield json.loads(linha)
+        else:
+            yield from _ler_array_json(arquivo)
+
+
+def _normalizar(modelo, registro):
+    obrigatorios, opcionais, listas = CAMPOS[modelo]
+    try:
+        linha = {campo: registro[campo] for campo in obrigatorios}
+        for campo, padrao in opcionais.items():
+            linha[campo] = registro.get(campo, padrao)
+        linha['ano'] = int(linha['ano'])
+        linha['numero'] = int(linha['numero'])
+        for campo in listas:
+            linha[campo] = como_lista(linha[campo])
+    except (KeyError, TypeError, ValueError) as e:
+        raise RegistroInvalido(f'{type(e).__name__}: {e}')
+    return linha
+
+
+def _comando_upsert(modelo):
+    """INSERT ... ON CONFLICT (chave) DO UPDATE, só quando algo mudou"""
+    tabela = modelo.__table__
+    obrigatorios, opcionais, _ = CAMPOS[modelo]
+    atualizaveis = [c for c in (*obrigatorios, *opcionais) if c not in CHAVE]
+    insercao = insert(tabela)
+    return insercao.on_conflict_do_update(
+        index_elements=[tabela.c[c] for c in CHAVE],
+        set_={c: insercao.excluded[c] for c in atualizaveis},
+        # Reimportar o mesmo arquivo não reescreve linhas (nem reindexa a busca)
+        where=or_(*(tabela.c[c].is_distinct_from(insercao.excluded[c]) for c in atualizaveis))
+    )
+
+
+def importar_questoes(caminho, modelo=QuestaoNova, tamanho_lote=TAMANHO_LOTE, dry_run=False, progresso=None):
+    """Importar (inserir ou atualizar) questões de um arquivo em lotes
+
+    As chaves (vestibular, ano, numero) existentes são lidas em uma única
+    consulta e cada lote é gravado com um único executemany de upsert, em
+    sua própria transação. Com dry_run nada é gravado. progresso, se
+    informado, é chamado com as estatísticas parciais após cada lote.
+    """
+    with db.engine.connect() as connection:
+        existentes = {
+            tuple(linha) for linha in connection.execute(
+                select(*(modelo.__table__.c[c] for c in CHAVE))
+            )
+        }
+    comando = _comando_upsert(modelo)
+    estatisticas = {'lidas': 0, 'inseridas': 0, 'existentes': 0, 'invalidas': 0, 'erros': []}
+
+    def gravar(lote):
+        if not dry_run:
+            with db.engine.begin() as connection:
+                connection.execute(comando, lote)
+        if progresso is not None:
+            progresso(estatisticas)
+
+    lote = []
+    for registro in ler_registros(caminho):
+        estatisticas['lidas'] += 1
+        try:
+            linha = _normalizar(modelo, registro)
+        except RegistroInvalido as e:
+            estatisticas['invalidas'] += 1
+            if len(estatisticas['erros']) < 10:
+                estatisticas['erros'].append(f"registro {estatisticas['lidas']}: {e}")
+            continue
+
+        chave = tuple(linha[c] for c in CHAVE)
+        if chave in existentes:
+            estatisticas['existentes'] += 1
+        else:
+            estatisticas['inseridas'] += 1
+            existentes.add(chave)
+
+        lote.append(linha)
+        if len(lote) >= tamanho_lote:
+            gravar(lote)
+            lote = []
+    if lote:
+        gravar(lote)
+
+    if not dry_run:
+        # O upsert em massa não passa pelos eventos do ORM que mantêm os contadores
+        with db.engine.begin() as connection:
+            reconstruir_contadores(connection)
+    return estatisticas
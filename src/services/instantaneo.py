@@ -0,0 +1,379 @@
+import fcntl
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from itertools import chain
+from flask import current_app
+from src.models.user import db
+from src.models.questao import Questao
+from src.models.questao_nova import QuestaoNova
+from src.models.tipos import FILTROS_SEM_CAIXA, sem_caixa
+from src.services.versao import versao_atual
+
+MAGICO = b'QSTINST1'
+# Tabelas do instantâneo e as colunas pelas quais as listagens filtram
+TABELAS = {
+    'questoes': (Questao, ('ano', 'vestibular', 'materia', 'assunto', 'dificuldade')),
+    'questoes_novas': (QuestaoNova, ('ano', 'materia', 'assunto', 'vestibular')),
+}
+# Intervalo (s) entre verificações de um arquivo novo e da versão dos dados
+INTERVALO_VERIFICACAO = 1.0
+# Intervalo mínimo (s) entre duas republicações em segundo plano; durante
+# uma sequência de escritas as leituras ficam no banco nesse meio-tempo
+INTERVALO_REPUBLICACAO = 10.0
+
+
+def _alinhar(arquivo):
+    resto = arquivo.tell() % 8
+    if resto:
+        arquivo.write(b'\0' * (8 - resto))
+
+
+def _escrever_tabela(arquivo, modelo, dimensoes, dumps):
+    """Gravar as seções de uma tabela e devolver sua descrição para o cabeçalho
+
+    As linhas ficam na ordem das listagens (ano DESC, numero ASC, id ASC), de
+    modo que posições crescentes já são a ordem de resposta.
+    """
+    ids = array('q')
+    numeros = array('i')
+    deslocamentos = array('Q', [0])
+    postagens = {dimensao: {} for dimensao in dimensoes}
+
+    _alinhar(arquivo)
+    inicio_blobs = arquivo.tell()
+    consulta = modelo.query.order_by(modelo.ano.desc(), modelo.numero.asc(), modelo.id.asc()).yield_per(2000)
+    for posicao, questao in enumerate(consulta):
+        dados = dumps(questao.to_dict()).encode('utf-8')
+        arquivo.write(dados)
+        deslocamentos.append(deslocamentos[-1] + len(dados))
+        ids.append(questao.id)
+        numeros.append(questao.numero)
+        for dimensao in dimensoes:
+            postagens[dimensao].setdefault(getattr(questao, dimensao), array('I')).append(posicao)
+
+    secoes = {'blobs': [inicio_blobs, deslocamentos[-1], 'B']}
+
+    def secao(nome, valores):
+        _alinhar(arquivo)
+        secoes[nome] = [arquivo.tell(), len(valores) * valores.itemsize, valores.typecode]
+        valores.tofile(arquivo)
+
+    # Busca por id: ids ordenados e a posição de cada um na ordem das listagens
+    ordem_ids = sorted(range(len(ids)), key=ids.__getitem__)
+    secao('ids', array('q', (ids[p] for p in ordem_ids)))
+    secao('posicao_por_id', array('I', ordem_ids))
+    secao('deslocamentos', deslocamentos)
+    secao('numero', numeros)
+
+    valores = {}
+    for dimensao, por_valor in postagens.items():
+        valores[dimensao] = []
+        for codigo, (valor, posicoes) in enumerate(sorted(por_valor.items(), key=lambda item: repr(item[0]))):
+            valores[dimensao].append(valor)
+            secao(f'{dimensao}:{codigo}', posicoes)
+    return {'linhas': len(ids), 'secoes': secoes, 'valores': valores}
+
+
+def publicar_instantaneo(caminho, tabelas=TABELAS, anterior=None):
+    """Gerar o arquivo do instantâneo e publicá-lo com os.replace()
+
+    Versões e linhas são lidas na mesma transação de leitura, então o
+    instantâneo corresponde exatamente às versões gravadas no cabeçalho. Os
+    workers que já mapearam o arquivo anterior continuam com ele até notar
+    o novo. Com anterior (um Instantaneo do mesmo banco), as tabelas cuja
+    versão não mudou são copiadas dele em vez de serializadas de novo.
+    Retorna {tabela: linhas}.
+    """
+    dumps = current_app.json.dumps
+    diretorio = os.path.dirname(os.path.abspath(caminho))
+    if anterior is not None and anterior.banco != str(db.engine.url):
+        anterior = None
+    descricao = {}
+    with tempfile.TemporaryFile(dir=diretorio) as dados:
+        for tabela, (modelo, dimensoes) in tabelas.items():
+            versao = versao_atual(tabela)
+            descricao[tabela] = {'versao': versao}
+            if anterior is not None and versao is not None and anterior.versao(tabela) == versao:
+                descricao[tabela].update(anterior.copiar_tabela(tabela, dados))
+            else:
+                descricao[tabela].update(_escrever_tabela(dados, modelo, dimensoes, dumps))
+
+        cabecalho = json.dumps({'banco': str(db.engine.url), 'tabelas': descricao}).encode('utf-8')
+        # Seções começam alinhadas em 8 bytes logo após o cabeçalho
+        inicio = len(MAGICO) + 16 + len(cabecalho)
+        inicio += -inicio % 8
+
+        descritor, temporario = tempfile.mkstemp(dir=diretorio, suffix='.tmp')
+        try:
+            with os.fdopen(descritor, 'wb') as arquivo:
+                arquivo.write(MAGICO)
+                arquivo.write(struct.pack('<QQ', len(cabecalho), inicio))
+                arquivo.write(cabecalho)
+                arquivo.write(b'\0' * (inicio - arquivo.tell()))
+                dados.seek(0)
+                while bloco := dados.read(1 << 20):
+                    arquivo.write(bloco)
+                arquivo.flush()
+                os.fsync(arquivo.fileno())
+            os.replace(temporario, caminho)
+        except BaseException:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+    # Encerrar a transação de leitura usada na geração
+    db.session.rollback()
+    return {tabela: info['linhas'] for tabela, info in descricao.items()}
+
+
+class TabelaInstantaneo:
+    """Colunas de uma tabela do instantâneo, lidas direto das páginas mapeadas"""
+
+    def __init__(self, memoria, inicio_dados, descricao):
+        self.versao = descricao['versao']
+        self.linhas = descricao['linhas']
+        self._secoes = {}
+        for nome, (inicio, tamanho, tipo) in descricao['secoes'].items():
+            inicio += inicio_dados
+            self._secoes[nome] = memoria[inicio:inicio + tamanho].cast(tipo)
+        self._blobs = self._secoes['blobs']
+        self._deslocamentos = self._secoes['deslocamentos']
+        self._ids = self._secoes['ids']
+        self._posicao_por_id = self._secoes['posicao_por_id']
+        self.numeros = self._secoes['numero']
+        # Valor do filtro -> códigos das seções; nos filtros sem caixa,
+        # 'ENEM' e 'enem' levam às mesmas seções
+        self._codigos = {}
+        for dimensao, valores in descricao['valores'].items():
+            normalizar = sem_caixa if dimensao in FILTROS_SEM_CAIXA else _identico
+            codigos = self._codigos[dimensao] = {}
+            for codigo, valor in enumerate(valores):
+                codigos.setdefault(normalizar(valor), []).append(codigo)
+
+    def json_posicao(self, posicao):
+        """JSON pronto (memoryview) da questão na posição dada"""
+        return self._blobs[self._deslocamentos[posicao]:self._deslocamentos[posicao + 1]]
+
+    def json_por_id(self, questao_id):
+        """JSON pronto da questão, ou None se o id não existir"""
+        i = bisect_left(self._ids, questao_id)
+        if i == len(self._ids) or self._ids[i] != questao_id:
+            return None
+        return self.json_posicao(self._posicao_por_id[i])
+
+    def filtrar(self, filtros):
+        """Posições (na ordem das listagens) das questões que atendem todos os filtros
+
+        filtros é {dimensao: valor}; valores vazios (None, '', 0) são ignorados. As
+        listas de posições de cada valor já estão ordenadas, então a menor
+        é percorrida e as demais só são consultadas por bisect.
+        """
+        listas = []
+        for dimensao, valor in filtros.items():
+            if not valor:
+                continue
+            if dimensao in FILTROS_SEM_CAIXA:
+                valor = sem_caixa(valor)
+            codigos = self._codigos[dimensao].get(valor)
+            if codigos is None:
+                return []
+            secoes = [self._secoes[f'{dimensao}:{codigo}'] for codigo in codigos]
+            listas.append(secoes[0] if len(secoes) == 1 else array('I', sorted(chain.from_iterable(secoes))))
+        if not listas:
+            return range(self.linhas)
+        listas.sort(key=len)
+        menor, outras = listas[0], listas[1:]
+        if not outras:
+            return menor
+        return [p for p in menor if all(_contem(lista, p) for lista in outras)]
+
+
+def _identico(valor):
+    return valor
+
+
+def _contem(lista, posicao):
+    i = bisect_left(lista, posicao)
+    return i < len(lista) and lista[i] == posicao
+
+
+class Instantaneo:
+    """Arquivo do instantâneo mapeado em memória (somente leitura)
+
+    Com MAP_SHARED as páginas vêm do cache de páginas do sistema, então
+    todos os workers compartilham uma única cópia.
+    """
+
+    def __init__(self, caminho):
+        with open(caminho, 'rb') as arquivo:
+            self.identidade = _identidade(os.fstat(arquivo.fileno()))
+            self._mmap = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        memoria = memoryview(self._mmap)
+        if memoria[:len(MAGICO)] != MAGICO:
+            raise ValueError(f'{caminho} não é um instantâneo de questões')
+        tamanho, inicio_dados = struct.unpack_from('<QQ', memoria, len(MAGICO))
+        inicio = len(MAGICO) + 16
+        cabecalho = json.loads(bytes(memoria[inicio:inicio + tamanho]))
+        # Banco de origem: um instantâneo de outro banco nunca é usado
+        self.banco = cabecalho['banco']
+        self.tabelas = {
+            tabela: TabelaInstantaneo(memoria, inicio_dados, descricao)
+            for tabela, descricao in cabecalho['tabelas'].items()
+        }
+        self._memoria = memoria
+        self._inicio_dados = inicio_dados
+        self._descricoes = cabecalho['tabelas']
+
+    def versao(self, tabela):
+        """Versão dos dados da tabela no instantâneo (None se ela não estiver nele)"""
+        descricao = self._descricoes.get(tabela)
+        return descricao['versao'] if descricao is not None else None
+
+    def copiar_tabela(self, tabela, arquivo):
+        """Copiar as seções de uma tabela para arquivo, como _escrever_tabela
+
+        As seções de uma tabela são contíguas, então a cópia é um único
+        bloco; os deslocamentos são corrigidos e o alinhamento de 8 bytes se
+        mantém. Retorna a descrição da tabela para o novo cabeçalho.
+        """
+        descricao = self._descricoes[tabela]
+        secoes = descricao['secoes']
+        inicio = min(posicao for posicao, _, _ in secoes.values())
+        fim = max(posicao + tamanho for posicao, tamanho, _ in secoes.values())
+        _alinhar(arquivo)
+        deslocamento = arquivo.tell() - inicio
+        arquivo.write(self._memoria[self._inicio_dados + inicio:self._inicio_dados + fim])
+        return {
+            'linhas': descricao['linhas'],
+            'secoes': {nome: [posicao + deslocamento, tamanho, tipo] for nome, (posicao, tamanho, tipo) in secoes.items()},
+            'valores': descricao['valores'],
+        }
+
+
+def _identidade(estado):
+    return (estado.st_ino, estado.st_mtime_ns, estado.st_size)
+
+
+class LeitorInstantaneo:
+    """Mantém o instantâneo publicado mais recente mapeado neste processo
+
+    A cada INTERVALO_VERIFICACAO o arquivo é conferido com os.stat(); se
+    outro processo publicou uma versão nova, ela é mapeada e trocada de uma
+    vez. Quando os dados do banco ficam mais novos que o instantâneo, uma
+    thread republica o arquivo (um processo por vez, via flock, e no máximo
+    uma vez a cada INTERVALO_REPUBLICACAO) reaproveitando as tabelas que não
+    mudaram; até lá, as leituras voltam ao banco.
+    """
+
+    def __init__(self, app, caminho):
+        self.app = app
+        self.caminho = caminho
+        self.banco = None
+        self._atual = None
+        self._verificado = 0.0
+        self._republicando = False
+        self._lock = threading.Lock()
+
+    def _recarregar(self):
+        agora = time.monotonic()
+        if agora - self._verificado < INTERVALO_VERIFICACAO:
+            return self._atual
+        self._verificado = agora
+        try:
+            identidade = _identidade(os.stat(self.caminho))
+        except FileNotFoundError:
+            self._atual = None
+            return None
+        if self._atual is None or self._atual.identidade != identidade:
+            try:
+                self._atual = Instantaneo(self.caminho)
+            except (OSError, ValueError):
+                self._atual = None
+        return self._atual
+
+    def tabela(self, nome):
+        """Tabela do instantâneo se ele estiver em dia com o banco, senão None"""
+        instantaneo = self._recarregar()
+        if instantaneo is None:
+            return None
+        if self.banco is None:
+            self.banco = str(db.engine.url)
+        tabela = instantaneo.tabelas.get(nome) if instantaneo.banco == self.banco else None
+        versao = versao_atual(nome, max_idade=INTERVALO_VERIFICACAO)
+        if tabela is None or versao is None:
+            return None
+        if tabela.versao != versao:
+            self._republicar()
+            return None
+        return tabela
+
+    def _republicar(self):
+        try:
+            # A data do arquivo vale para todos os workers
+            if time.time() - os.stat(self.caminho).st_mtime < INTERVALO_REPUBLICACAO:
+                return
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            if self._republicando:
+                return
+            self._republicando = True
+        threading.Thread(target=self._republicar_agora, name='instantaneo', daemon=True).start()
+
+    def _republicar_agora(self):
+        try:
+            with open(self.caminho + '.lock', 'w') as trava:
+                try:
+                    fcntl.flock(trava, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # Outro worker já está publicando
+                    return
+                with self.app.app_context():
+                    publicar_instantaneo(self.caminho, anterior=self._atual)
+        except Exception as e:
+            self.app.logger.warning('Falha ao republicar o instantâneo: %s', e)
+        finally:
+            self._republicando = False
+            self._verificado = 0.0
+
+
+def tabela_instantaneo(nome):
+    """Tabela do instantâneo em dia com o banco, ou None (use o banco)"""
+    leitor = current_app.extensions.get('instantaneo')
+    return leitor.tabela(nome) if leitor is not None else None
+
+
+def resposta_json(dados, status=200):
+    """Resposta com um JSON já codificado (bytes ou memoryview)"""
+    return current_app.response_class(bytes(dados), status=status, mimetype='application/json')
+
+
+def pagina_json(tabela, posicoes, page, per_page, navegacao=False):
+    """Corpo de uma listagem paginada montado com os JSONs prontos
+
+    Reproduz paginate(error_out=False) do Flask-SQLAlchemy: página menor que
+    1 vira 1 e per_page menor que 1 vira 20; current_page e per_page são
+    devolvidos como pedidos. navegacao inclui has_next/has_prev.
+    """
+    pagina = page if page >= 1 else 1
+    tamanho = per_page if per_page >= 1 else 20
+    total = len(posicoes)
+    pages = -(-total // tamanho) if total else 0
+    inicio = (pagina - 1) * tamanho
+    itens = [tabela.json_posicao(p) for p in posicoes[inicio:inicio + tamanho]]
+
+    dumps = current_app.json.dumps
+    campos = {'total': total, 'pages': pages, 'current_page': page, 'per_page': per_page}
+    if navegacao:
+        campos['has_next'] = pagina < pages
+        campos['has_prev'] = pagina > 1
+    partes = {nome: dumps(valor).encode('utf-8') for nome, valor in campos.items()}
+    partes['questoes'] = b'[' + b','.join(itens) + b']'
+    # Chaves em ordem alfabética, como nas respostas do jsonify
+    return b'{' + b','.join(b'"%s":%s' % (nome.encode(), partes[nome]) for nome in sorted(partes)) + b'}'
@@ -0,0 +1,303 @@
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from flask import request
+from sqlalchemy import event
+
+# Limites (s) das faixas do histograma de latência, como no Prometheus
+FAIXAS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Só quem acessa pelo próprio servidor pode ler /metrics
+ENDERECOS_LOCAIS = ('127.0.0.1', '::1')
+
+_medicao_atual = ContextVar('medicao_atual', default=None)
+
+
+class Medicao:
+    """Custos de uma requisição, acumulados pelos ganchos do SQLAlchemy e do JSON"""
+
+    __slots__ = ('consultas', 'tempo_sql', 'tempo_serializacao', 'profundidade_serializacao')
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_sql = 0.0
+        self.tempo_serializacao = 0.0
+        self.profundidade_serializacao = 0
+
+
+class _SerieEndpoint:
+    __slots__ = ('faixas', 'soma', 'quantidade', 'consultas', 'tempo_sql', 'tempo_serializacao', 'bytes')
+
+    def __init__(self):
+        self.faixas = [0] * (len(FAIXAS_LATENCIA) + 1)
+        self.soma = 0.0
+        self.quantidade = 0
+        self.consultas = 0
+        self.tempo_sql = 0.0
+        self.tempo_serializacao = 0.0
+        self.bytes = 0
+
+
+class Metricas:
+    """Histogramas e totais por (endpoint, método) do processo atual
+
+    Cada worker do gunicorn tem seu próprio registro; /metrics mostra o do
+    worker que atendeu a requisição (o rótulo pid identifica qual).
+    """
+
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+        # Funções que devolvem [(nome, tipo, ajuda, valor)] de outros módulos
+        self.coletores = []
+
+    def registrar(self, endpoint, metodo, duracao, medicao, tamanho):
+        chave = (endpoint, metodo)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = _SerieEndpoint()
+            serie.faixas[bisect_left(FAIXAS_LATENCIA, duracao)] += 1
+            serie.soma += duracao
+            serie.quantidade += 1
+            serie.consultas += medicao.consultas
+            serie.tempo_sql += medicao.tempo_sql
+            serie.tempo_serializacao += medicao.tempo_serializacao
+            serie.bytes += tamanho
+
+    def exportar(self):
+        """Texto no formato de exposição do Prometheus (versão 0.0.4)"""
+        pid = os.getpid()
+        with self._lock:
+            series = sorted(self._series.items())
+            series = [(chave, _copiar(serie)) for chave, serie in series]
+
+        linhas = [
+            '# HELP http_requisicoes_segundos Latência das requisições por endpoint.',
+            '# TYPE http_requisicoes_segundos histogram',
+        ]
+        for (endpoint, metodo), serie in series:
+            rotulos = f'endpoint="{endpoint}",metodo="{metodo}",pid="{pid}"'
+            acumulado = 0
+            for limite, quantidade in zip((*FAIXAS_LATENCIA, '+Inf'), serie.faixas):
+                acumulado += quantidade
+                linhas.append(f'http_requisicoes_segundos_bucket{{{rotulos},le="{limite}"}} {acumulado}')
+            linhas.append(f'http_requisicoes_segundos_sum{{{rotulos}}} {serie.soma:.6f}')
+            linhas.append(f'http_requisicoes_segundos_count{{{rotulos}}} {serie.quantidade}')
+
+        totais = (
+            ('sql_consultas_total', 'Consultas SQL executadas.', 'consultas', '{}'),
+            ('sql_segundos_total', 'Tempo gasto em consultas SQL.', 'tempo_sql', '{:.6f}'),
+            ('serializacao_segundos_total', 'Tempo gasto serializando JSON.', 'tempo_serializacao', '{:.6f}'),
+            ('resposta_bytes_total', 'Bytes enviados no corpo das respostas.', 'bytes', '{}'),
+        )
+        for nome, ajuda, atributo, formato in totais:
+            linhas.append(f'# HELP {nome} {ajuda}')
+            linhas.append(f'# TYPE {nome} counter')
+            for (endpoint, metodo), serie in series:
+                valor = formato.format(getattr(serie, atributo))
+                linhas.append(f'{nome}{{endpoint="{endpoint}",metodo="{metodo}",pid="{pid}"}} {valor}')
+
+        for coletor in self.coletores:
+            for nome, tipo, ajuda, valor in coletor():
+                linhas.append(f'# HELP {nome} {ajuda}')
+                linhas.append(f'# TYPE {nome} {tipo}')
+                linhas.append(f'{nome}{{pid="{pid}"}} {valor}')
+        return '\n'.join(linhas) + '\n'
+
+
+def _copiar(serie):
+    copia = _SerieEndpoint()
+    for atributo in _SerieEndpoint.__slots__:
+        valor = getattr(serie, atributo)
+        setattr(copia, atributo, list(valor) if isinstance(valor, list) else valor)
+    return copia
+
+
+class PerfiladorAmostral:
+    """Amostrar as pilhas das threads em requisição e salvar as das lentas
+
+    Uma thread lê sys._current_frames() a cada intervalo e guarda a pilha de
+    cada thread que está atendendo uma requisição. Ao fim de uma requisição
+    mais lenta que limiar, as amostras são gravadas no formato "folded"
+    (uma linha "func;func;func N" por pilha), aceito pelo flamegraph.pl e
+    pelo speedscope.
+    """
+
+    def __init__(self, diretorio, limiar=0.5, intervalo=0.005):
+        self.diretorio = diretorio
+        self.limiar = limiar
+        self.intervalo = intervalo
+        self._amostras = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _garantir_thread(self):
+        # Como a fila de escrita: uma thread por processo, iniciada no primeiro uso
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._amostras = {}
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._amostrar, name='perfilador', daemon=True)
+                self._thread.start()
+
+    def iniciar(self):
+        self._garantir_thread()
+        with self._lock:
+            self._amostras[threading.get_ident()] = {}
+
+    def finalizar(self, endpoint, duracao):
+        with self._lock:
+            pilhas = self._amostras.pop(threading.get_ident(), None)
+        if not pilhas or duracao < self.limiar:
+            return None
+        os.makedirs(self.diretorio, exist_ok=True)
+        nome = f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{endpoint}-{int(duracao * 1000)}ms.folded'
+        caminho = os.path.join(self.diretorio, nome)
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            for pilha, quantidade in sorted(pilhas.items()):
+                arquivo.write(f'{pilha} {quantidade}\n')
+        return caminho
+
+    def _amostrar(self):
+        while True:
+            time.sleep(self.intervalo)
+            with self._lock:
+                ativas = list(self._amostras)
+            if not ativas:
+                continue
+            quadros = sys._current_frames()
+            for ident in ativas:
+                quadro = quadros.get(ident)
+                if quadro is None:
+                    continue
+                pilha = []
+                while quadro is not None:
+                    codigo = quadro.f_code
+                    pilha.append(f'{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{quadro.f_lineno})')
+                    quadro = quadro.f_back
+                pilha = ';'.join(reversed(pilha))
+                with self._lock:
+                    contagem = self._amostras.get(ident)
+                    if contagem is not None:
+                        contagem[pilha] = contagem.get(pilha, 0) + 1
+
+
+class _CorpoMedido:
+    """Repassar o corpo da resposta contando os bytes e fechar a medição no close()"""
+
+    def __init__(self, corpo, finalizar):
+        self._corpo = corpo
+        self._finalizar = finalizar
+        self._bytes = 0
+
+    def __iter__(self):
+        for bloco in self._corpo:
+            self._bytes += len(bloco)
+            yield bloco
+
+    def close(self):
+        try:
+            if hasattr(self._corpo, 'close'):
+                self._corpo.close()
+        finally:
+            self._finalizar(self._bytes)
+
+
+class MiddlewareMetricas:
+    """Middleware WSGI que mede cada requisição e a registra em Metricas"""
+
+    def __init__(self, app_wsgi, metricas, perfilador=None):
+        self.app_wsgi = app_wsgi
+        self.metricas = metricas
+        self.perfilador = perfilador
+
+    def __call__(self, environ, start_response):
+        medicao = Medicao()
+        token = _medicao_atual.set(medicao)
+        inicio = time.perf_counter()
+        if self.perfilador is not None:
+            self.perfilador.iniciar()
+
+        def finalizar(tamanho):
+            duracao = time.perf_counter() - inicio
+            endpoint = environ.get('metricas.endpoint') or 'nao_encontrado'
+            self.metricas.registrar(endpoint, environ.get('REQUEST_METHOD', ''), duracao, medicao, tamanho)
+            if self.perfilador is not None:
+                self.perfilador.finalizar(endpoint, duracao)
+            _medicao_atual.reset(token)
+
+        try:
+            corpo = self.app_wsgi(environ, start_response)
+        except Exception:
+            finalizar(0)
+            raise
+        return _CorpoMedido(corpo, finalizar)
+
+
+def _antes_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    if _medicao_atual.get() is not None:
+        conn.info.setdefault('metricas_inicio', []).append(time.perf_counter())
+
+
+def _depois_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    medicao = _medicao_atual.get()
+    inicios = conn.info.get('metricas_inicio')
+    if medicao is None or not inicios:
+        return
+    medicao.consultas += 1
+    medicao.tempo_sql += time.perf_counter() - inicios.pop()
+
+
+def _medir_serializacao(funcao):
+    def medida(*args, **kwargs):
+        medicao = _medicao_atual.get()
+        if medicao is None:
+            return funcao(*args, **kwargs)
+        # dumps() chamado de dentro de response() não conta duas vezes
+        medicao.profundidade_serializacao += 1
+        inicio = time.perf_counter()
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            medicao.profundidade_serializacao -= 1
+            if medicao.profundidade_serializacao == 0:
+                medicao.tempo_serializacao += time.perf_counter() - inicio
+    return medida
+
+
+def instrumentar(app, engine):
+    """Ligar as métricas na aplicação: middleware, ganchos de SQL e JSON e /metrics"""
+    metricas = Metricas()
+    perfilador = None
+    if app.config['PERFILADOR_ATIVO']:
+        perfilador = PerfiladorAmostral(
+            app.config['PERFILADOR_DIRETORIO'],
+            limiar=app.config['PERFILADOR_LIMIAR_MS'] / 1000,
+            intervalo=app.config['PERFILADOR_INTERVALO_MS'] / 1000
+        )
+    app.extensions['metricas'] = metricas
+    if 'cache_consultas' in app.extensions:
+        metricas.coletores.append(app.extensions['cache_consultas'].metricas)
+    app.wsgi_app = MiddlewareMetricas(app.wsgi_app, metricas, perfilador)
+
+    event.listen(engine, 'before_cursor_execute', _antes_da_consulta)
+    event.listen(engine, 'after_cursor_execute', _depois_da_consulta)
+
+    app.json.response = _medir_serializacao(app.json.response)
+    app.json.dumps = _medir_serializacao(app.json.dumps)
+
+    @app.before_request
+    def _anotar_endpoint():
+        request.environ['metricas.endpoint'] = request.endpoint
+
+    @app.route('/metrics')
+    def metrics():
+        if request.remote_addr not in ENDERECOS_LOCAIS:
+            return "Not found", 404
+        return app.response_class(metricas.exportar(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,170 @@
+import json
+from sqlalchemy import text
+from src.models.tipos import SEPARADOR_LISTA
+from src.models.user import db
+from src.models import contador, estatistica, questao, questao_nova
+from src.services.busca import configurar_busca
+from src.services.contadores import reconstruir_contadores
+from src.services.resultados import reconstruir_desempenho
+from src.services.sincronizacao import configurar_sincronizacao, recriar_gatilhos, registrar_existentes
+from src.services.versao import configurar_versoes
+
+# Módulos cujas tabelas precisam estar registradas no metadata antes de
+# create_all() e da criação de índices
+MODELOS_REGISTRADOS = (contador, estatistica, questao, questao_nova)
+
+
+def _criar_busca_textual(connection):
+    configurar_busca(connection)
+
+
+def _criar_indices(connection):
+    # create_all() não adiciona índices a tabelas que já existem, então os
+    # índices declarados nos modelos são criados aqui para bancos antigos
+    for tabela in db.metadata.sorted_tables:
+        for indice in tabela.indexes:
+            indice.create(connection, checkfirst=True)
+
+
+def _criar_versoes_dados(connection):
+    configurar_versoes(connection)
+
+
+def _converter_listas_json(connection):
+    # Listas passaram de JSON para texto unido por SEPARADOR_LISTA
+    colunas = {
+        'questoes': ('alternativas',),
+        'questoes_novas': ('alternativas', 'alternativas_numeracao', 'alternativas_corretas'),
+    }
+    for tabela, nomes in colunas.items():
+        for coluna in nomes:
+            linhas = connection.execute(
+                text(f"SELECT id, {coluna} FROM {tabela} WHERE {coluna} LIKE '[%'")
+            ).all()
+            if not linhas:
+                continue
+            connection.execute(
+                text(f"UPDATE {tabela} SET {coluna} = :valor WHERE id = :id"),
+                [
+                    {'id': id_, 'valor': SEPARADOR_LISTA.join(str(item) for item in json.loads(valor))}
+                    for id_, valor in linhas
+                ]
+            )
+
+
+def _popular_contadores(connection):
+    reconstruir_contadores(connection)
+
+
+def _adicionar_coluna(connection, tabela, coluna, tipo):
+    colunas = [linha[1] for linha in connection.exec_driver_sql(f'PRAGMA table_info({tabela})')]
+    if coluna not in colunas:
+        connection.exec_driver_sql(f'ALTER TABLE {tabela} ADD COLUMN {coluna} {tipo}')
+
+
+def _normalizar_questoes_simulados(connection):
+    # questoes_ids (JSON) passa a ter uma tabela ordenada equivalente;
+    # o conteúdo compilado dos simulados antigos é gerado na primeira leitura
+    _adicionar_coluna(connection, 'simulados', 'conteudo', 'TEXT')
+    linhas = connection.execute(text(
+        "SELECT id, questoes_ids FROM simulados "
+        "WHERE id NOT IN (SELECT DISTINCT simulado_id FROM simulados_questoes)"
+    )).all()
+    registros = [
+        {'simulado_id': simulado_id, 'posicao': posicao, 'questao_id': int(questao_id)}
+        for simulado_id, questoes_ids in linhas
+        for posicao, questao_id in enumerate(json.loads(questoes_ids or '[]'))
+    ]
+    if registros:
+        connection.execute(text(
+            "INSERT INTO simulados_questoes (simulado_id, posicao, questao_id) "
+            "VALUES (:simulado_id, :posicao, :questao_id)"
+        ), registros)
+
+
+def _criar_chaves_naturais(connection):
+    # Os índices (vestibular, ano[, numero]) passam a ser únicos; falha se
+    # houver questões duplicadas, que precisam ser resolvidas antes
+    connection.exec_driver_sql('DROP INDEX IF EXISTS ix_questoes_vestibular_ano')
+    connection.exec_driver_sql('DROP INDEX IF EXISTS ix_questoes_novas_vestibular_ano_numero')
+    _criar_indices(connection)
+
+
+def _popular_desempenho(connection):
+    reconstruir_desempenho(connection)
+
+
+
+def _criar_sincronizacao(connection):
+    # updated_at das questões antigas parte do created_at; depois disso os
+    # gatilhos mantêm o registro de alterações usado por /api/sincronizacao
+    for tabela in ('questoes', 'questoes_novas'):
+        _adicionar_coluna(connection, tabela, 'updated_at', 'DATETIME')
+        connection.exec_driver_sql(f'UPDATE {tabela} SET updated_at = created_at WHERE updated_at IS NULL')
+    configurar_sincronizacao(connection)
+    registrar_existentes(connection)
+
+
+def _ordenar_indices_questoes(connection):
+    # A listagem de questoes passou a ordenar por ano DESC, numero ASC também
+    # no banco; os índices dos filtros são trocados por versões nessa ordem
+    for nome in ('ix_questoes_materia_assunto', 'ix_questoes_assunto', 'ix_questoes_dificuldade'):
+        connection.exec_driver_sql(f'DROP INDEX IF EXISTS {nome}')
+    _criar_indices(connection)
+
+
+def _indices_sem_caixa(connection):
+    # vestibular, materia e assunto passaram a ser filtrados com COLLATE
+    # NOCASE; os índices desses filtros são recriados com a mesma collation
+    for nome in ('ix_questoes_vestibular_ano_numero', 'ix_questoes_materia_ano_numero',
+                 'ix_questoes_assunto_ano_numero', 'ix_questoes_novas_materia_ano_numero',
+                 'ix_questoes_novas_assunto_ano_numero'):
+        connection.exec_driver_sql(f'DROP INDEX IF EXISTS {nome}')
+    _criar_indices(connection)
+
+
+def _corrigir_gatilhos_sincronizacao(connection):
+    # Os gatilhos com INSERT OR REPLACE falhavam dentro do upsert da importação
+    recriar_gatilhos(connection)
+
+
+# Cada posição da lista é uma versão do esquema (PRAGMA user_version).
+# Novas migrações devem ser sempre acrescentadas ao final.
+MIGRACOES = [
+    _criar_busca_textual,
+    _criar_indices,
+    _criar_versoes_dados,
+    _converter_listas_json,
+    _popular_contadores,
+    _normalizar_questoes_simulados,
+    _criar_chaves_naturais,
+    _popular_desempenho,
+    _criar_sincronizacao,
+    _ordenar_indices_questoes,
+    _indices_sem_caixa,
+    _corrigir_gatilhos_sincronizacao,
+]
+
+
+def aplicar_migracoes(connection):
+    """Atualizar o esquema de um banco SQLite existente até a última versão
+
+    Retorna a lista com o número das migrações aplicadas.
+    """
+    if connection.dialect.name != 'sqlite':
+        return []
+
+    versao = connection.exec_driver_sql('PRAGMA user_version').scalar()
+    aplicadas = []
+    for numero, migracao in enumerate(MIGRACOES[versao:], start=versao + 1):
+        migracao(connection)
+        connection.exec_driver_sql(f'PRAGMA user_version = {numero}')
+        aplicadas.append(numero)
+    return aplicadas
+
+
+def criar_esquema():
+    """Criar as tabelas que faltam e aplicar as migrações (requer app context)"""
+    db.create_all()
+    with db.engine.begin() as connection:
+        return aplicar_migracoes(connection)
@@ -0,0 +1,61 @@
+import base64
+import binascii
+import json
+from sqlalchemy import and_, or_
+
+
+class CursorInvalido(ValueError):
+    """Cursor recebido do cliente não pôde ser decodificado"""
+
+
+def codificar_cursor(ano, numero, questao_id):
+    """Gerar o cursor opaco que aponta para depois da questão informada"""
+    bruto = json.dumps([ano, numero, questao_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(bruto).rstrip(b'=').decode()
+
+
+def decodificar_cursor(cursor):
+    """Extrair (ano, numero, id) de um cursor gerado por codificar_cursor"""
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        ano, numero, questao_id = json.loads(bruto)
+    except (binascii.Error, ValueError, TypeError):
+        raise CursorInvalido(cursor)
+    if not all(isinstance(v, int) for v in (ano, numero, questao_id)):
+        raise CursorInvalido(cursor)
+    return ano, numero, questao_id
+
+
+def paginar_por_cursor(query, modelo, cursor, per_page):
+    """Paginar pela chave estável (ano DESC, numero ASC, id ASC)
+
+    Ao contrário de paginate(), não executa COUNT(*) nem usa OFFSET: cada
+    página é uma única consulta por faixa da chave de ordenação, com custo
+    constante independentemente da profundidade. Retorna os itens da página
+    e o cursor da próxima (None quando não há mais páginas). per_page
+    menor que 1 vira 20, como em paginate(error_out=False).
+    """
+    if per_page < 1:
+        per_page = 20
+    query = query.order_by(None).order_by(
+        modelo.ano.desc(), modelo.numero.asc(), modelo.id.asc()
+    )
+
+    if cursor:
+        ano, numero, questao_id = decodificar_cursor(cursor)
+        query = query.filter(or_(
+            modelo.ano < ano,
+            and_(modelo.ano == ano, or_(
+                modelo.numero > numero,
+                and_(modelo.numero == numero, modelo.id > questao_id)
+            ))
+        ))
+
+    # Buscar um item a mais apenas para saber se existe próxima página
+    itens = query.limit(per_page + 1).all()
+    if len(itens) <= per_page:
+        return itens, None
+
+    itens = itens[:per_page]
+    ultimo = itens[-1]
+    return itens, codificar_cursor(ultimo.ano, ultimo.numero, ultimo.id)
@@ -0,0 +1,138 @@
+import re
+from contextlib import contextmanager
+from sqlalchemy import event
+from src.models.user import db
+from src.services.cache_consultas import CacheConsultas
+
+# Requisições representativas de cada endpoint de leitura. O plano de toda
+# consulta SQL que elas geram é verificado com EXPLAIN QUERY PLAN.
+CENARIOS = [
+    '/api/questoes',
+    '/api/questoes?page=3',
+    '/api/questoes?ano=2024',
+    '/api/questoes?vestibular=ENEM',
+    '/api/questoes?vestibular=ENEM&ano=2024',
+    '/api/questoes?vestibular=enem',
+    '/api/questoes?materia=Linguagens',
+    '/api/questoes?materia=Linguagens&assunto=Inglês',
+    '/api/questoes?assunto=Inglês',
+    '/api/questoes?dificuldade=Média',
+    '/api/questoes?busca=energia',
+    '/api/questoes?cursor=',
+    '/api/questoes?cursor=WzIwMjQsMSwxXQ',
+    '/api/questoes/1',
+    '/api/questoes-novas',
+    '/api/questoes-novas?page=3',
+    '/api/questoes-novas?ano=2024',
+    '/api/questoes-novas?vestibular=PAS-UEM',
+    '/api/questoes-novas?materia=Filosofia',
+    '/api/questoes-novas?assunto=Liberdade',
+    '/api/questoes-novas?busca=liberdade',
+    '/api/questoes-novas?cursor=',
+    '/api/questoes-novas?cursor=WzIwMjQsMSwxXQ',
+    '/api/questoes-novas/1',
+    '/api/questoes_pas_uem',
+    '/api/simulados',
+    '/api/resultados/aluno',
+    '/api/estatisticas',
+    '/api/questoes-novas/estatisticas',
+    '/api/desempenho/aluno',
+    '/api/desempenho/aluno/tendencia',
+    '/api/desempenho/aluno/topicos-fracos',
+    '/api/desempenho/aluno/percentil',
+    '/api/sincronizacao/questoes-novas',
+    '/api/sincronizacao/questoes-novas?since=10&vestibular=PAS-UEM',
+    '/api/sincronizacao/questoes?since=1',
+    # Correção sem gravar resultado: também pode rodar contra o banco de produção
+    ('POST', '/api/questoes-novas/1/verificar-resposta', {'alternativas_selecionadas': ['01']}),
+    ('POST', '/api/questoes-novas/verificar-respostas', {'respostas': {'1': ['01'], '2': ['02', '04']}}),
+]
+
+# Comandos cujo plano é verificado; INSERT não tem WHERE a conferir
+_COMANDOS_VERIFICADOS = ('SELECT', 'UPDATE', 'DELETE')
+
+# "SCAN tabela" sem "USING ... INDEX" é uma leitura completa da tabela
+_LEITURA_COMPLETA = re.compile(r'^SCAN (\w+)$')
+
+
+def _problemas_do_plano(sql, plano):
+    problemas = []
+    filtra = re.search(r'\bWHERE\b', sql, re.IGNORECASE) is not None
+    # Resultados da busca textual são ordenados pela relevância, que só
+    # existe depois do MATCH; essa ordenação é esperada.
+    busca_textual = re.search(r'\bMATCH\b', sql) is not None
+    for detalhe in plano:
+        leitura = _LEITURA_COMPLETA.match(detalhe)
+        if filtra and leitura and not leitura.group(1).startswith('sqlite_'):
+            problemas.append(detalhe)
+        elif detalhe.startswith('USE TEMP B-TREE FOR ORDER BY') and not busca_textual:
+            problemas.append(detalhe)
+    return problemas
+
+
+@contextmanager
+def consultas_executadas(engine):
+    """Registrar (sql, parâmetros) de cada SELECT, UPDATE e DELETE executado no bloco
+
+    Em um executemany fica só o primeiro conjunto de parâmetros, que basta
+    para o plano.
+    """
+    consultas = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(_COMANDOS_VERIFICADOS):
+            consultas.append((statement, parameters[0] if executemany else parameters))
+
+    event.listen(engine, 'before_cursor_execute', capturar)
+    try:
+        yield consultas
+    finally:
+        event.remove(engine, 'before_cursor_execute', capturar)
+
+
+def problemas_das_consultas(engine, consultas):
+    """[(sql, [detalhes problemáticos])] das consultas com plano regredido"""
+    problemas = []
+    with engine.connect() as connection:
+        for sql, parametros in consultas:
+            linhas = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}', parametros).all()
+            detalhes = _problemas_do_plano(sql, [linha[-1] for linha in linhas])
+            if detalhes:
+                problemas.append((sql, detalhes))
+    return problemas
+
+
+def _requisitar(cliente, cenario):
+    """Executar um cenário: uma URL (GET) ou (método, URL, corpo JSON)"""
+    if isinstance(cenario, str):
+        return cenario, cliente.get(cenario)
+    metodo, url, corpo = cenario
+    return f'{metodo} {url}', cliente.open(url, method=metodo, json=corpo)
+
+
+def verificar_planos(app, cenarios=CENARIOS):
+    """Executar os cenários e devolver as consultas com plano regredido
+
+    Retorna uma lista de (cenário, sql, [detalhes problemáticos]). Consultas
+    filtradas que leem a tabela inteira ou que ordenam em uma árvore
+    temporária, em vez de usar um índice, são consideradas regressões.
+    Cenários com escrita (ex.: gravar um resultado) só devem ser passados
+    contra um banco de teste.
+    """
+    regressoes = []
+    # Interessam as consultas ao banco: instantâneo e cache ficam de fora
+    extensoes = dict(app.extensions)
+    app.extensions.pop('instantaneo', None)
+    app.extensions['cache_consultas'] = CacheConsultas()
+    with app.app_context():
+        engine = db.engine
+        cliente = app.test_client()
+        try:
+            for cenario in cenarios:
+                with consultas_executadas(engine) as consultas:
+                    nome, _ = _requisitar(cliente, cenario)
+                for sql, detalhes in problemas_das_consultas(engine, consultas):
+                    regressoes.append((nome, sql, detalhes))
+        finally:
+            app.extensions.update(extensoes)
+    return regressoes
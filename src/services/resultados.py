@@ -0,0 +1,244 @@
+import json
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert
+from src.models.user import db
+from src.models.questao import Questao, ResultadoSimulado, SimuladoQuestao
+from src.models.questao_nova import QuestaoNova
+from src.models.estatistica import (
+    EstatisticaQuestao, EstatisticaSimulado, EstatisticaUsuario, EstatisticaUsuarioTopico
+)
+from src.services.contadores import reconstruir_contadores
+from src.services.desempenho import acumular_topico, atualizar_desempenho
+from src.services.fila_escrita import fila_escrita
+from src.services.gabarito import AlternativaInvalida, para_mascara
+from src.services.simulados import questoes_do_simulado
+
+
+class TempoInvalido(ValueError):
+    """tempo_gasto enviado não é um número inteiro de segundos não negativo"""
+
+
+def _ler_tempo(tempo):
+    """Segundos de um tempo_gasto (0 se ausente)"""
+    if not tempo:
+        return 0
+    try:
+        if isinstance(tempo, bool):
+            raise TypeError
+        segundos = int(tempo)
+    except (TypeError, ValueError, OverflowError):
+        raise TempoInvalido(f'tempo_gasto inválido: {tempo!r}')
+    if segundos < 0:
+        raise TempoInvalido(f'tempo_gasto inválido: {tempo!r}')
+    return segundos
+
+
+def _normalizar_resposta(valor):
+    """Aceitar "A" ou {"resposta": "A", "tempo_gasto": 30}"""
+    if isinstance(valor, dict):
+        resposta, tempo = valor.get('resposta'), valor.get('tempo_gasto')
+    else:
+        resposta, tempo = valor, None
+    resposta = resposta.strip().upper() if isinstance(resposta, str) else None
+    return resposta, _ler_tempo(tempo)
+
+
+def _corrigir(simulado_id, respostas):
+    """(pontuacao, total_questoes, linhas de EstatisticaQuestao, totais por tópico) das respostas"""
+    questoes = questoes_do_simulado(
+        simulado_id, Questao.id, Questao.resposta_correta, Questao.materia, Questao.assunto
+    ).all()
+    gabarito = {questao_id: resposta_correta for questao_id, resposta_correta, _, _ in questoes}
+    topicos = {questao_id: (materia, assunto) for questao_id, _, materia, assunto in questoes}
+
+    pontuacao = 0
+    por_questao = []
+    por_topico = {}
+    for questao_id, valor in respostas.items():
+        try:
+            questao_id = int(questao_id)
+        except (TypeError, ValueError):
+            continue
+        if questao_id not in gabarito:
+            continue
+        resposta, tempo = _normalizar_resposta(valor)
+        acertou = resposta is not None and resposta == gabarito[questao_id]
+        pontuacao += acertou
+        por_questao.append({
+            'questao_id': questao_id,
+            'tentativas': 1,
+            'acertos': int(acertou),
+            'soma_tempo_gasto': tempo
+        })
+        acumular_topico(por_topico, *topicos[questao_id], acertou, tempo)
+    return pontuacao, len(gabarito), por_questao, por_topico
+
+
+def _gravar(resultado, por_questao, por_topico):
+    """Inserir o resultado e somar os agregados (roda na fila de escrita)"""
+    insercao = insert(EstatisticaSimulado).values(
+        simulado_id=resultado.simulado_id,
+        tentativas=1,
+        soma_pontuacao=resultado.pontuacao,
+        soma_questoes=resultado.total_questoes,
+        soma_tempo_gasto=resultado.tempo_gasto or 0
+    )
+    db.session.execute(insercao.on_conflict_do_update(
+        index_elements=[EstatisticaSimulado.simulado_id],
+        set_={
+            'tentativas': EstatisticaSimulado.tentativas + 1,
+            'soma_pontuacao': EstatisticaSimulado.soma_pontuacao + insercao.excluded.soma_pontuacao,
+            'soma_questoes': EstatisticaSimulado.soma_questoes + insercao.excluded.soma_questoes,
+            'soma_tempo_gasto': EstatisticaSimulado.soma_tempo_gasto + insercao.excluded.soma_tempo_gasto
+        }
+    ))
+
+    if por_questao:
+        insercao = insert(EstatisticaQuestao)
+        db.session.execute(insercao.on_conflict_do_update(
+            index_elements=[EstatisticaQuestao.questao_id],
+            set_={
+                'tentativas': EstatisticaQuestao.tentativas + 1,
+                'acertos': EstatisticaQuestao.acertos + insercao.excluded.acertos,
+                'soma_tempo_gasto': EstatisticaQuestao.soma_tempo_gasto + insercao.excluded.soma_tempo_gasto
+            }
+        ), por_questao)
+
+    return _adicionar(resultado, por_topico)
+
+
+def _adicionar(resultado, por_topico):
+    db.session.add(resultado)
+    atualizar_desempenho(
+        resultado.usuario_nome, resultado.pontuacao, resultado.total_questoes, resultado.tempo_gasto, por_topico
+    )
+    db.session.flush()
+    return resultado.to_dict()
+
+
+def registrar_resultado(simulado_id, usuario_nome, respostas, tempo_gasto=None):
+    """Corrigir as respostas no servidor e gravar o resultado
+
+    O gabarito de todas as questões do simulado é lido em uma única
+    consulta, ainda na requisição. O resultado e os agregados por simulado e
+    por questão são gravados juntos pela fila de escrita, que faz o commit.
+    Retorna o resultado gravado como dicionário. Um tempo_gasto que não
+    seja um número de segundos levanta TempoInvalido.
+    """
+    if tempo_gasto is not None:
+        tempo_gasto = _ler_tempo(tempo_gasto)
+    pontuacao, total_questoes, por_questao, por_topico = _corrigir(simulado_id, respostas)
+    resultado = ResultadoSimulado(
+        simulado_id=simulado_id,
+        usuario_nome=usuario_nome,
+        respostas=respostas,
+        pontuacao=pontuacao,
+        total_questoes=total_questoes,
+        tempo_gasto=tempo_gasto
+    )
+    return fila_escrita().executar(_gravar, resultado, por_questao, por_topico)
+
+
+def salvar_resultado(resultado, por_topico=None):
+    """Gravar um ResultadoSimulado já corrigido pela fila de escrita (retorna o dicionário)
+
+    Passa pelo mesmo _gravar de registrar_resultado, então os agregados do
+    simulado e do usuário são atualizados na mesma transação. Os agregados
+    por questão ficam de fora: estatisticas_questoes é indexada pelos ids
+    de questoes, e quem chama corrige questões novas. por_topico
+    ({(materia, assunto): [tentativas, acertos, tempo]}, veja
+    acumular_topico) alimenta o desempenho do usuário por tópico. Um
+    tempo_gasto inválido levanta TempoInvalido.
+    """
+    if resultado.tempo_gasto is not None:
+        resultado.tempo_gasto = _ler_tempo(resultado.tempo_gasto)
+    return fila_escrita().executar(_gravar, resultado, [], por_topico)
+
+
+def reconstruir_desempenho(connection):
+    """Recalcular o desempenho de todos os usuários a partir dos resultados gravados
+
+    Usado para popular os agregados em bancos antigos e para reparos. As
+    respostas em texto ("A") são de simulados (questoes); as listas de
+    alternativas vêm da correção de questoes_novas.
+    """
+    usuarios = EstatisticaUsuario.__table__
+    topicos = EstatisticaUsuarioTopico.__table__
+    resultados = ResultadoSimulado.__table__
+    connection.execute(usuarios.delete())
+    connection.execute(topicos.delete())
+    connection.execute(usuarios.insert().from_select(
+        ['usuario_nome', 'resultados', 'soma_pontuacao', 'soma_questoes', 'soma_tempo_gasto'],
+        select(
+            resultados.c.usuario_nome,
+            func.count(),
+            func.sum(resultados.c.pontuacao),
+            func.sum(resultados.c.total_questoes),
+            func.sum(func.coalesce(resultados.c.tempo_gasto, 0))
+        ).group_by(resultados.c.usuario_nome)
+    ))
+
+    questoes = {
+        linha.id: linha[1:] for linha in connection.execute(
+            select(Questao.id, Questao.resposta_correta, Questao.materia, Questao.assunto)
+        )
+    }
+    questoes_novas = {}
+    for linha in connection.execute(
+        select(QuestaoNova.id, QuestaoNova.alternativas_corretas, QuestaoNova.materia, QuestaoNova.assunto)
+    ):
+        try:
+            questoes_novas[linha.id] = (para_mascara(linha.alternativas_corretas), linha.materia, linha.assunto)
+        except AlternativaInvalida:
+            continue
+    do_simulado = {}
+    for simulado_id, questao_id in connection.execute(select(SimuladoQuestao.simulado_id, SimuladoQuestao.questao_id)):
+        do_simulado.setdefault(simulado_id, set()).add(questao_id)
+
+    por_usuario = {}
+    for usuario_nome, simulado_id, respostas in connection.execute(
+        select(resultados.c.usuario_nome, resultados.c.simulado_id, resultados.c.respostas)
+    ):
+        por_topico = por_usuario.setdefault(usuario_nome, {})
+        for questao_id, valor in json.loads(respostas or '{}').items():
+            try:
+                questao_id = int(questao_id)
+            except ValueError:
+                continue
+            if isinstance(valor, list):
+                if questao_id not in questoes_novas:
+                    continue
+                corretas, materia, assunto = questoes_novas[questao_id]
+                try:
+                    acertou = para_mascara(valor) == corretas
+                except AlternativaInvalida:
+                    acertou = False
+                tempo = 0
+            else:
+                if questao_id not in questoes or questao_id not in do_simulado.get(simulado_id, ()):
+                    continue
+                resposta_correta, materia, assunto = questoes[questao_id]
+                try:
+                    resposta, tempo = _normalizar_resposta(valor)
+                except TempoInvalido:
+                    # Gravado antes da validação: conta a resposta sem o tempo
+                    resposta, tempo = _normalizar_resposta(valor.get('resposta'))
+                acertou = resposta is not None and resposta == resposta_correta
+            acumular_topico(por_topico, materia, assunto, acertou, tempo)
+
+    linhas = [
+        {
+            'usuario_nome': usuario_nome,
+            'materia': materia,
+            'assunto': assunto,
+            'tentativas': tentativas,
+            'acertos': acertos,
+            'soma_tempo_gasto': tempo
+        }
+        for usuario_nome, por_topico in por_usuario.items()
+        for (materia, assunto), (tentativas, acertos, tempo) in por_topico.items()
+    ]
+    if linhas:
+        connection.execute(topicos.insert(), linhas)
+    # O histograma de faixas usado pelo percentil fica com os demais contadores
+    reconstruir_contadores(connection)
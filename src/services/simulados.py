@@ -0,0 +1,77 @@
+from flask import current_app
+from src.models.user import db
+from src.models.questao import Questao, Simulado, SimuladoQuestao
+from src.services.cache_resposta import CacheRespostas, RespostaCacheada
+
+# O conteúdo de um simulado não muda depois de compilado, então cada entrada
+# do cache fica válida para sempre (versão fixa).
+_VERSAO_CONTEUDO = 0
+# Simulados compilados mantidos em memória; /api/simulados/gerar cria um
+# simulado novo a cada chamada, então os mais antigos são descartados
+MAXIMO_SIMULADOS_EM_CACHE = 256
+
+_cache_simulados = CacheRespostas(maximo=MAXIMO_SIMULADOS_EM_CACHE)
+
+
+def questoes_do_simulado(simulado_id, *colunas):
+    """Query das questões do simulado na ordem definida na criação"""
+    query = db.session.query(*colunas) if colunas else Questao.query
+    return query.join(
+        SimuladoQuestao, SimuladoQuestao.questao_id == Questao.id
+    ).filter(
+        SimuladoQuestao.simulado_id == simulado_id
+    ).order_by(SimuladoQuestao.posicao)
+
+
+def criar_simulado(nome, questoes_ids, descricao=None, tempo_limite=None):
+    """Criar o simulado, normalizar a lista de questões e compilar seu conteúdo
+
+    O simulado é adicionado à sessão; quem chama faz o commit.
+    """
+    simulado = Simulado(
+        nome=nome,
+        questoes_ids=questoes_ids,
+        descricao=descricao,
+        tempo_limite=tempo_limite
+    )
+    db.session.add(simulado)
+    db.session.flush()
+
+    db.session.add_all([
+        SimuladoQuestao(simulado_id=simulado.id, posicao=posicao, questao_id=questao_id)
+        for posicao, questao_id in enumerate(questoes_ids)
+    ])
+    db.session.flush()
+    compilar_simulado(simulado)
+    return simulado
+
+
+def compilar_simulado(simulado):
+    """Serializar o simulado com todas as questões, na ordem, em simulado.conteudo"""
+    simulado_dict = simulado.to_dict()
+    simulado_dict['questoes'] = [q.to_dict() for q in questoes_do_simulado(simulado.id).all()]
+    simulado.conteudo = current_app.json.dumps(simulado_dict)
+    return simulado.conteudo
+
+
+def conteudo_simulado(simulado_id):
+    """Conteúdo serializado do simulado, em memória após a primeira leitura
+
+    Retorna None se o simulado não existir. Simulados antigos, criados antes
+    do conteúdo compilado, são compilados e gravados na primeira leitura.
+    """
+    def construir():
+        conteudo = db.session.query(Simulado.conteudo).filter(Simulado.id == simulado_id).first()
+        if conteudo is None:
+            return None
+        conteudo = conteudo[0]
+        if conteudo is None:
+            conteudo = compilar_simulado(db.session.get(Simulado, simulado_id))
+            db.session.commit()
+        return RespostaCacheada(conteudo.encode('utf-8'))
+
+    cacheada = _cache_simulados.obter(simulado_id, _VERSAO_CONTEUDO, construir)
+    if cacheada is None:
+        # Não guardar a ausência: o simulado pode ser criado depois
+        _cache_simulados.invalidar(simulado_id)
+    return cacheada
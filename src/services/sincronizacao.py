@@ -0,0 +1,138 @@
+from sqlalchemy import text
+from src.models.tipos import filtro_igual
+from src.models.user import db
+from src.services.versao import TABELAS_VERSIONADAS
+
+# Maior número de alterações devolvidas por chamada de sincronizar()
+LIMITE_SINCRONIZACAO = 1000
+
+
+def configurar_sincronizacao(connection, tabelas=TABELAS_VERSIONADAS):
+    """Criar o registro de alterações das questões e os gatilhos que o mantêm
+
+    alteracoes_questoes guarda uma linha por questão: a última operação
+    sofrida por ela e a versão (AUTOINCREMENT, sempre crescente) em que isso
+    ocorreu. Uma questão apagada fica como lápide (removida = 1). Os
+    gatilhos também preenchem updated_at nas escritas que não o informam
+    (importação, SQL direto).
+    """
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS alteracoes_questoes (
+            versao INTEGER PRIMARY KEY AUTOINCREMENT,
+            tabela VARCHAR(100) NOT NULL,
+            questao_id INTEGER NOT NULL,
+            removida BOOLEAN NOT NULL DEFAULT 0,
+            alterada_em DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+    connection.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_alteracoes_questoes_tabela_questao "
+        "ON alteracoes_questoes (tabela, questao_id)"
+    ))
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_alteracoes_questoes_tabela_versao "
+        "ON alteracoes_questoes (tabela, versao)"
+    ))
+
+    for tabela in tabelas:
+        # A linha anterior da questão é apagada e outra é criada com uma versão
+        # nova, então cada questão aparece uma única vez. Não usa INSERT OR
+        # REPLACE: dentro de um gatilho vale a política de conflito do comando
+        # externo, e o upsert da importação (ON CONFLICT DO UPDATE) a trocaria
+        # por ABORT, falhando na chave única.
+        for operacao, linha, removida in (('INSERT', 'new', 0), ('UPDATE', 'new', 0), ('DELETE', 'old', 1)):
+            connection.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS {tabela}_sincronizacao_{operacao.lower()}
+                AFTER {operacao} ON {tabela} BEGIN
+                    DELETE FROM alteracoes_questoes WHERE tabela = '{tabela}' AND questao_id = {linha}.id;
+                    INSERT INTO alteracoes_questoes (tabela, questao_id, removida)
+                    VALUES ('{tabela}', {linha}.id, {removida});
+                END
+            """))
+        connection.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS {tabela}_updated_at_insert
+            AFTER INSERT ON {tabela} WHEN new.updated_at IS NULL BEGIN
+                UPDATE {tabela} SET updated_at = CURRENT_TIMESTAMP WHERE id = new.id;
+            END
+        """))
+        connection.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS {tabela}_updated_at_update
+            AFTER UPDATE ON {tabela} WHEN new.updated_at IS old.updated_at BEGIN
+                UPDATE {tabela} SET updated_at = CURRENT_TIMESTAMP WHERE id = new.id;
+            END
+        """))
+
+
+def recriar_gatilhos(connection, tabelas=TABELAS_VERSIONADAS):
+    """Trocar os gatilhos de sincronização já criados pela versão atual"""
+    for tabela in tabelas:
+        for operacao in ('insert', 'update', 'delete'):
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {tabela}_sincronizacao_{operacao}"))
+    configurar_sincronizacao(connection, tabelas)
+
+
+def registrar_existentes(connection, tabelas=TABELAS_VERSIONADAS):
+    """Incluir no registro as questões gravadas antes dos gatilhos existirem"""
+    for tabela in tabelas:
+        connection.execute(text(f"""
+            INSERT OR IGNORE INTO alteracoes_questoes (tabela, questao_id, removida, alterada_em)
+            SELECT '{tabela}', id, 0, COALESCE(updated_at, created_at, CURRENT_TIMESTAMP)
+            FROM {tabela} ORDER BY id
+        """))
+
+
+def sincronizar(modelo, since=0, limite=LIMITE_SINCRONIZACAO, filtros=None):
+    """Alterações de uma tabela de questões posteriores à versão since
+
+    Retorna {'versao', 'alteradas', 'removidas', 'has_more', 'reiniciar'}.
+    'versao' é o valor a enviar como since na próxima chamada; com has_more
+    ainda há alterações depois dela. since = 0 devolve a tabela inteira. Um
+    since maior que a última versão existente (ex.: banco restaurado) também
+    recomeça do zero, com reiniciar = True, e o cliente deve descartar a
+    cópia local. filtros ({coluna: valor}) restringe as questões alteradas;
+    as remoções são sempre enviadas, pois a lápide não guarda as colunas.
+    Pelo mesmo motivo, uma questão alterada que não atende os filtros vai em
+    removidas (exceto na carga completa): ela pode ter deixado de atendê-los
+    nessa alteração, e o cliente filtrado precisa descartá-la se tiver uma
+    cópia.
+    """
+    tabela = modelo.__tablename__
+    limite = max(1, min(limite, LIMITE_SINCRONIZACAO))
+    ultima = db.session.execute(
+        text("SELECT max(versao) FROM alteracoes_questoes WHERE tabela = :tabela"), {'tabela': tabela}
+    ).scalar() or 0
+    reiniciar = since > ultima
+    if reiniciar:
+        since = 0
+
+    linhas = db.session.execute(text("""
+        SELECT versao, questao_id, removida FROM alteracoes_questoes
+        WHERE tabela = :tabela AND versao > :since
+        ORDER BY versao LIMIT :limite
+    """), {'tabela': tabela, 'since': since, 'limite': limite + 1}).all()
+    has_more = len(linhas) > limite
+    linhas = linhas[:limite]
+
+    removidas = [questao_id for _, questao_id, removida in linhas if removida]
+    ids = [questao_id for _, questao_id, removida in linhas if not removida]
+    alteradas = []
+    if ids:
+        query = modelo.query.filter(modelo.id.in_(ids))
+        for coluna, valor in (filtros or {}).items():
+            if valor:
+                query = query.filter(filtro_igual(modelo, coluna, valor))
+        # Ordenadas aqui: com um filtro o SQLite prefere o índice dele e
+        # ordenaria por id numa árvore temporária
+        alteradas = [questao.to_dict() for questao in sorted(query, key=lambda questao: questao.id)]
+        # Na carga completa (since = 0) o cliente não tem cópia a descartar
+        if since and len(alteradas) < len(ids):
+            atendem = {questao['id'] for questao in alteradas}
+            removidas = sorted(removidas + [questao_id for questao_id in ids if questao_id not in atendem])
+
+    return {
+        'versao': linhas[-1][0] if linhas else max(since, ultima),
+        'alteradas': alteradas,
+        'removidas': removidas,
+        'has_more': has_more,
+        'reiniciar': reiniciar
+    }
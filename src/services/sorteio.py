@@ -0,0 +1,237 @@
+import json
+import random
+import threading
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from src.models.tipos import FILTROS_SEM_CAIXA, sem_caixa
+from src.models.user import db
+from src.models.questao import Questao, ResultadoSimulado, SimuladoQuestao
+from src.services.versao import versao_atual
+
+DIMENSOES = ('vestibular', 'materia', 'dificuldade', 'ano')
+# Quantas combinações de filtros diferentes ficam com os candidatos em cache
+MAXIMO_FILTROS_EM_CACHE = 256
+# Sorteios rejeitados (repetidas ou excluídas) por questão pedida antes de
+# desistir da rejeição e enumerar os candidatos restantes
+TENTATIVAS_POR_QUESTAO = 20
+
+
+class CotaInsuficiente(ValueError):
+    """Não há questões suficientes para atender uma cota"""
+
+
+class FiltroInvalido(ValueError):
+    """Filtro de cota com dimensão ou valor inválido"""
+
+
+def _normalizar_filtros(filtros):
+    """{dimensao: frozenset de valores} a partir do JSON da cota
+
+    Cada dimensão aceita um valor ou uma lista; o ano também aceita
+    ano_min/ano_max. Valores de FILTROS_SEM_CAIXA são normalizados com
+    sem_caixa, como no índice.
+    """
+    normalizados = {}
+    for dimensao in DIMENSOES:
+        valor = filtros.get(dimensao)
+        if valor in (None, '', []):
+            continue
+        valores = valor if isinstance(valor, list) else [valor]
+        if dimensao == 'ano':
+            try:
+                valores = [int(ano) for ano in valores]
+            except (TypeError, ValueError):
+                raise FiltroInvalido(f'ano inválido: {valor}')
+        elif dimensao in FILTROS_SEM_CAIXA:
+            valores = [sem_caixa(item) for item in valores]
+        normalizados[dimensao] = frozenset(valores)
+
+    if filtros.get('ano_min') is not None or filtros.get('ano_max') is not None:
+        try:
+            ano_min = int(filtros.get('ano_min', -10 ** 9))
+            ano_max = int(filtros.get('ano_max', 10 ** 9))
+        except (TypeError, ValueError):
+            raise FiltroInvalido('ano_min/ano_max inválidos')
+        normalizados['faixa_ano'] = (ano_min, ano_max)
+    return normalizados
+
+
+class Candidatos:
+    """Baldes que atendem um filtro, com os tamanhos acumulados para o bisect"""
+
+    def __init__(self, baldes):
+        self.baldes = baldes
+        self.acumulados = list(accumulate(len(balde) for balde in baldes))
+        self.total = self.acumulados[-1] if baldes else 0
+
+    def questao(self, posicao):
+        """Questão na posição 0..total-1 da concatenação dos baldes"""
+        i = bisect_right(self.acumulados, posicao)
+        inicio = self.acumulados[i - 1] if i else 0
+        return self.baldes[i][posicao - inicio]
+
+    def todas(self):
+        for balde in self.baldes:
+            yield from balde
+
+
+class IndiceSorteio:
+    """Ids das questões agrupados por (vestibular, materia, dificuldade, ano)
+
+    O índice é montado com uma única consulta e refeito quando a versão da
+    tabela muda. Para sortear, os baldes que atendem os filtros são
+    concatenados virtualmente: um inteiro aleatório em [0, total) vira uma
+    questão por bisect nos tamanhos acumulados, sem ORDER BY RANDOM() nem
+    cópia dos ids. O custo de cada sorteio depende da quantidade pedida e
+    do número de baldes, não do número de questões.
+    """
+
+    def __init__(self, modelo=Questao, dimensoes=DIMENSOES):
+        self.modelo = modelo
+        self.dimensoes = dimensoes
+        self._versao = None
+        self._baldes = {}
+        self._por_valor = {}
+        self._candidatos = {}
+        self._lock = threading.Lock()
+
+    def montar(self, linhas):
+        """Montar o índice a partir de tuplas (*dimensoes, id)"""
+        baldes = {}
+        for linha in linhas:
+            chave = tuple(linha[:-1])
+            balde = baldes.get(chave)
+            if balde is None:
+                balde = baldes[chave] = array('q')
+            balde.append(linha[-1])
+
+        # Baldes de cada valor, indexados como os filtros os comparam
+        por_valor = {dimensao: {} for dimensao in self.dimensoes}
+        for chave in baldes:
+            for dimensao, valor in zip(self.dimensoes, chave):
+                if dimensao in FILTROS_SEM_CAIXA:
+                    valor = sem_caixa(valor)
+                por_valor[dimensao].setdefault(valor, set()).add(chave)
+
+        with self._lock:
+            self._baldes = baldes
+            self._por_valor = por_valor
+            self._candidatos = {}
+
+    def _atualizar(self):
+        versao = versao_atual(self.modelo.__tablename__)
+        if versao is not None and versao == self._versao:
+            return
+        colunas = [getattr(self.modelo, dimensao) for dimensao in self.dimensoes]
+        self.montar(db.session.query(*colunas, self.modelo.id).order_by(self.modelo.id).yield_per(10000))
+        self._versao = versao
+
+    def candidatos(self, filtros):
+        """Candidatos para os filtros já normalizados (veja _normalizar_filtros)"""
+        chave_cache = tuple(sorted(filtros.items()))
+        candidatos = self._candidatos.get(chave_cache)
+        if candidatos is not None:
+            return candidatos
+
+        chaves = None
+        for dimensao, valores in filtros.items():
+            if dimensao == 'faixa_ano':
+                continue
+            indice = self._por_valor[dimensao]
+            atendem = set().union(*(indice.get(valor, ()) for valor in valores))
+            chaves = atendem if chaves is None else chaves & atendem
+        if chaves is None:
+            chaves = self._baldes.keys()
+        if 'faixa_ano' in filtros:
+            ano_min, ano_max = filtros['faixa_ano']
+            posicao_ano = self.dimensoes.index('ano')
+            chaves = [c for c in chaves if c[posicao_ano] is not None and ano_min <= c[posicao_ano] <= ano_max]
+
+        # Ordem fixa dos baldes: a mesma semente sorteia as mesmas questões
+        candidatos = Candidatos([self._baldes[c] for c in sorted(chaves, key=repr)])
+        with self._lock:
+            if len(self._candidatos) >= MAXIMO_FILTROS_EM_CACHE:
+                self._candidatos.clear()
+            self._candidatos[chave_cache] = candidatos
+        return candidatos
+
+    def sortear(self, cotas, excluir=frozenset(), semente=None, atualizar=True):
+        """Sortear as questões de cada cota, sem repetição entre as cotas
+
+        cotas é uma lista de dicionários com 'quantidade' e filtros por
+        dimensão. Retorna a lista de ids, cota após cota. Levanta
+        CotaInsuficiente se alguma cota não puder ser atendida.
+        """
+        if atualizar:
+            self._atualizar()
+        gerador = random.Random(semente)
+        escolhidas = []
+        usadas = set()
+
+        for numero, cota in enumerate(cotas, start=1):
+            try:
+                quantidade = int(cota.get('quantidade', 0))
+            except (TypeError, ValueError):
+                raise FiltroInvalido(f'cota {numero}: quantidade inválida')
+            if quantidade <= 0:
+                continue
+            candidatos = self.candidatos(_normalizar_filtros(cota))
+            if candidatos.total < quantidade:
+                raise CotaInsuficiente(
+                    f'cota {numero}: {quantidade} questões pedidas, {candidatos.total} disponíveis'
+                )
+
+            da_cota = []
+            tentativas = quantidade * TENTATIVAS_POR_QUESTAO
+            while len(da_cota) < quantidade and tentativas > 0:
+                tentativas -= 1
+                questao_id = candidatos.questao(gerador.randrange(candidatos.total))
+                if questao_id in usadas or questao_id in excluir:
+                    continue
+                usadas.add(questao_id)
+                da_cota.append(questao_id)
+
+            if len(da_cota) < quantidade:
+                # Quase todos os candidatos já foram usados ou excluídos:
+                # enumerar o que sobrou em vez de continuar rejeitando
+                restantes = [q for q in candidatos.todas() if q not in usadas and q not in excluir]
+                faltam = quantidade - len(da_cota)
+                if len(restantes) < faltam:
+                    raise CotaInsuficiente(
+                        f'cota {numero}: {quantidade} questões pedidas, '
+                        f'{len(da_cota) + len(restantes)} disponíveis fora das já sorteadas ou respondidas'
+                    )
+                extras = gerador.sample(restantes, faltam)
+                usadas.update(extras)
+                da_cota.extend(extras)
+            escolhidas.extend(da_cota)
+        return escolhidas
+
+
+def questoes_respondidas(usuario_nome):
+    """Ids das questões que o usuário já respondeu em algum simulado"""
+    resultados = db.session.query(
+        ResultadoSimulado.simulado_id, ResultadoSimulado.respostas
+    ).filter(ResultadoSimulado.usuario_nome == usuario_nome).all()
+    if not resultados:
+        return set()
+
+    # Só contam as respostas a questões que de fato fazem parte do simulado
+    do_simulado = {}
+    for simulado_id, questao_id in db.session.query(
+        SimuladoQuestao.simulado_id, SimuladoQuestao.questao_id
+    ).filter(SimuladoQuestao.simulado_id.in_({r[0] for r in resultados})):
+        do_simulado.setdefault(simulado_id, set()).add(questao_id)
+
+    respondidas = set()
+    for simulado_id, respostas in resultados:
+        questoes = do_simulado.get(simulado_id, set())
+        for questao_id in json.loads(respostas or '{}'):
+            try:
+                questao_id = int(questao_id)
+            except ValueError:
+                continue
+            if questao_id in questoes:
+                respondidas.add(questao_id)
+    return respondidas
@@ -0,0 +1,59 @@
+import time
+from sqlalchemy import text
+from src.models.user import db
+
+# Tabelas cujas escritas incrementam um contador em versoes_dados. Os
+# contadores são mantidos por gatilhos no próprio SQLite, então refletem
+# escritas de qualquer worker ou script de importação.
+TABELAS_VERSIONADAS = ('questoes', 'questoes_novas')
+
+_versoes_lidas = {}
+
+
+def configurar_versoes(connection, tabelas=TABELAS_VERSIONADAS):
+    """Criar a tabela de versões e os gatilhos que a incrementam"""
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS versoes_dados (
+            tabela VARCHAR(100) NOT NULL PRIMARY KEY,
+            versao INTEGER NOT NULL DEFAULT 0
+        )
+    """))
+    for tabela in tabelas:
+        connection.execute(
+            text("INSERT OR IGNORE INTO versoes_dados (tabela, versao) VALUES (:tabela, 0)"),
+            {'tabela': tabela}
+        )
+        for operacao in ('INSERT', 'UPDATE', 'DELETE'):
+            connection.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS {tabela}_versao_{operacao.lower()}
+                AFTER {operacao} ON {tabela} BEGIN
+                    UPDATE versoes_dados SET versao = versao + 1 WHERE tabela = '{tabela}';
+                END
+            """))
+
+
+def versao_atual(tabela, max_idade=0):
+    """Obter o contador de escritas da tabela
+
+    Com max_idade > 0 o valor lido é reaproveitado por até max_idade
+    segundos, evitando a consulta ao banco em caminhos muito quentes que
+    toleram enxergar uma escrita de outro worker com esse atraso. Retorna
+    None se o banco não tiver a tabela de versões.
+    """
+    agora = time.monotonic()
+    if max_idade > 0:
+        lida = _versoes_lidas.get(tabela)
+        if lida is not None and agora - lida[1] < max_idade:
+            return lida[0]
+
+    try:
+        versao = db.session.execute(
+            text("SELECT versao FROM versoes_dados WHERE tabela = :tabela"),
+            {'tabela': tabela}
+        ).scalar()
+    except Exception:
+        db.session.rollback()
+        return None
+
+    _versoes_lidas[tabela] = (versao, agora)
+    return versao
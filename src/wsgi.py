@@ -0,0 +1,4 @@
+from src.app import create_app
+
+# Ponto de entrada WSGI de produção: gunicorn -c gunicorn.conf.py src.wsgi:app
+app = create_app()
@@ -0,0 +1,34 @@
+import pytest
+from src.app import create_app
+from src.config import ConfigTeste
+from src.models.user import db
+
+
+def _limpar_caches_do_processo():
+    # Os caches em memória são validados pela versão dos dados, que se repete
+    # entre os bancos em memória de testes diferentes
+    from src.routes import questoes, questoes_novas, questoes_pas_uem
+    from src.services import desempenho, gabarito, simulados, versao
+
+    versao._versoes_lidas.clear()
+    gabarito._gabaritos.clear()
+    gabarito._versao_gabaritos = None
+    for cache in (simulados._cache_simulados, desempenho._perfis, questoes_pas_uem._cache_pas_uem):
+        cache.invalidar()
+    for indice in (questoes._facetas_questoes, questoes._indice_sorteio, questoes_novas._facetas_questoes_novas):
+        indice._versao = None
+
+
+@pytest.fixture
+def app():
+    """Aplicação com ConfigTeste: SQLite em memória, esquema e migrações aplicados"""
+    app = create_app(ConfigTeste)
+    with app.app_context():
+        yield app
+        db.session.remove()
+    _limpar_caches_do_processo()
+
+
+@pytest.fixture
+def cliente(app):
+    return app.test_client()
@@ -0,0 +1,37 @@
+from src.models.questao import Questao
+from src.models.user import db
+
+
+def _questoes(quantidade=4):
+    for numero in range(1, quantidade + 1):
+        db.session.add(Questao(
+            ano=2024, vestibular='ENEM', numero=numero, materia=('Biologia', 'Química')[numero % 2],
+            assunto='Geral', enunciado='Enunciado', alternativas=['a', 'b'], resposta_correta='A',
+            dificuldade='Média'
+        ))
+    db.session.commit()
+
+
+def test_facetas_sem_diferenciar_caixa(cliente):
+    _questoes()
+
+    listagem = cliente.get('/api/questoes?vestibular=enem').get_json()
+    facetas = cliente.get('/api/questoes/filtros?vestibular=enem&materia=BIOLOGIA').get_json()
+
+    assert listagem['total'] == 4
+    assert facetas['contagens']['vestibulares'] == {'ENEM': 2}
+    assert facetas['contagens']['materias'] == {'Biologia': 2, 'Química': 2}
+
+
+def test_sorteio_sem_diferenciar_caixa(cliente):
+    _questoes()
+
+    resposta = cliente.post('/api/simulados/gerar', json={
+        'filtros': {'vestibular': 'enem'},
+        'cotas': [{'materia': 'biologia', 'quantidade': 2}],
+        'semente': 1,
+    })
+
+    assert resposta.status_code == 201
+    ids = resposta.get_json()['questoes_ids']
+    assert sorted(ids) == [2, 4]
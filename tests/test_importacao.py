@@ -0,0 +1,41 @@
+import json
+from src.models.questao_nova import QuestaoNova
+from src.services.importacao import importar_questoes
+from src.services.sincronizacao import sincronizar
+
+
+def _questao(numero, enunciado='Enunciado', **campos):
+    questao = {
+        'vestibular': 'PAS-UEM', 'ano': 2020, 'numero': numero, 'materia': 'Filosofia',
+        'enunciado': enunciado, 'alternativas': ['a', 'b'], 'alternativas_numeracao': ['01', '02'],
+        'resposta_correta': '01', 'alternativas_corretas': ['01'],
+    }
+    questao.update(campos)
+    return questao
+
+
+def _gravar(caminho, questoes):
+    caminho.write_text('\n'.join(json.dumps(questao) for questao in questoes), encoding='utf-8')
+    return str(caminho)
+
+
+def test_reimportar_arquivo_alterado(app, tmp_path):
+    estatisticas = importar_questoes(_gravar(tmp_path / 'v1.jsonl', [_questao(1, 'a'), _questao(2, 'a')]))
+    assert (estatisticas['inseridas'], estatisticas['existentes']) == (2, 0)
+    versao = sincronizar(QuestaoNova)['versao']
+
+    estatisticas = importar_questoes(_gravar(tmp_path / 'v2.jsonl', [_questao(1, 'b'), _questao(2, 'a')]))
+    assert (estatisticas['inseridas'], estatisticas['existentes']) == (0, 2)
+    assert {questao.numero: questao.enunciado for questao in QuestaoNova.query} == {1: 'b', 2: 'a'}
+
+    # Só a questão alterada entra no registro de alterações
+    alteracoes = sincronizar(QuestaoNova, since=versao)
+    assert [questao['numero'] for questao in alteracoes['alteradas']] == [1]
+
+
+def test_chave_repetida_no_mesmo_lote(app, tmp_path):
+    caminho = _gravar(tmp_path / 'repetida.jsonl', [_questao(1, 'a'), _questao(1, 'b'), _questao(1, 'c')])
+    estatisticas = importar_questoes(caminho)
+    assert (estatisticas['inseridas'], estatisticas['existentes']) == (1, 2)
+    assert [questao.enunciado for questao in QuestaoNova.query] == ['c']
+    assert len(sincronizar(QuestaoNova)['alteradas']) == 1
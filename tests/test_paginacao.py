@@ -0,0 +1,34 @@
+import pytest
+from src.models.questao import Questao
+from src.models.user import db
+
+
+@pytest.fixture
+def questoes(app):
+    for numero in range(1, 26):
+        db.session.add(Questao(
+            ano=2024, vestibular='ENEM', numero=numero, materia='Linguagens',
+            enunciado='Enunciado', alternativas=['a', 'b'], resposta_correta='A'
+        ))
+    db.session.commit()
+
+
+@pytest.mark.parametrize('url', ['/api/questoes', '/api/questoes-novas'])
+@pytest.mark.parametrize('per_page', [0, -5])
+def test_cursor_com_per_page_invalido_usa_o_padrao(cliente, questoes, url, per_page):
+    resposta = cliente.get(url, query_string={'cursor': '', 'per_page': per_page})
+    assert resposta.status_code == 200
+
+
+def test_cursor_percorre_todas_as_questoes(cliente, questoes):
+    vistos, cursor = [], ''
+    while cursor is not None:
+        pagina = cliente.get('/api/questoes', query_string={'cursor': cursor, 'per_page': 10}).get_json()
+        vistos += [questao['numero'] for questao in pagina['questoes']]
+        cursor = pagina['next_cursor']
+    assert vistos == list(range(1, 26))
+
+
+def test_cursor_por_padrao_mostra_20(cliente, questoes):
+    pagina = cliente.get('/api/questoes', query_string={'cursor': '', 'per_page': 0}).get_json()
+    assert len(pagina['questoes']) == 20 and pagina['has_next']
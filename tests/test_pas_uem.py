@@ -0,0 +1,33 @@
+import gzip
+from src.models.questao_nova import QuestaoNova
+from src.models.user import db
+from src.services.cache_resposta import RespostaCacheada
+
+
+def _questoes_pas_uem(quantidade=40):
+    for numero in range(1, quantidade + 1):
+        db.session.add(QuestaoNova(
+            vestibular='PAS-UEM', ano=2024, numero=numero, materia='Filosofia', enunciado=f'Enunciado {numero}',
+            alternativas=['a', 'b', 'c'], alternativas_numeracao=['01', '02', '04'],
+            resposta_correta='05', alternativas_corretas=['01', '04']
+        ))
+    db.session.commit()
+
+
+def test_resposta_de_uso_unico_nao_e_precomprimida():
+    cacheada = RespostaCacheada(b'x' * 4096, precomprimir=False)
+    assert cacheada.variantes == {}
+    assert gzip.decompress(cacheada.comprimido('gzip')) == cacheada.corpo
+
+
+def test_fields_comprime_so_a_codificacao_negociada(cliente):
+    _questoes_pas_uem()
+
+    sem_compressao = cliente.get('/api/questoes_pas_uem?fields=id,numero,enunciado')
+    comprimida = cliente.get('/api/questoes_pas_uem?fields=id,numero,enunciado', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in sem_compressao.headers
+    assert comprimida.headers['Content-Encoding'] == 'gzip'
+    assert comprimida.headers['ETag'] == sem_compressao.headers['ETag'][:-1] + '-gzip"'
+    assert gzip.decompress(comprimida.data) == sem_compressao.data
+    assert len(sem_compressao.get_json()) == 40
@@ -0,0 +1,94 @@
+import json
+import pytest
+from src.models.questao import Questao, ResultadoSimulado
+from src.models.questao_nova import QuestaoNova
+from src.models.user import db
+from src.services.importacao import importar_questoes
+from src.services.planos import consultas_executadas, problemas_das_consultas, verificar_planos
+
+
+def _questao_nova(numero, ano=2024, materia='Filosofia', assunto='Liberdade', enunciado='Enunciado'):
+    return {
+        'vestibular': 'PAS-UEM', 'ano': ano, 'numero': numero, 'materia': materia, 'assunto': assunto,
+        'enunciado': enunciado, 'alternativas': ['a', 'b', 'c'], 'alternativas_numeracao': ['01', '02', '04'],
+        'resposta_correta': '05', 'alternativas_corretas': ['01', '04'],
+    }
+
+
+def _importar(caminho, questoes, progresso=None):
+    caminho.write_text('\n'.join(json.dumps(questao) for questao in questoes), encoding='utf-8')
+    return importar_questoes(str(caminho), progresso=progresso)
+
+
+@pytest.fixture
+def banco(app, tmp_path):
+    """Banco de teste com questões das duas tabelas e um simulado"""
+    _importar(tmp_path / 'questoes_novas.jsonl', [
+        _questao_nova(numero, ano=2023 + numero % 2, materia=('Filosofia', 'História')[numero % 2])
+        for numero in range(1, 21)
+    ])
+    for numero in range(1, 11):
+        db.session.add(Questao(
+            ano=2024, vestibular='ENEM', numero=numero, materia='Linguagens', assunto='Inglês',
+            enunciado='Sobre energia', alternativas=['a', 'b'], resposta_correta='A', dificuldade='Média'
+        ))
+    db.session.commit()
+    resposta = app.test_client().post('/api/simulados', json={'nome': 'Simulado', 'questoes_ids': [1, 2, 3]})
+    assert resposta.status_code == 201
+    return resposta.get_json()['id']
+
+
+def _sem_regressoes(regressoes):
+    assert regressoes == [], '\n'.join(f'{cenario}: {" ".join(sql.split())} -> {detalhes}'
+                                       for cenario, sql, detalhes in regressoes)
+
+
+def test_endpoints_de_leitura_usam_indices(app, banco):
+    _sem_regressoes(verificar_planos(app))
+
+
+def test_upsert_da_importacao(app, banco, tmp_path):
+    # Só as consultas até o último lote gravado: a reconstrução dos
+    # contadores no fim da importação percorre as tabelas de propósito
+    gravadas = []
+    with consultas_executadas(db.engine) as consultas:
+        estatisticas = _importar(tmp_path / 'alteradas.jsonl', [
+            _questao_nova(1, ano=2024, materia='História', enunciado='Novo enunciado'),
+            _questao_nova(21),
+        ], progresso=lambda _: gravadas.append(len(consultas)))
+    assert (estatisticas['inseridas'], estatisticas['existentes']) == (1, 1)
+    assert db.session.query(QuestaoNova.enunciado).filter_by(numero=1).scalar() == 'Novo enunciado'
+    assert gravadas and problemas_das_consultas(db.engine, consultas[:gravadas[-1]]) == []
+
+
+def test_correcao_usa_indices(app, banco):
+    cenarios = [
+        ('POST', '/api/questoes-novas/1/verificar-resposta', {'alternativas_selecionadas': ['01', '04']}),
+        ('POST', '/api/questoes-novas/verificar-respostas', {
+            'respostas': {'1': ['01', '04'], '2': ['02']},
+            'resultado': {'simulado_id': banco, 'usuario_nome': 'ana', 'tempo_gasto': 90},
+        }),
+        ('POST', f'/api/simulados/{banco}/resultado', {
+            'usuario_nome': 'ana', 'respostas': {'1': 'A', '2': {'resposta': 'B', 'tempo_gasto': 30}},
+        }),
+        f'/api/simulados/{banco}/estatisticas',
+        '/api/desempenho/ana',
+    ]
+    _sem_regressoes(verificar_planos(app, cenarios))
+    assert ResultadoSimulado.query.filter_by(usuario_nome='ana').count() == 2
+
+
+def test_sincronizacao_usa_indices(app, banco, cliente):
+    versao = cliente.get('/api/sincronizacao/questoes-novas').get_json()['versao']
+    questao = QuestaoNova.query.filter_by(numero=2).one()
+    questao.materia = 'Filosofia'
+    db.session.delete(QuestaoNova.query.filter_by(numero=3).one())
+    db.session.commit()
+
+    cenarios = [
+        f'/api/sincronizacao/questoes-novas?since={versao}',
+        f'/api/sincronizacao/questoes-novas?since={versao}&vestibular=pas-uem&materia=Filosofia',
+        f'/api/sincronizacao/questoes-novas?since={versao}&ano=2024&limite=1',
+        '/api/sincronizacao/questoes?since=0&vestibular=ENEM',
+    ]
+    _sem_regressoes(verificar_planos(app, cenarios))
@@ -0,0 +1,59 @@
+from src.models.questao import ResultadoSimulado
+from src.models.questao_nova import QuestaoNova
+from src.models.user import db
+
+
+def test_estatisticas_de_simulado_inexistente(cliente):
+    resposta = cliente.get('/api/simulados/999/estatisticas')
+    assert resposta.status_code == 404
+    assert resposta.get_json() == {'error': 'Simulado não encontrado'}
+
+
+def _questao_nova(numero):
+    return QuestaoNova(
+        vestibular='PAS-UEM', ano=2024, numero=numero, materia='Filosofia', enunciado='Enunciado',
+        alternativas=['a', 'b', 'c'], alternativas_numeracao=['01', '02', '04'],
+        resposta_correta='05', alternativas_corretas=['01', '04']
+    )
+
+
+def test_resultado_da_correcao_em_lote_atualiza_o_simulado(app, cliente):
+    db.session.add_all([_questao_nova(1), _questao_nova(2)])
+    db.session.commit()
+    simulado_id = cliente.post('/api/simulados', json={'nome': 'Simulado', 'questoes_ids': []}).get_json()['id']
+
+    resposta = cliente.post('/api/questoes-novas/verificar-respostas', json={
+        'respostas': {'1': ['01', '04'], '2': ['02']},
+        'resultado': {'simulado_id': simulado_id, 'usuario_nome': 'ana', 'tempo_gasto': 90},
+    })
+    assert resposta.status_code == 200
+    assert resposta.get_json()['resultado']['pontuacao'] == 1
+
+    estatisticas = cliente.get(f'/api/simulados/{simulado_id}/estatisticas').get_json()
+    assert estatisticas['tentativas'] == ResultadoSimulado.query.count() == 1
+    assert estatisticas['tempo_medio'] == 90
+
+
+def test_correcao_em_lote_rejeita_simulado_inexistente(app, cliente):
+    db.session.add(_questao_nova(1))
+    db.session.commit()
+    resposta = cliente.post('/api/questoes-novas/verificar-respostas', json={
+        'respostas': {'1': ['01']}, 'resultado': {'simulado_id': 12345, 'usuario_nome': 'ana'},
+    })
+    assert resposta.status_code == 404
+    assert ResultadoSimulado.query.count() == 0
+
+
+def test_alternativas_que_nao_sao_lista(app, cliente):
+    db.session.add(_questao_nova(1))
+    db.session.commit()
+
+    resposta = cliente.post('/api/questoes-novas/1/verificar-resposta', json={'alternativas_selecionadas': 5})
+    assert resposta.status_code == 400
+
+    resposta = cliente.post('/api/questoes-novas/verificar-respostas', json={'respostas': {'1': 5}})
+    assert resposta.status_code == 400
+    assert resposta.get_json() == {'error': 'As alternativas devem ser uma lista: 1'}
+
+    resposta = cliente.post('/api/questoes-novas/verificar-respostas', json={'respostas': ['01']})
+    assert resposta.status_code == 400
@@ -0,0 +1,61 @@
+from src.models.questao_nova import QuestaoNova
+from src.models.user import db
+
+
+def _criar(numero, vestibular='PAS-UEM'):
+    questao = QuestaoNova(
+        vestibular=vestibular, ano=2020, numero=numero, materia='Filosofia', enunciado='Enunciado',
+        alternativas=['a', 'b'], alternativas_numeracao=['01', '02'],
+        resposta_correta='01', alternativas_corretas=['01']
+    )
+    db.session.add(questao)
+    db.session.commit()
+    return questao
+
+
+def _sincronizar(cliente, **parametros):
+    resposta = cliente.get('/api/sincronizacao/questoes-novas', query_string=parametros)
+    assert resposta.status_code == 200
+    return resposta.get_json()
+
+
+def test_alteracoes_e_remocoes_desde_a_versao(app, cliente):
+    primeira, segunda = _criar(1), _criar(2)
+    carga = _sincronizar(cliente)
+    assert [questao['id'] for questao in carga['alteradas']] == [primeira.id, segunda.id]
+    assert carga['removidas'] == [] and not carga['has_more']
+
+    primeira.enunciado = 'Alterado'
+    db.session.delete(segunda)
+    db.session.commit()
+    delta = _sincronizar(cliente, since=carga['versao'])
+    assert [questao['enunciado'] for questao in delta['alteradas']] == ['Alterado']
+    assert delta['removidas'] == [segunda.id]
+    assert _sincronizar(cliente, since=delta['versao'])['alteradas'] == []
+
+
+def test_questao_que_deixa_de_atender_o_filtro_vai_em_removidas(app, cliente):
+    questao = _criar(1)
+    carga = _sincronizar(cliente, vestibular='pas-uem')
+    assert [q['id'] for q in carga['alteradas']] == [questao.id]
+
+    questao.vestibular = 'UEM'
+    db.session.commit()
+    delta = _sincronizar(cliente, since=carga['versao'], vestibular='PAS-UEM')
+    assert delta['alteradas'] == []
+    assert delta['removidas'] == [questao.id]
+
+    # Na carga completa não há cópia local a corrigir
+    assert _sincronizar(cliente, vestibular='PAS-UEM')['removidas'] == []
+
+
+def test_limite_e_reinicio(app, cliente):
+    for numero in range(1, 4):
+        _criar(numero)
+    pagina = _sincronizar(cliente, limite=2)
+    assert len(pagina['alteradas']) == 2 and pagina['has_more']
+    resto = _sincronizar(cliente, since=pagina['versao'], limite=2)
+    assert len(resto['alteradas']) == 1 and not resto['has_more']
+
+    reinicio = _sincronizar(cliente, since=resto['versao'] + 100)
+    assert reinicio['reiniciar'] and len(reinicio['alteradas']) == 3